@@ -0,0 +1,291 @@
+"""
+预警规则。
+
+两类规则共用同一套比较运算:
+
+1. 阈值规则: THRESHOLD_SPECS 描述每个阈值列 (比较的字段、运算、提示文字、输入范围),
+   QuoteStore 的阈值列、StockItem 的 upper_*/lower_* 属性、配置文件和界面上的输入框都由它生成,
+   增加一个阈值只需在表中加一项。阈值存放在列中,由 MonitorEngine 按列一次比较 (向量化)。
+
+2. 自定义规则: 每只股票可以另外持有一组 Rule / All / Any 组成的规则,例如
+   All(Rule('price', '>=', 10), Rule('volume_ratio', '>=', 3))。
+   规则在创建时编译为闭包 (单只股票检查) 和按列计算的掩码 (批量检查);
+   所有股票上的简单规则放入 RuleIndex,按 (字段, 运算) 分组,每组一次按列比较。
+"""
+import operator
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# 规则可以引用的字段及中文名
+FIELD_NAMES = {
+    'price': '最新价',
+    'pct_change': '涨跌幅(%)',
+    'volume': '成交量(手)',
+    'high': '最高价',
+    'low': '最低价',
+    'amount': '成交额(元)',
+    'ma': '均线',
+    'ma_cross': '均线穿越',
+    'move_pct': '短时涨跌幅(%)',
+    'volume_ratio': '量比',
+    'volatility': '波动率(%/√秒)',
+}
+
+def _abs_ge_mask(values, threshold):
+    return np.abs(values) >= threshold
+
+def _abs_ge(value, threshold):
+    return abs(value) >= threshold
+
+# 运算符 -> (单值比较, 按列比较)。NaN 参与的比较结果都为 False,未设置的阈值和尚无数值的指标不会触发
+OPS: Dict[str, Tuple[Callable, Callable]] = {
+    '>=': (operator.ge, np.greater_equal),
+    '<=': (operator.le, np.less_equal),
+    '>': (operator.gt, np.greater),
+    '<': (operator.lt, np.less),
+    'abs>=': (_abs_ge, _abs_ge_mask),
+}
+
+# 运算的方向: 1 为数值越大越容易触发 (上限类),-1 为数值越小越容易触发 (下限类)。
+# 滞回带据此决定向哪一侧放宽解除条件
+OP_DIRECTION = {'>=': 1, '>': 1, '<=': -1, '<': -1, 'abs>=': 1}
+
+def _format(value, precision):
+    # 不指定精度时与原先一致,直接输出数值
+    return str(value) if precision is None else f"{value:.{precision}f}"
+
+class ThresholdSpec:
+    """
+    一个阈值列的描述。
+    key: 列名,也是 StockItem 属性名和配置文件中的键
+    field / op: 触发条件为 field op 阈值
+    label: 预警原因前缀;form_label: 界面输入框标签
+    minimum / maximum / decimals: 界面输入范围,输入 0 表示不设置
+    flag: 为 True 时阈值只表示开关 (界面上为复选框,开启时列中存 1)
+    precision: 预警原因中数值的小数位数,None 表示原样输出
+    formatter: 自定义预警原因,参数为 (当前值, 阈值)
+    """
+    __slots__ = ('key', 'field', 'op', 'label', 'form_label', 'unit', 'minimum', 'maximum',
+                 'decimals', 'flag', 'precision', 'formatter')
+
+    def __init__(self, key, field, op, label, form_label, unit='', minimum=0.0, maximum=999999.0,
+                 decimals=2, flag=False, precision=None, formatter=None):
+        self.key = key
+        self.field = field
+        self.op = op
+        self.label = label
+        self.form_label = form_label
+        self.unit = unit
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decimals = decimals
+        self.flag = flag
+        self.precision = precision
+        self.formatter = formatter
+
+    def describe(self, value: float, threshold: float) -> str:
+        """预警原因文字"""
+        if self.formatter is not None:
+            return self.formatter(value, threshold)
+        unit = self.unit
+        shown = _format(value, self.precision)
+        if self.op == 'abs>=':
+            return f"{self.label}: |{shown}{unit}| >= {threshold}{unit}"
+        return f"{self.label}: {shown}{unit} {self.op} {threshold}{unit}"
+
+def _bounds(field, key, name, upper_label, lower_label, unit='', minimum=0.0, maximum=999999.0):
+    return (
+        ThresholdSpec(f'upper_{key}', field, '>=', upper_label, f"{name}上限:", unit, minimum, maximum),
+        ThresholdSpec(f'lower_{key}', field, '<=', lower_label, f"{name}下限:", unit, minimum, maximum),
+    )
+
+# 阈值列,顺序即预警原因的顺序
+THRESHOLD_SPECS: Tuple[ThresholdSpec, ...] = (
+    _bounds('price', 'price', '最新价', '价格突破上限', '价格跌破下限')
+    + _bounds('pct_change', 'pct', '涨跌幅(%)', '涨幅超过上限', '跌幅超过下限', '%', -100.0, 100.0)
+    + _bounds('volume', 'volume', '成交量(手)', '成交量超过上限', '成交量低于下限', maximum=1e12)
+    + _bounds('high', 'high', '最高价', '最高价超过上限', '最高价低于下限')
+    + _bounds('low', 'low', '最低价', '最低价超过上限', '最低价低于下限')
+    + _bounds('amount', 'amount', '成交额(元)', '成交额超过上限', '成交额低于下限', maximum=1e14)
+    + (
+        # ma_cross 为 1/-1/0,开关开启时阈值列存 1,|ma_cross| >= 1 即发生穿越
+        ThresholdSpec('alert_ma_cross', 'ma_cross', 'abs>=', '价格穿越均线', "价格穿越均线时预警", flag=True,
+                      formatter=lambda value, threshold: '价格上穿均线' if value > 0 else '价格下穿均线'),
+        ThresholdSpec('upper_move_pct', 'move_pct', 'abs>=', '短时涨跌幅超过阈值', "短时涨跌幅上限(%):",
+                      '%', 0.0, 100.0, precision=2),
+        ThresholdSpec('upper_volume_ratio', 'volume_ratio', '>=', '量比超过阈值', "量比上限:",
+                      '', 0.0, 1000.0, precision=2),
+    )
+)
+
+THRESHOLD_SPEC_BY_KEY = {spec.key: spec for spec in THRESHOLD_SPECS}
+
+class Rule:
+    """
+    单个比较条件: field op value。
+    创建时即编译出单值判断闭包 test 和按列判断函数 mask,之后不再解释规则。
+    """
+    __slots__ = ('field', 'op', 'value', 'test', '_column_op')
+
+    def __init__(self, field: str, op: str, value: float):
+        if field not in FIELD_NAMES:
+            raise ValueError(f"未知的字段: {field}")
+        if op not in OPS:
+            raise ValueError(f"未知的运算符: {op}")
+        self.field = field
+        self.op = op
+        self.value = float(value)
+        scalar_op, self._column_op = OPS[op]
+        threshold = self.value
+        self.test: Callable[[Dict[str, float]], bool] = lambda values: scalar_op(values[field], threshold)
+
+    def mask(self, columns: Dict[str, np.ndarray], rows: np.ndarray) -> np.ndarray:
+        return self._column_op(columns[self.field][rows], self.value)
+
+    def fields(self) -> List[str]:
+        return [self.field]
+
+    def describe(self, values: Dict[str, float]) -> str:
+        return f"{FIELD_NAMES[self.field]} {self.op} {self.value:g} (当前 {values[self.field]:g})"
+
+    def key(self):
+        return (self.field, self.op, self.value)
+
+    def to_dict(self) -> Dict:
+        return {'field': self.field, 'op': self.op, 'value': self.value}
+
+    def __eq__(self, other):
+        return isinstance(other, Rule) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"Rule({self.field!r}, {self.op!r}, {self.value:g})"
+
+class _Combinator:
+    __slots__ = ('rules', 'test')
+    joiner = ''
+    name = ''
+
+    def __init__(self, *rules):
+        if not rules:
+            raise ValueError(f"{self.name} 至少需要一条规则")
+        self.rules: Tuple = tuple(rules)
+        self.test = self._compile([rule.test for rule in self.rules])
+
+    def fields(self) -> List[str]:
+        return [field for rule in self.rules for field in rule.fields()]
+
+    def describe(self, values: Dict[str, float]) -> str:
+        return '(' + self.joiner.join(rule.describe(values) for rule in self.rules) + ')'
+
+    def key(self):
+        return (self.name,) + tuple(rule.key() for rule in self.rules)
+
+    def to_dict(self) -> Dict:
+        return {self.name: [rule.to_dict() for rule in self.rules]}
+
+    def __eq__(self, other):
+        return isinstance(other, _Combinator) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(map(repr, self.rules))})"
+
+class All(_Combinator):
+    """全部条件同时满足"""
+    __slots__ = ()
+    joiner = ' 且 '
+    name = 'all'
+
+    @staticmethod
+    def _compile(tests):
+        return lambda values: all(test(values) for test in tests)
+
+    def mask(self, columns, rows):
+        result = self.rules[0].mask(columns, rows)
+        for rule in self.rules[1:]:
+            result &= rule.mask(columns, rows)
+        return result
+
+class Any(_Combinator):
+    """任一条件满足"""
+    __slots__ = ()
+    joiner = ' 或 '
+    name = 'any'
+
+    @staticmethod
+    def _compile(tests):
+        return lambda values: any(test(values) for test in tests)
+
+    def mask(self, columns, rows):
+        result = self.rules[0].mask(columns, rows)
+        for rule in self.rules[1:]:
+            result |= rule.mask(columns, rows)
+        return result
+
+def rule_from_dict(data: Dict):
+    """从配置文件中的字典还原规则,格式错误时抛出 ValueError"""
+    if 'all' in data:
+        return All(*(rule_from_dict(item) for item in data['all']))
+    if 'any' in data:
+        return Any(*(rule_from_dict(item) for item in data['any']))
+    try:
+        return Rule(data['field'], data['op'], data['value'])
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"无效的规则: {data}") from e
+
+def is_indexable(rule) -> bool:
+    """单个比较条件 (不是 All / Any 组合) 可以放入 RuleIndex"""
+    return isinstance(rule, Rule)
+
+class RuleIndex:
+    """
+    所有股票上的简单规则,按 (字段, 运算) 分组。
+    每组把规则排成 行号数组 / 阈值数组,检查时每组做一次按列比较:
+    比较本身对该组的规则数是 O(n) (NumPy 内完成),不是按阈值排序后二分查找的 O(log n);
+    Python 层的开销只与组数和触发的规则数有关。规则数在几万条以内时按列比较更快,
+    也不需要为每只股票维护排序结构和上一次的数值。
+    """
+
+    def __init__(self, entries: Iterable[Tuple[int, Rule]] = ()):
+        grouped: Dict[Tuple[str, str], List[Tuple[int, Rule]]] = {}
+        for row, rule in entries:
+            if not is_indexable(rule):
+                raise ValueError(f"规则不能放入索引: {rule!r}")
+            grouped.setdefault((rule.field, rule.op), []).append((int(row), rule))
+        self._groups = []
+        for (field, op), members in grouped.items():
+            members.sort(key=lambda member: member[0])
+            self._groups.append((
+                field,
+                OPS[op][1],
+                np.array([row for row, _ in members], dtype=np.intp),
+                np.array([rule.value for _, rule in members], dtype=float),
+                [rule for _, rule in members],
+            ))
+        # 持有简单规则的行
+        group_rows = [group[2] for group in self._groups]
+        self.rows = np.unique(np.concatenate(group_rows)) if group_rows else np.zeros(0, dtype=np.intp)
+
+    def __len__(self):
+        return sum(len(group[4]) for group in self._groups)
+
+    def triggered(self, columns: Dict[str, np.ndarray], selected: np.ndarray) -> List[Tuple[int, Rule]]:
+        """
+        selected (按行号的布尔数组) 选中的行上当前满足的 (行号, 规则)。
+        NaN (尚无数值的指标) 不满足任何规则。
+        """
+        result = []
+        for field, column_op, rows, thresholds, rules in self._groups:
+            positions = np.flatnonzero(selected[rows])
+            if not len(positions):
+                continue
+            active = rows[positions]
+            matched = positions[column_op(columns[field][active], thresholds[positions])]
+            result.extend((int(rows[k]), rules[k]) for k in matched.tolist())
+        return result
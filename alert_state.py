@@ -0,0 +1,211 @@
+"""
+预警状态机。
+
+每只股票的每条规则 (阈值列或自定义规则) 各有一个状态:
+
+    ARMED (待触发) --条件满足--> TRIGGERED (已触发)
+    TRIGGERED --数值回到滞回带之外--> COOLDOWN (冷却) --冷却结束--> ARMED
+
+滞回带: 上限类规则在数值回落到 阈值 - hysteresis * |阈值| 以下才算解除,下限类反之,
+价格在阈值附近来回波动时不会反复触发/解除。冷却期内条件再次满足也不触发,
+冷却结束后 (expire) 即使行情没有变化也重新判断。hysteresis 和 cooldown 都为 0 时与逐次比较的结果相同。
+
+只有状态变化 (触发、解除) 产生 AlertEvent,使用方只需处理这些事件。
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ARMED, TRIGGERED, COOLDOWN = 0, 1, 2
+STATE_NAMES = {ARMED: '待触发', TRIGGERED: '已触发', COOLDOWN: '冷却中'}
+
+class AlertEvent:
+    """一次状态变化。kind 为 'triggered' 或 'cleared';rule 为阈值名或自定义规则"""
+    __slots__ = ('code', 'rule', 'kind', 'ts', 'reason')
+
+    def __init__(self, code: str, rule, kind: str, ts: float, reason: str = ""):
+        self.code = code
+        self.rule = rule
+        self.kind = kind
+        self.ts = ts
+        self.reason = reason
+
+    def to_dict(self) -> Dict:
+        rule = self.rule if isinstance(self.rule, str) else self.rule.to_dict()
+        return {'code': self.code, 'rule': rule, 'kind': self.kind, 'ts': self.ts, 'reason': self.reason}
+
+    def __repr__(self):
+        return f"AlertEvent({self.code!r}, {self.rule!r}, {self.kind!r})"
+
+class AlertStates:
+    """
+    按股票代码保存各规则的状态。
+    阈值列规则按列批量更新 (update);自定义规则数量少,逐条更新 (update_rule)。
+    """
+
+    def __init__(self, rule_count: int, hysteresis: float = 0.0, cooldown: float = 0.0, capacity: int = 64):
+        self.rule_count = rule_count
+        self.hysteresis = hysteresis
+        self.cooldown = cooldown
+        self.index: Dict[str, int] = {}
+        self._free: List[int] = []
+        self.capacity = max(1, capacity)
+        self._slot_codes: List[Optional[str]] = [None] * self.capacity
+        self._state = np.zeros((self.capacity, rule_count), dtype=np.int8)
+        self._until = np.zeros((self.capacity, rule_count))
+        # 自定义规则: 代码 -> 规则 -> (状态, 冷却结束时间)
+        self._rule_states: Dict[str, Dict] = {}
+        # 至少有一条自定义规则处于已触发状态的代码 (条件不再满足时需要更新以解除)
+        self.rule_alerting: set = set()
+        # 有自定义规则处于冷却中的代码 (冷却结束时由 expire 恢复)
+        self._rule_cooling: set = set()
+        # (代码, 规则) -> 最近一次条件满足时的预警原因,数值处于滞回带内时沿用,解除事件也带上它
+        self.reasons: Dict = {}
+
+    def slots(self, codes: List[str]) -> np.ndarray:
+        """代码对应的状态行号,新代码自动分配 (全部规则为待触发)"""
+        index = self.index
+        try:
+            # 常见情况: 全部是已有代码
+            return np.array([index[code] for code in codes], dtype=np.intp)
+        except KeyError:
+            pass
+        result = np.empty(len(codes), dtype=np.intp)
+        for i, code in enumerate(codes):
+            slot = index.get(code)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    slot = len(index)
+                    if slot >= self.capacity:
+                        self._grow(self.capacity * 2)
+                self._state[slot] = ARMED
+                self._until[slot] = 0.0
+                index[code] = slot
+                self._slot_codes[slot] = code
+            result[i] = slot
+        return result
+
+    def _grow(self, capacity: int):
+        state = np.zeros((capacity, self.rule_count), dtype=np.int8)
+        state[:self.capacity] = self._state
+        until = np.zeros((capacity, self.rule_count))
+        until[:self.capacity] = self._until
+        self._slot_codes.extend([None] * (capacity - self.capacity))
+        self._state, self._until, self.capacity = state, until, capacity
+
+    def remove(self, code: str):
+        slot = self.index.pop(code, None)
+        if slot is not None:
+            self._state[slot] = ARMED
+            self._slot_codes[slot] = None
+            self._free.append(slot)
+        self._rule_states.pop(code, None)
+        self.rule_alerting.discard(code)
+        self._rule_cooling.discard(code)
+        for key in [key for key in self.reasons if key[0] == code]:
+            del self.reasons[key]
+
+    def clear(self):
+        self._state[:] = ARMED
+        self._slot_codes = [None] * self.capacity
+        self._free.extend(self.index.values())
+        self.index.clear()
+        self._rule_states.clear()
+        self.rule_alerting.clear()
+        self._rule_cooling.clear()
+        self.reasons.clear()
+
+    def retain_rules(self, code: str, rules):
+        """丢弃股票已不再持有的自定义规则的状态"""
+        states = self._rule_states.get(code)
+        if states:
+            for rule in [rule for rule in states if rule not in rules]:
+                del states[rule]
+                self.reasons.pop((code, rule), None)
+            self._track_rule_alerting(code, states)
+
+    def expire(self, now: float) -> List[str]:
+        """
+        把冷却已结束的规则恢复为待触发,返回这些股票的代码。
+        行情不变 (午休、停牌、慢速级别) 时这些股票不会因行情变化被重新检查,
+        需要由调用方按当前数值重新检查一次,条件仍满足时再次触发。
+        """
+        if self.cooldown <= 0:
+            return []
+        expired = (self._state == COOLDOWN) & (self._until <= now)
+        self._state[expired] = ARMED
+        codes = {self._slot_codes[slot] for slot in np.flatnonzero(expired.any(axis=1)).tolist()}
+        for code in list(self._rule_cooling):
+            states = self._rule_states[code]
+            for rule, (state, until) in states.items():
+                if state == COOLDOWN and until <= now:
+                    states[rule] = (ARMED, 0.0)
+                    codes.add(code)
+            self._track_rule_alerting(code, states)
+        return sorted(codes)
+
+    def state_of(self, code: str, column: int) -> int:
+        slot = self.index.get(code)
+        return ARMED if slot is None else int(self._state[slot, column])
+
+    def update(self, codes: List[str], hit: np.ndarray, hold: np.ndarray, now: float):
+        """
+        按列更新阈值规则的状态。
+        hit / hold 为 (股票数, 规则数) 的布尔矩阵: hit 为触发条件满足,
+        hold 为数值仍在滞回带以内 (hit 蕴含 hold)。
+        返回 (已触发矩阵, 新触发位置, 解除位置),位置为 (行下标数组, 规则下标数组)。
+        """
+        slots = self.slots(codes)
+        state = self._state[slots]
+        until = self._until[slots]
+
+        state[(state == COOLDOWN) & (until <= now)] = ARMED
+        fired = (state == ARMED) & hit
+        released = (state == TRIGGERED) & ~hold
+        state[fired] = TRIGGERED
+        if self.cooldown > 0:
+            state[released] = COOLDOWN
+            until[released] = now + self.cooldown
+        else:
+            state[released] = ARMED
+
+        self._state[slots] = state
+        self._until[slots] = until
+        return state == TRIGGERED, np.nonzero(fired), np.nonzero(released)
+
+    def update_rule(self, code: str, rule, hit: bool, now: float) -> Optional[str]:
+        """
+        更新一条自定义规则的状态 (不使用滞回带),返回 'triggered' / 'cleared' / None。
+        """
+        states = self._rule_states.setdefault(code, {})
+        state, until = states.get(rule, (ARMED, 0.0))
+        if state == COOLDOWN and until <= now:
+            state = ARMED
+        kind = None
+        if state == ARMED and hit:
+            state, kind = TRIGGERED, 'triggered'
+        elif state == TRIGGERED and not hit:
+            kind = 'cleared'
+            if self.cooldown > 0:
+                state, until = COOLDOWN, now + self.cooldown
+            else:
+                state = ARMED
+        states[rule] = (state, until)
+        if kind is not None:
+            self._track_rule_alerting(code, states)
+        return kind
+
+    def _track_rule_alerting(self, code: str, states: Dict):
+        if any(state == TRIGGERED for state, _ in states.values()):
+            self.rule_alerting.add(code)
+        else:
+            self.rule_alerting.discard(code)
+        if any(state == COOLDOWN for state, _ in states.values()):
+            self._rule_cooling.add(code)
+        else:
+            self._rule_cooling.discard(code)
+
+    def rule_triggered(self, code: str, rule) -> bool:
+        return self._rule_states.get(code, {}).get(rule, (ARMED, 0.0))[0] == TRIGGERED
@@ -0,0 +1,124 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional
+from data_fetcher import DataFetcher
+from test_data_fetcher import TestDataFetcher
+
+class AsyncDataFetcher(DataFetcher):
+    """
+    基于 asyncio 的数据获取实现类,支持多接口对冲(hedging)。
+
+    先请求首选接口(默认腾讯,顺序随接口健康状况调整),如果在 hedge_delay 秒内没有返回
+    (或已失败),立即并发请求下一个接口(默认新浪),
+    取第一个满足覆盖率要求(min_coverage)的结果,其余仍在进行的请求被取消;
+    都不满足时取覆盖最多的那份。之后仍然缺失的代码再逐只交给其他接口(含 AkShare)补齐。
+
+    具体的 HTTP 请求复用 TestDataFetcher (分批并发、长连接 Session),
+    在自有线程池中执行,因此取消只是丢弃结果,已经发出的请求会在后台自然结束,
+    不会拖慢本次返回。
+    """
+
+    def __init__(self, fetcher: Optional[TestDataFetcher] = None,
+                 hedge_delay: float = 0.5, min_coverage: float = 0.8):
+        self.fetcher = fetcher or TestDataFetcher()
+        self.hedge_delay = hedge_delay
+        self.min_coverage = min_coverage
+        self.last_winner: Optional[str] = None
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="quote-hedge")
+
+    def close(self):
+        """关闭线程池和底层 fetcher 的连接池"""
+        self._executor.shutdown(wait=False)
+        self.fetcher.close()
+
+    def get_realtime_quotes(self, stock_codes: List[str]) -> List[Dict]:
+        """
+        同步包装,供 main.py 的定时器/后台线程直接调用。
+        不能在正在运行事件循环的线程中调用,此时请直接 await get_realtime_quotes_async。
+        """
+        return asyncio.run(self.get_realtime_quotes_async(stock_codes))
+
+    async def get_realtime_quotes_async(self, stock_codes: List[str]) -> List[Dict]:
+        """获取指定股票代码列表的实时行情数据(可 await)"""
+        self.last_winner = None
+        if not stock_codes:
+            return []
+
+        # 参与对冲的只有支持指定代码的接口,顺序和熔断状态由 fetcher 的健康统计决定
+        providers = [p for p in self.fetcher._providers() if p[0] != 'akshare']
+        winner, results = await self._race(providers, stock_codes)
+        self.last_winner = winner
+        wanted = set(stock_codes)
+        merged = {item['code']: item for item in results if item.get('code') in wanted}
+
+        if len(merged) < len(wanted):
+            # 只把缺失的代码交给其他接口补齐
+            others = [p for p in self.fetcher._providers() if p[0] != winner]
+            loop = asyncio.get_running_loop()
+            merged = await loop.run_in_executor(self._executor, self.fetcher._fill_gaps,
+                                                stock_codes, others, merged)
+        if not merged:
+            print("所有接口获取失败,请检查网络或股票代码是否正确。")
+        return [merged[code] for code in dict.fromkeys(stock_codes) if code in merged]
+
+    def _covers(self, results: List[Dict], stock_codes: List[str]) -> bool:
+        return bool(results) and len(results) >= len(stock_codes) * self.min_coverage
+
+    async def _race(self, providers, stock_codes: List[str]):
+        """
+        按顺序启动各接口:上一个接口超过 hedge_delay 未返回或已失败时启动下一个。
+        返回 (接口名, 结果):第一个满足覆盖率的结果;都不满足时返回覆盖最多的那份。
+        """
+        if not providers:
+            return None, []
+        loop = asyncio.get_running_loop()
+        best_name, best = None, []
+        pending = {}
+        next_index = 0
+
+        def launch_next():
+            nonlocal next_index
+            name, fetch = providers[next_index]
+            next_index += 1
+            task = asyncio.ensure_future(loop.run_in_executor(
+                self._executor, self.fetcher._call_provider, name, fetch, stock_codes))
+            pending[task] = name
+
+        launch_next()
+        try:
+            while pending:
+                timeout = self.hedge_delay if next_index < len(providers) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 对冲:当前接口迟迟未返回,并发启动下一个接口
+                    launch_next()
+                    continue
+
+                for task in done:
+                    name = pending.pop(task)
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        print(f"{name} 接口获取失败: {e}")
+                        results = []
+                    if self._covers(results, stock_codes):
+                        return name, results
+                    if len(results) > len(best):
+                        best_name, best = name, results
+
+                # 已返回的接口不满足要求,不必再等待对冲延迟
+                if next_index < len(providers):
+                    launch_next()
+            return best_name, best
+        finally:
+            for task in pending:
+                task.cancel()
+
+if __name__ == "__main__":
+    # 测试代码
+    fetcher = AsyncDataFetcher()
+    test_codes = ['600000', '000001']
+    data = fetcher.get_realtime_quotes(test_codes)
+    print(fetcher.last_winner, data)
+    fetcher.close()
@@ -0,0 +1,151 @@
+"""
+预警计算基准测试:原先逐只 StockItem.update_data 的实现 (LegacyStockItem,原样保留作为对照)
+与 MonitorEngine 按列批量计算的每秒刷新次数,
+以及行情完全没有变化时 (停牌、午休) 批量路径的每秒刷新次数。
+批量路径还包含原实现没有的滚动指标、预警状态机和状态变化事件;
+每次刷新的行情是独立的随机数,约两成股票处于预警,预警原因文字和事件都很多。
+
+用法: python bench_alert_eval.py
+"""
+import random
+import time
+from monitor_engine import MonitorEngine
+
+
+class LegacyStockItem:
+    """原先的 StockItem: 每只股票一个对象,逐只写入行情并逐条比较 12 个阈值"""
+
+    def __init__(self, code: str, name: str = ""):
+        self.code = code
+        self.name = name
+        self.price = 0.0
+        self.pct_change = 0.0
+        self.volume = 0.0
+        self.high = 0.0
+        self.low = 0.0
+        self.amount = 0.0
+        self.upper_price = None
+        self.lower_price = None
+        self.upper_pct = None
+        self.lower_pct = None
+        self.upper_volume = None
+        self.lower_volume = None
+        self.upper_high = None
+        self.lower_high = None
+        self.upper_low = None
+        self.lower_low = None
+        self.upper_amount = None
+        self.lower_amount = None
+        self.is_alerting = False
+        self.alert_reasons = []
+
+    def update_data(self, data):
+        self.name = data.get('name', self.name)
+        self.price = data.get('price', 0.0)
+        self.pct_change = data.get('pct_change', 0.0)
+        self.volume = data.get('volume', 0.0)
+        self.high = data.get('high', 0.0)
+        self.low = data.get('low', 0.0)
+        self.amount = data.get('amount', 0.0)
+        self.check_alerts()
+
+    def check_alerts(self):
+        self.alert_reasons = []
+        if self.upper_price is not None and self.price >= self.upper_price:
+            self.alert_reasons.append(f"价格突破上限: {self.price} >= {self.upper_price}")
+        if self.lower_price is not None and self.price <= self.lower_price:
+            self.alert_reasons.append(f"价格跌破下限: {self.price} <= {self.lower_price}")
+        if self.upper_pct is not None and self.pct_change >= self.upper_pct:
+            self.alert_reasons.append(f"涨幅超过上限: {self.pct_change}% >= {self.upper_pct}%")
+        if self.lower_pct is not None and self.pct_change <= self.lower_pct:
+            self.alert_reasons.append(f"跌幅超过下限: {self.pct_change}% <= {self.lower_pct}%")
+        if self.upper_volume is not None and self.volume >= self.upper_volume:
+            self.alert_reasons.append(f"成交量超过上限: {self.volume} >= {self.upper_volume}")
+        if self.lower_volume is not None and self.volume <= self.lower_volume:
+            self.alert_reasons.append(f"成交量低于下限: {self.volume} <= {self.lower_volume}")
+        if self.upper_high is not None and self.high >= self.upper_high:
+            self.alert_reasons.append(f"最高价超过上限: {self.high} >= {self.upper_high}")
+        if self.lower_high is not None and self.high <= self.lower_high:
+            self.alert_reasons.append(f"最高价低于下限: {self.high} <= {self.lower_high}")
+        if self.upper_low is not None and self.low >= self.upper_low:
+            self.alert_reasons.append(f"最低价超过上限: {self.low} >= {self.upper_low}")
+        if self.lower_low is not None and self.low <= self.lower_low:
+            self.alert_reasons.append(f"最低价低于下限: {self.low} <= {self.lower_low}")
+        if self.upper_amount is not None and self.amount >= self.upper_amount:
+            self.alert_reasons.append(f"成交额超过上限: {self.amount} >= {self.upper_amount}")
+        if self.lower_amount is not None and self.amount <= self.lower_amount:
+            self.alert_reasons.append(f"成交额低于下限: {self.amount} <= {self.lower_amount}")
+        self.is_alerting = len(self.alert_reasons) > 0
+
+
+def build_legacy_stocks(engine):
+    """与 engine 中阈值相同的原实现股票字典"""
+    stocks = {}
+    for code, stock in engine.stocks.items():
+        item = stocks[code] = LegacyStockItem(code)
+        for key in ('upper_price', 'lower_price', 'upper_pct', 'lower_pct', 'upper_volume'):
+            value = getattr(stock, key)
+            setattr(item, key, value)
+    return stocks
+
+
+def build_engine(n, rng):
+    engine = MonitorEngine("bench_config.json")
+    for i in range(n):
+        code = f"{i:06d}"
+        engine.add_stock(code)
+        stock = engine.stocks[code]
+        # 大部分股票离阈值较远,每次刷新约有几个百分点的股票触发预警
+        stock.upper_price = rng.uniform(18, 22)
+        stock.lower_price = rng.uniform(4, 6)
+        stock.upper_pct = 5.0
+        stock.lower_pct = -5.0
+        if rng.random() < 0.2:
+            stock.upper_volume = rng.uniform(9e5, 2e6)
+    return engine
+
+
+def build_tick(n, rng):
+    return [{'code': f"{i:06d}", 'name': f"股票{i}", 'price': rng.uniform(5, 20),
+             'pct_change': rng.uniform(-6, 6), 'volume': rng.uniform(1e4, 1e6),
+             'high': rng.uniform(5, 20), 'low': rng.uniform(5, 20), 'amount': rng.uniform(1e6, 1e9)}
+            for i in range(n)]
+
+
+def ticks_per_second(func, ticks, min_time=0.5):
+    count = 0
+    start = time.perf_counter()
+    while True:
+        func(ticks[count % len(ticks)])
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return count / elapsed
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'股票数':>8} {'逐只计算 (次/秒)':>18} {'按列批量 (次/秒)':>18} {'加速比':>8} {'无变化 (次/秒)':>16}")
+    for n in (100, 1000, 5000):
+        engine = build_engine(n, rng)
+        ticks = [build_tick(n, rng) for _ in range(5)]
+
+        legacy_stocks = build_legacy_stocks(engine)
+
+        def per_item(tick):
+            # 原 MonitorEngine.update_stocks_data
+            for data in tick:
+                code = data['code']
+                if code in legacy_stocks:
+                    legacy_stocks[code].update_data(data)
+
+        legacy = ticks_per_second(per_item, ticks)
+        batch = ticks_per_second(engine.update_stocks_data, ticks)
+        alerting = len(engine.get_alerting_stocks())
+        unchanged = ticks_per_second(engine.update_stocks_data, ticks[-1:])
+        print(f"{n:>8} {legacy:>18.1f} {batch:>18.1f} {batch / legacy:>7.1f}x {unchanged:>16.1f}"
+              f"   (预警 {alerting} 只)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+配置加载基准测试:旧格式 (每只股票写出全部 12 个阈值) 与稀疏格式的文件大小和加载耗时。
+
+用法: python bench_config_load.py
+"""
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+from config_schema import ORJSON_AVAILABLE, dumps_config, migrate_config
+from monitor_engine import MonitorEngine
+from quote_store import THRESHOLD_FIELDS
+
+
+def build_v1(n, rng):
+    stocks = []
+    for i in range(n):
+        thresholds = dict.fromkeys(THRESHOLD_FIELDS)
+        # 多数股票只设置一两个价格阈值
+        thresholds['upper_price'] = round(rng.uniform(10, 20), 2)
+        if rng.random() < 0.3:
+            thresholds['lower_pct'] = -5.0
+        stocks.append({'code': f"{i:06d}", 'name': f"股票{i}", 'thresholds': thresholds})
+    return {'stocks': stocks}
+
+
+def load_time(path, repeat=5):
+    engine = MonitorEngine(config_file=path)
+    best = float('inf')
+    for _ in range(repeat):
+        # 引擎每次加载都会打印提示,计时期间丢弃输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            engine.load_config()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = random.Random(42)
+    print(f"orjson: {'可用' if ORJSON_AVAILABLE else '未安装'}")
+    print(f"{'股票数':>8} {'旧格式大小':>12} {'稀疏大小':>12} {'旧格式加载(ms)':>16} {'稀疏加载(ms)':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (1000, 10000, 50000):
+            v1 = build_v1(n, rng)
+            v1_path = os.path.join(tmp, 'v1.json')
+            v2_path = os.path.join(tmp, 'v2.json')
+            with open(v1_path, 'w', encoding='utf-8') as f:
+                json.dump(v1, f, ensure_ascii=False, indent=2)
+            with open(v2_path, 'wb') as f:
+                f.write(dumps_config(migrate_config(v1)))
+            print(f"{n:>8} {os.path.getsize(v1_path) // 1024:>10}KB {os.path.getsize(v2_path) // 1024:>10}KB "
+                  f"{load_time(v1_path) * 1000:>16.1f} {load_time(v2_path) * 1000:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+技术指标基准测试:增量更新 (环形缓冲 + 滑动求和) 与每次按完整历史重新计算的每秒刷新次数,
+以及接入 MonitorEngine 后整次刷新 (写入行情、更新指标、检查阈值) 的耗时。
+
+用法: python bench_indicators.py
+"""
+import time
+
+import numpy as np
+
+from indicators import IndicatorEngine
+from monitor_engine import MonitorEngine
+
+MA_WINDOW = 20
+VOLUME_WINDOW = 20
+MOVE_SECONDS = 300.0
+INTERVAL = 5.0
+
+
+class FullRecompute:
+    """对照组: 保存全部历史,每次刷新都在完整历史上重新计算"""
+
+    def __init__(self, n):
+        self.ts = []
+        self.prices = [[] for _ in range(n)]
+        self.volumes = [[] for _ in range(n)]
+
+    def update(self, ts, price, volume):
+        self.ts.append(ts)
+        for i in range(len(price)):
+            self.prices[i].append(price[i])
+            self.volumes[i].append(volume[i])
+        times = np.array(self.ts)
+        base = max(0, int(np.searchsorted(times, ts - MOVE_SECONDS, side='right')) - 1)
+        for prices, volumes in zip(self.prices, self.volumes):
+            history = np.array(prices)
+            history[-MA_WINDOW:].mean()
+            (history[-1] - history[base]) / history[base]
+            deltas = np.diff(np.array(volumes))
+            if len(deltas) > VOLUME_WINDOW:
+                deltas[-1] / deltas[-VOLUME_WINDOW - 1:-1].mean()
+
+
+def run(update, n, ticks, rng):
+    codes = [f"{i:06d}" for i in range(n)]
+    price = np.full(n, 10.0)
+    volume = np.zeros(n)
+    elapsed = 0.0
+    for t in range(ticks):
+        price = price * (1 + rng.normal(0, 0.002, n))
+        volume = volume + rng.uniform(100, 1000, n)
+        start = time.perf_counter()
+        update(codes, t * INTERVAL, price, volume)
+        elapsed += time.perf_counter() - start
+    return ticks / elapsed
+
+
+def build_engine(n):
+    engine = MonitorEngine("bench_config.json")
+    for i in range(n):
+        code = f"{i:06d}"
+        engine.add_stock(code)
+        stock = engine.stocks[code]
+        stock.upper_price = 11.0
+        stock.alert_ma_cross = True
+        stock.upper_move_pct = 2.0
+        stock.upper_volume_ratio = 3.0
+    return engine
+
+
+def main():
+    rng = np.random.default_rng(42)
+    ticks = 200
+    print(f"每只股票 {ticks} 次行情后 (约 {ticks * INTERVAL / 60:.0f} 分钟) 的每秒刷新次数")
+    print(f"{'股票数':>8} {'增量指标':>12} {'完整重算':>12} {'引擎整次刷新(ms)':>18}")
+    for n in (1000, 5000):
+        indicators = IndicatorEngine(MA_WINDOW, MOVE_SECONDS, VOLUME_WINDOW)
+        incremental = run(lambda codes, ts, p, v: indicators.update(codes, ts, p, v), n, ticks, rng)
+        full = FullRecompute(n)
+        recompute = run(lambda codes, ts, p, v: full.update(ts, p, v), n, 20, rng)
+
+        engine = build_engine(n)
+        timings = []
+        price = np.full(n, 10.0)
+        volume = np.zeros(n)
+        for t in range(ticks):
+            price = price * (1 + rng.normal(0, 0.002, n))
+            volume = volume + rng.uniform(100, 1000, n)
+            batch = [{'code': f"{i:06d}", 'price': float(price[i]), 'pct_change': 0.0,
+                      'volume': float(volume[i]), 'high': 0.0, 'low': 0.0, 'amount': 0.0}
+                     for i in range(n)]
+            start = time.perf_counter()
+            engine.update_stocks_data(batch, ts=t * INTERVAL)
+            timings.append(time.perf_counter() - start)
+        print(f"{n:>8} {incremental:>12.0f} {recompute:>12.1f} {np.median(timings) * 1000:>18.2f}")
+    print("(完整重算只跑前 20 次行情,历史越长越慢;增量指标的耗时与历史长度无关)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+行情解析基准测试:对比原先基于 str.split 的解析与字节级/流式解析。
+
+用法: python bench_quote_parsers.py [代码数量]
+"""
+import sys
+import time
+import tracemalloc
+from quote_parsers import parse_tencent, parse_sina_lines
+from quote_samples import legacy_parse_tencent, legacy_parse_sina, load_sample
+
+
+def build_tencent_payload(n):
+    """用录制的样本行复制出 n 只股票的响应"""
+    line = load_sample('tencent_qt.txt').split(b';')[0].strip()
+    lines = [line.replace(b'600000', f'{600000 + i:06d}'.encode()) for i in range(n)]
+    return b';\n'.join(lines) + b';'
+
+
+def build_sina_payload(n):
+    """用录制的样本行复制出 n 只股票的响应,返回 (响应, 代码列表)"""
+    line = load_sample('sina_hq.txt').split(b'\n')[0].strip()
+    codes = [f'{600000 + i:06d}' for i in range(n)]
+    lines = [line.replace(b'600000', code.encode()) for code in codes]
+    return b'\n'.join(lines) + b'\n', codes
+
+
+def bench(label, func, arg, repeat=20):
+    func(arg)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    per_call = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} {per_call * 1000:8.2f} ms/次   峰值分配 {peak / 1024:8.1f} KiB")
+    return per_call
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    raw = build_tencent_payload(n)
+    print(f"腾讯接口: {n} 只股票, 响应 {len(raw) / 1024:.1f} KiB")
+    # 原实现需要先把整个响应解码为 str
+    legacy = bench("split 版 (含 GBK 解码)", lambda b: legacy_parse_tencent(b.decode('gbk')), raw)
+    fast = bench("字节级解析 (parse_tencent)", parse_tencent, raw)
+    print(f"  加速比 {legacy / fast:.1f}x")
+
+    raw, codes = build_sina_payload(n)
+    print(f"新浪接口: {n} 只股票, 响应 {len(raw) / 1024:.1f} KiB")
+    legacy = bench("按行号映射 (含 GBK 解码)", lambda b: legacy_parse_sina(b.decode('gbk'), codes), raw)
+    # 模拟 response.iter_lines() 逐行输入
+    fast = bench("流式解析 (parse_sina_lines)", lambda b: list(parse_sina_lines(b.splitlines())), raw)
+    print(f"  加速比 {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
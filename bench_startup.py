@@ -0,0 +1,129 @@
+"""
+启动时间基准测试:
+1. python -X importtime 导入 main / daemon 的总耗时和累计耗时最多的模块,
+   并检查 pandas、akshare 等重量级依赖没有在启动时被导入;
+2. 从启动子进程到主窗口第一次绘制 (first paint) 的墙钟时间。
+   子进程通过 STOCK_MONITOR_CONFIG / STOCK_MONITOR_DATA 使用临时目录中的配置 (示例配置的副本)
+   和数据目录,不读写仓库中的 stock_config.json、ticks 等文件;行情仍由后台线程向真实接口请求,
+   不影响第一次绘制。
+
+每项在新的子进程中重复测量,取中位数。用法: python bench_startup.py [--runs 5]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# 只在兜底接口中使用,启动时不应被导入
+LAZY_MODULES = ('pandas', 'akshare')
+
+# 子进程中运行 main.main(),在主窗口第一次收到绘制事件时输出耗时并退出
+FIRST_PAINT = r"""
+import time
+start = time.perf_counter()
+import main
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+from gui.main_window import MainWindow
+
+class PaintProbe(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            print("FIRST_PAINT", time.perf_counter() - start, flush=True)
+            obj.removeEventFilter(self)
+            QApplication.instance().quit()
+        return False
+
+probe = PaintProbe()
+show = MainWindow.show
+
+def show_and_probe(self):
+    self.installEventFilter(probe)
+    show(self)
+
+MainWindow.show = show_and_probe
+main.main()
+"""
+
+
+def child_env(workdir=None):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = HERE + os.pathsep + env.get('PYTHONPATH', '')
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    if workdir is not None:
+        env['STOCK_MONITOR_CONFIG'] = os.path.join(workdir, 'stock_config.json')
+        env['STOCK_MONITOR_DATA'] = workdir
+    return env
+
+
+def import_report(module, runs):
+    """返回 (总耗时中位数 ms, 累计耗时最多的模块, 已导入的重量级模块)"""
+    totals = []
+    entries = {}
+    check = f"import sys, {module}; print([m for m in {LAZY_MODULES!r} if m in sys.modules])"
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', check],
+                                capture_output=True, text=True, cwd=HERE, env=child_env())
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative_us, name = [part.strip() for part in line[len('import time:'):].split('|')]
+            entries.setdefault(name, []).append(int(cumulative_us))
+            if name == module:
+                totals.append(int(cumulative_us) / 1000)
+        loaded = result.stdout.strip().splitlines()[-1] if result.stdout.strip() else '?'
+    top = sorted(((statistics.median(v) / 1000, k) for k, v in entries.items() if k != module),
+                 reverse=True)[:10]
+    return statistics.median(totals), top, loaded
+
+
+def first_paint(runs):
+    """返回 (墙钟中位数, 进程内中位数),单位秒;配置文件和数据目录都在临时目录中"""
+    wall, inside = [], []
+    for _ in range(runs):
+        workdir = tempfile.mkdtemp()
+        try:
+            example = os.path.join(HERE, 'stock_config.example.json')
+            if os.path.exists(example):
+                shutil.copy(example, os.path.join(workdir, 'stock_config.json'))
+            start = time.perf_counter()
+            proc = subprocess.Popen([sys.executable, '-c', FIRST_PAINT], stdout=subprocess.PIPE,
+                                    stderr=subprocess.DEVNULL, text=True, cwd=workdir, env=child_env(workdir))
+            for line in proc.stdout:
+                if line.startswith('FIRST_PAINT'):
+                    wall.append(time.perf_counter() - start)
+                    inside.append(float(line.split()[1]))
+                    break
+            proc.wait(timeout=30)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    if not wall:
+        return None, None
+    return statistics.median(wall), statistics.median(inside)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for module in ('main', 'daemon'):
+        total, top, loaded = import_report(module, args.runs)
+        print(f"import {module}: {total:8.1f} ms  启动时已导入的重量级模块: {loaded}")
+        for ms, name in top:
+            print(f"    {ms:8.1f} ms  {name}")
+
+    wall, inside = first_paint(args.runs)
+    if wall is None:
+        print("first paint: 未能测量 (主窗口没有收到绘制事件)")
+    else:
+        print(f"first paint: {wall * 1000:8.1f} ms (含解释器启动), 进程内 {inside * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import os
+import stat
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+from config_schema import dumps_config
+
+def _file_mode(path: str) -> int:
+    """目标文件已存在时沿用它的权限,否则按 umask 取新建文件的默认权限"""
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def write_json_atomic(path: str, data: Dict):
+    """
+    原子地写入 JSON 文件:先写同目录下的临时文件并刷到磁盘,再用 os.replace 替换目标文件。
+    写入过程中崩溃或断电不会留下只写了一半的配置文件。
+    mkstemp 创建的临时文件权限为 0600,替换前改为目标文件原有的权限。
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dumps_config(data))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class ConfigPersister:
+    """
+    配置文件的后台延迟写入器。
+
+    submit() 只记录最新的配置快照并立即返回;在 delay 秒内没有新的提交时,
+    由后台线程把最后一次快照原子写入文件,连续多次修改只写一次。
+    flush() 立即写出尚未写入的快照,close() 在程序退出时调用。
+    """
+
+    def __init__(self, path: str, delay: float = 1.0):
+        self.path = path
+        self.delay = delay
+        self.write_count = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending: Optional[Dict] = None
+        self._version = 0           # 每次 submit 递增
+        self._written_version = 0   # 已写入文件的快照版本,避免旧快照覆盖新快照
+        self._deadline = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="config-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, config_data: Dict):
+        """提交一份新的配置快照 (覆盖尚未写入的旧快照)"""
+        with self._cond:
+            self._pending = config_data
+            self._version += 1
+            self._deadline = time.monotonic() + self.delay
+            self._cond.notify()
+
+    @property
+    def has_pending(self) -> bool:
+        with self._cond:
+            return self._pending is not None
+
+    def flush(self) -> bool:
+        """在调用线程中立即写出尚未写入的快照"""
+        with self._cond:
+            data, self._pending = self._pending, None
+            version = self._version
+        return self._write(version, data) if data is not None else True
+
+    def close(self):
+        """写出剩余快照并停止后台线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending is None:
+                        self._cond.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    # 等待期间有新的提交会推迟截止时间
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+                data, self._pending = self._pending, None
+                version = self._version
+            self._write(version, data)
+
+    def _write(self, version: int, data: Dict) -> bool:
+        with self._write_lock:
+            if version <= self._written_version:
+                return True
+            try:
+                write_json_atomic(self.path, data)
+                self._written_version = version
+                self.write_count += 1
+                return True
+            except Exception as e:
+                print(f"保存配置失败: {e}")
+                return False
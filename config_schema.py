@@ -0,0 +1,62 @@
+"""
+配置文件格式。
+
+版本 2 (当前):
+    {"version": 2, "stocks": [{"code": "600000", "name": "浦发银行",
+                               "thresholds": {"upper_price": 12.5, "lower_pct": -5.0}}]}
+    thresholds 中只保存已设置的阈值,一个阈值都没有时省略 thresholds;
+    可选的 rules 为自定义规则列表,如 [{"field": "price", "op": ">=", "value": 10},
+    {"all": [...]}, {"any": [...]}],没有时省略。
+
+版本 1 (没有 version 字段): 每只股票都写出全部 12 个阈值,未设置的为 null。
+读取时自动迁移为版本 2,下一次保存即以新格式写回。
+
+安装了 orjson 时用它编解码,否则使用标准库 json,两者读写的文件完全兼容。
+"""
+import json
+from typing import Dict
+
+from quote_store import THRESHOLD_FIELDS
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+CONFIG_VERSION = 2
+
+def dumps_config(config_data: Dict) -> bytes:
+    """编码为 UTF-8 JSON 字节 (中文不转义,缩进 2 格)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(config_data, option=orjson.OPT_INDENT_2)
+    return json.dumps(config_data, ensure_ascii=False, indent=2).encode('utf-8')
+
+def loads_config(raw: bytes) -> Dict:
+    """解码并迁移到当前版本"""
+    if ORJSON_AVAILABLE:
+        config_data = orjson.loads(raw)
+    else:
+        config_data = json.loads(raw.decode('utf-8'))
+    return migrate_config(config_data)
+
+def sparse_thresholds(thresholds: Dict) -> Dict:
+    """只保留已设置 (非 None) 的已知阈值"""
+    return {key: thresholds[key] for key in THRESHOLD_FIELDS if thresholds.get(key) is not None}
+
+def migrate_config(config_data: Dict) -> Dict:
+    """把任意已知版本的配置转换为当前版本,不支持的版本抛出 ValueError"""
+    version = config_data.get('version', 1)
+    if version == CONFIG_VERSION:
+        return config_data
+    if version != 1:
+        raise ValueError(f"不支持的配置版本: {version}")
+
+    stocks = []
+    for stock_config in config_data.get('stocks', []):
+        migrated = {'code': stock_config['code'], 'name': stock_config.get('name', '')}
+        thresholds = sparse_thresholds(stock_config.get('thresholds') or {})
+        if thresholds:
+            migrated['thresholds'] = thresholds
+        stocks.append(migrated)
+    return {'version': CONFIG_VERSION, 'stocks': stocks}
@@ -0,0 +1,258 @@
+"""
+无界面监控守护进程。
+
+在没有图形界面的服务器上运行 抓取行情 -> MonitorEngine.update_stocks_data 的循环,
+只在沪深交易时段内抓取 (见 market_session),休市期间暂停,收盘后抓取一次收盘快照;
+把预警状态变化以 JSON Lines 写到标准输出或文件,每行一个事件:
+
+    {"ts": 1700000000.0, "code": "600000", "name": "浦发银行", "kind": "triggered",
+     "rule": "upper_price", "reason": "价格突破上限: 12.50 >= 12.00", "price": 12.5}
+
+不导入 PyQt6;行情接口在 main() 中才导入,启动只需加载引擎本身。
+
+用法: python daemon.py [--config stock_config.json] [--interval 5] [--output alerts.jsonl]
+      [--holidays holidays.txt] [--always]
+"""
+import argparse
+import contextlib
+import json
+import signal
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+from market_session import (CALL_AUCTION, CLOSED, CLOSING_AUCTION, CONTINUOUS, MarketSession, PollSchedule,
+                            load_holidays)
+from monitor_engine import MonitorEngine
+from notifier import alert_records, load_notifier
+
+
+class Scheduler:
+    """
+    按固定间隔触发的单调时钟调度器。
+    第 k 次触发的时间是 start + k * interval,不受每次任务耗时影响,不会累积漂移;
+    任务耗时超过间隔时跳过已经错过的触发点 (记入 skipped),而不是连续补跑。
+    """
+
+    def __init__(self, interval: float, clock: Callable[[], float] = time.monotonic):
+        if interval <= 0:
+            raise ValueError("interval 必须大于 0")
+        self.interval = interval
+        self.clock = clock
+        self.skipped = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def run(self, task: Callable[[], None], max_runs: Optional[int] = None):
+        """立即执行一次 task,之后按间隔重复,直到 stop() 或执行满 max_runs 次"""
+        start = self.clock()
+        tick = 0
+        runs = 0
+        while not self._stop.is_set():
+            task()
+            runs += 1
+            if max_runs is not None and runs >= max_runs:
+                break
+            tick += 1
+            now = self.clock()
+            due = start + tick * self.interval
+            if now >= due:
+                missed = int((now - due) // self.interval) + 1
+                self.skipped += missed
+                tick += missed
+                due = start + tick * self.interval
+            # 用 Event.wait 等待,stop() 可以立即唤醒
+            self._stop.wait(due - now)
+
+
+class JsonLinesSink:
+    """把预警事件逐行写成 JSON,每次刷新后 flush,便于 tail -f 或日志采集"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def emit(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.flush()
+
+
+class MonitorDaemon:
+    """
+    守护进程主体: 每次刷新抓取全部股票的行情,交给引擎计算,
+    把本次的预警状态变化 (ChangeSet.events) 写入 sink。
+    指定 session 时按交易时段安排抓取,否则不分时段每 interval 秒抓取一次。
+    tiered 时每次只抓取 engine.poll_batches 中到期的级别,每级一批;
+    此时 interval 应为最快一级的间隔。
+    """
+
+    def __init__(self, engine: MonitorEngine, fetcher, sink, interval: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic, session: Optional[MarketSession] = None,
+                 wall_clock: Callable[[], float] = time.time, tiered: bool = False, notifier=None):
+        self.engine = engine
+        self.fetcher = fetcher
+        self.sink = sink
+        self.scheduler = Scheduler(interval, clock)
+        self.session = session
+        self.wall_clock = wall_clock
+        self.tiered = tiered
+        # 可选的 Notifier,预警事件同时转发给各通知渠道
+        self.notifier = notifier
+        self.tick_count = 0
+        self.event_count = 0
+        self.error_count = 0
+
+    def run_once(self, ts: Optional[float] = None, full: bool = False):
+        """
+        执行一次 抓取 -> 计算 -> 输出,返回本次的 ChangeSet (没有需要抓取的股票或抓取失败时为 None)。
+        full 为 True 时不分级,抓取全部股票 (收盘快照)。
+        """
+        self.tick_count += 1
+        engine = self.engine
+        if self.tiered and not full:
+            batches = engine.poll_batches(self.wall_clock() if ts is None else ts)
+        else:
+            batches = [[stock.code for stock in engine.get_all_stocks()]]
+        if not any(batches):
+            return None
+        try:
+            if len(batches) == 1:
+                data = self.fetcher.get_realtime_quotes(batches[0])
+            else:
+                data = self.fetcher.get_quotes_batches(batches)
+        except Exception as e:
+            self.error_count += 1
+            print(f"获取行情失败: {e}")
+            return None
+
+        changes = engine.update_stocks_data(data or [], ts)
+        if changes.events:
+            records = alert_records(engine, changes.events)
+            for record in records:
+                self.sink.emit(record)
+            self.event_count += len(records)
+            self.sink.flush()
+            if self.notifier is not None:
+                self.notifier.submit(records)
+        return changes
+
+    def run(self, max_ticks: Optional[int] = None):
+        if self.session is None:
+            self.scheduler.run(self.run_once, max_ticks)
+        else:
+            self._run_sessions(max_ticks)
+
+    def _run_sessions(self, max_ticks: Optional[int]):
+        schedule = PollSchedule(self.session, self.wall_clock())
+        stop = self.scheduler._stop
+        runs = 0
+        while not stop.is_set():
+            now = self.wall_clock()
+            if schedule.due(now):
+                self.run_once(full=schedule.phase(now) == CLOSED)
+                runs += 1
+                if max_ticks is not None and runs >= max_ticks:
+                    break
+            stop.wait(schedule.wait_time(self.wall_clock()))
+
+    def stop(self):
+        self.scheduler.stop()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="无界面股票预警监控")
+    parser.add_argument("--config", default="stock_config.json", help="配置文件路径")
+    parser.add_argument("--interval", type=float, default=5.0,
+                        help="交易时段内的刷新间隔 (秒),分级抓取时不使用")
+    parser.add_argument("--no-tiers", action="store_true",
+                        help="每次抓取全部股票,不按离阈值远近分级")
+    parser.add_argument("--always", action="store_true", help="不区分交易时段,全天按固定间隔刷新")
+    parser.add_argument("--holidays", default=None, help="节假日文件 (每行一个 YYYY-MM-DD 或 JSON 列表)")
+    parser.add_argument("--post-close-delay", type=float, default=30.0,
+                        help="收盘后多少秒抓取收盘快照,负数表示不抓取")
+    parser.add_argument("--output", default="-", help="预警事件输出文件,- 表示标准输出")
+    parser.add_argument("--hysteresis", type=float, default=0.002, help="滞回带 (阈值的比例)")
+    parser.add_argument("--cooldown", type=float, default=60.0, help="预警解除后的冷却时间 (秒)")
+    parser.add_argument("--ticks-dir", default=None, help="记录逐笔行情的目录,不指定则不记录")
+    parser.add_argument("--notify", default=None,
+                        help="通知配置文件 (日志文件、webhook、邮件,见 notifier.load_notifier)")
+    parser.add_argument("--count", type=int, default=None, help="刷新指定次数后退出")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # 明确指定的通知配置无法加载时直接退出,不在没有任何通知的情况下继续运行
+    notifier = None
+    if args.notify:
+        try:
+            notifier = load_notifier(args.notify, strict=True)
+        except Exception as e:
+            print(f"加载通知配置 {args.notify} 失败: {e}", file=sys.stderr)
+            return 2
+
+    output = sys.stdout if args.output == "-" else open(args.output, "a", encoding="utf-8")
+    sink = JsonLinesSink(output)
+
+    # 事件独占标准输出,其余提示信息改写到标准错误
+    with contextlib.redirect_stdout(sys.stderr):
+        from test_data_fetcher import TestDataFetcher
+
+        engine = MonitorEngine(args.config, hysteresis=args.hysteresis, cooldown=args.cooldown)
+        engine.load_config()
+        if args.ticks_dir:
+            from tick_recorder import TickRecorder
+            engine.recorder = TickRecorder(args.ticks_dir)
+        fetcher = TestDataFetcher()
+        tiered = not args.no_tiers
+        # 分级抓取时按最快一级的间隔检查哪些级别到期
+        interval = engine.polling.intervals[0] if tiered else args.interval
+        session = None
+        if not args.always:
+            intervals = {phase: interval for phase in (CALL_AUCTION, CONTINUOUS, CLOSING_AUCTION)}
+            session = MarketSession(load_holidays(args.holidays) if args.holidays else (), intervals,
+                                    args.post_close_delay if args.post_close_delay >= 0 else None)
+        daemon = MonitorDaemon(engine, fetcher, sink, interval, session=session, tiered=tiered,
+                               notifier=notifier)
+
+        def on_signal(signum, frame):
+            daemon.stop()
+
+        signal.signal(signal.SIGINT, on_signal)
+        signal.signal(signal.SIGTERM, on_signal)
+
+        print(f"开始监控 {len(engine.stocks)} 只股票,"
+              + (f"分级抓取 (间隔 {', '.join(f'{t:g}' for t in engine.polling.intervals)} 秒)" if tiered
+                 else f"间隔 {interval} 秒")
+              + ("" if session is None else ",仅在交易时段内刷新"))
+        try:
+            daemon.run(args.count)
+        finally:
+            fetcher.close()
+            if notifier is not None:
+                notifier.close()
+            engine.close()
+            if engine.recorder is not None:
+                engine.recorder.close()
+            sink.close()
+            if args.output != "-":
+                output.close()
+        print(f"已退出: 刷新 {daemon.tick_count} 次,预警事件 {daemon.event_count} 条,"
+              f"跳过 {daemon.scheduler.skipped} 次")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,3 +27,14 @@ class DataFetcher(ABC):
             - amount: 成交额
         """
         pass
+
+    def get_quotes_batches(self, batches: List[List[str]]) -> List[Dict]:
+        """
+        分批获取行情并合并结果,每批单独请求 (例如按抓取级别分批,
+        快速级的小批次不必等待慢速级的大批次)。
+        """
+        results = []
+        for stock_codes in batches:
+            if stock_codes:
+                results.extend(self.get_realtime_quotes(stock_codes))
+        return results
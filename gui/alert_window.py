@@ -1,8 +1,11 @@
-from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
-                             QTableWidgetItem, QLabel, QHeaderView, QPushButton,
-                             QDialog, QFormLayout, QDoubleSpinBox, QDialogButtonBox)
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTableWidget, 
+                             QTableWidgetItem, QLabel, QHeaderView, QMenu,
+                             QDialog, QFormLayout, QDialogButtonBox)
 from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QColor
+from gui.threshold_inputs import ThresholdInputs
+
+ALERT_FOREGROUND = QColor("red")
 
 class ThresholdEditDialog(QDialog):
     """阈值编辑对话框"""
@@ -10,37 +13,13 @@ class ThresholdEditDialog(QDialog):
         super().__init__(parent)
         self.stock = stock
         self.setWindowTitle(f"编辑阈值 - {stock.code} {stock.name}")
-        self.resize(400, 350)
+        self.resize(400, 600)
         
         layout = QVBoxLayout()
         form = QFormLayout()
-        
-        # 价格阈值
-        self.upper_price_sb = QDoubleSpinBox()
-        self.upper_price_sb.setRange(0, 999999)
-        self.upper_price_sb.setDecimals(2)
-        self.upper_price_sb.setValue(stock.upper_price if stock.upper_price is not None else 0)
-        
-        self.lower_price_sb = QDoubleSpinBox()
-        self.lower_price_sb.setRange(0, 999999)
-        self.lower_price_sb.setDecimals(2)
-        self.lower_price_sb.setValue(stock.lower_price if stock.lower_price is not None else 0)
-        
-        # 涨跌幅阈值
-        self.upper_pct_sb = QDoubleSpinBox()
-        self.upper_pct_sb.setRange(-100, 100)
-        self.upper_pct_sb.setDecimals(2)
-        self.upper_pct_sb.setValue(stock.upper_pct if stock.upper_pct is not None else 0)
-        
-        self.lower_pct_sb = QDoubleSpinBox()
-        self.lower_pct_sb.setRange(-100, 100)
-        self.lower_pct_sb.setDecimals(2)
-        self.lower_pct_sb.setValue(stock.lower_pct if stock.lower_pct is not None else 0)
-        
-        form.addRow("价格上限:", self.upper_price_sb)
-        form.addRow("价格下限:", self.lower_price_sb)
-        form.addRow("涨幅上限(%):", self.upper_pct_sb)
-        form.addRow("跌幅下限(%):", self.lower_pct_sb)
+        # 阈值输入框由 alert_rules.THRESHOLD_SPECS 生成
+        self.inputs = ThresholdInputs(form)
+        self.inputs.load(stock)
         
         layout.addLayout(form)
         
@@ -55,16 +34,13 @@ class ThresholdEditDialog(QDialog):
     
     def get_thresholds(self):
         """获取用户设置的阈值"""
-        return {
-            'upper_price': self.upper_price_sb.value() if self.upper_price_sb.value() > 0 else None,
-            'lower_price': self.lower_price_sb.value() if self.lower_price_sb.value() > 0 else None,
-            'upper_pct': self.upper_pct_sb.value() if self.upper_pct_sb.value() != 0 else None,
-            'lower_pct': self.lower_pct_sb.value() if self.lower_pct_sb.value() != 0 else None
-        }
+        return self.inputs.values()
 
 class AlertWindow(QWidget):
     # 定义信号，用于通知主窗口刷新
     data_changed = pyqtSignal()
+    # 修改阈值后产生的预警触发/解除事件 (AlertEvent 列表)，与行情刷新的事件一样发送通知
+    alert_events = pyqtSignal(list)
     
     def __init__(self, engine=None):
         super().__init__()
@@ -73,17 +49,48 @@ class AlertWindow(QWidget):
         self.resize(800, 400)
         
         layout = QVBoxLayout()
-        self.label = QLabel("以下股票已触发阈值：")
+        self.label = QLabel("以下股票已触发阈值（双击编辑阈值，右键可编辑或删除）：")
         layout.addWidget(self.label)
         
         self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["代码", "名称", "当前价", "预警原因", "操作"])
+        self.table.setColumnCount(4)
+        self.table.setHorizontalHeaderLabels(["代码", "名称", "当前价", "预警原因"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.table.customContextMenuRequested.connect(self.show_context_menu)
+        self.table.cellDoubleClicked.connect(lambda row, col: self.edit_threshold_at(row))
         layout.addWidget(self.table)
         
         self.setLayout(layout)
+        
+        # 代码 -> 该行的单元格 [代码, 名称, 当前价, 预警原因]，行号通过单元格的 row() 获得
+        self._rows = {}
+
+    def code_at(self, row):
+        item = self.table.item(row, 0)
+        return item.text() if item is not None else None
+
+    def show_context_menu(self, pos):
+        """右键菜单：编辑阈值 / 删除"""
+        row = self.table.rowAt(pos.y())
+        if row < 0:
+            return
+        code = self.code_at(row)
+        menu = QMenu(self)
+        edit_action = menu.addAction("编辑阈值")
+        delete_action = menu.addAction("删除")
+        action = menu.exec(self.table.viewport().mapToGlobal(pos))
+        if action is edit_action:
+            self.edit_threshold_at(row)
+        elif action is delete_action:
+            self.delete_stock(code)
+
+    def edit_threshold_at(self, row):
+        code = self.code_at(row)
+        if self.engine and code in self.engine.stocks:
+            self.edit_threshold(self.engine.stocks[code])
 
     def edit_threshold(self, stock):
         """编辑股票阈值"""
@@ -92,14 +99,12 @@ class AlertWindow(QWidget):
         
         dialog = ThresholdEditDialog(stock, self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            thresholds = dialog.get_thresholds()
-            stock.set_thresholds(
-                upper_price=thresholds['upper_price'],
-                lower_price=thresholds['lower_price'],
-                upper_pct=thresholds['upper_pct'],
-                lower_pct=thresholds['lower_pct']
-            )
+            changes = self.engine.update_thresholds(stock.code, dialog.get_thresholds())
             self.engine.save_config()
+            if changes.events:
+                self.alert_events.emit(changes.events)
+            # 修改阈值可能使本股票离开或改变预警，本窗口的行不会等到下一次行情变化才更新
+            self.update_alerts(self.engine.get_alerting_stocks())
             self.data_changed.emit()  # 发射信号通知主窗口刷新
     
     def delete_stock(self, code):
@@ -109,48 +114,43 @@ class AlertWindow(QWidget):
         
         self.engine.remove_stock(code)
         self.engine.save_config()
+        self._remove_row(code)
         self.data_changed.emit()  # 发射信号通知主窗口刷新
 
+    def _remove_row(self, code):
+        cells = self._rows.pop(code, None)
+        if cells is not None:
+            self.table.removeRow(cells[0].row())
+
     def update_alerts(self, alerting_stocks):
-        self.table.setRowCount(0)
+        """
+        按股票代码增量更新：只增删进入/离开预警状态的行，
+        已在表中的行只在内容变化时更新文字。
+        """
+        alerting_codes = {stock.code for stock in alerting_stocks}
+        for code in [code for code in self._rows if code not in alerting_codes]:
+            self._remove_row(code)
+        
         for stock in alerting_stocks:
-            row = self.table.rowCount()
-            self.table.insertRow(row)
-            
-            code_item = QTableWidgetItem(stock.code)
-            name_item = QTableWidgetItem(stock.name)
-            price_item = QTableWidgetItem(str(stock.price))
-            reason_item = QTableWidgetItem("; ".join(stock.alert_reasons))
-            
-            # 标红显示
-            for item in [code_item, name_item, price_item, reason_item]:
-                item.setForeground(QColor("red"))
-            
-            self.table.setItem(row, 0, code_item)
-            self.table.setItem(row, 1, name_item)
-            self.table.setItem(row, 2, price_item)
-            self.table.setItem(row, 3, reason_item)
-            
-            # 添加操作按钮
-            button_widget = QWidget()
-            button_layout = QHBoxLayout()
-            button_layout.setContentsMargins(5, 2, 5, 2)
-            
-            edit_btn = QPushButton("编辑阈值")
-            edit_btn.clicked.connect(lambda checked, s=stock: self.edit_threshold(s))
-            edit_btn.setStyleSheet("background-color: #4CAF50; color: white; padding: 5px;")
-            
-            delete_btn = QPushButton("删除")
-            delete_btn.clicked.connect(lambda checked, c=stock.code: self.delete_stock(c))
-            delete_btn.setStyleSheet("background-color: #f44336; color: white; padding: 5px;")
-            
-            button_layout.addWidget(edit_btn)
-            button_layout.addWidget(delete_btn)
-            button_widget.setLayout(button_layout)
-            
-            self.table.setCellWidget(row, 4, button_widget)
+            texts = (stock.code, stock.name, str(stock.price), "; ".join(stock.alert_reasons))
+            cells = self._rows.get(stock.code)
+            if cells is None:
+                row = self.table.rowCount()
+                self.table.insertRow(row)
+                cells = []
+                for col, text in enumerate(texts):
+                    item = QTableWidgetItem(text)
+                    item.setForeground(ALERT_FOREGROUND)  # 标红显示
+                    self.table.setItem(row, col, item)
+                    cells.append(item)
+                self._rows[stock.code] = cells
+            else:
+                for item, text in zip(cells, texts):
+                    if item.text() != text:
+                        item.setText(text)
         
-        if len(alerting_stocks) > 0:
-            self.show()
-        else:
+        if alerting_stocks:
+            if not self.isVisible():
+                self.show()
+        elif self.isVisible():
             self.hide()
@@ -0,0 +1,143 @@
+from PyQt6.QtCore import QObject, Qt, QThread, pyqtSignal, pyqtSlot
+
+
+class _FetchTask(QObject):
+    """运行在后台线程中的实际抓取任务"""
+    finished = pyqtSignal(list, list)   # (请求的代码列表, 行情数据)
+    failed = pyqtSignal(str)
+
+    def __init__(self, fetcher):
+        super().__init__()
+        self.fetcher = fetcher
+
+    @pyqtSlot(list)
+    def run(self, stock_codes):
+        self._fetch(stock_codes, self.fetcher.get_realtime_quotes, stock_codes)
+
+    @pyqtSlot(list)
+    def run_batches(self, batches):
+        stock_codes = [code for batch in batches for code in batch]
+        self._fetch(stock_codes, self.fetcher.get_quotes_batches, batches)
+
+    def _fetch(self, stock_codes, fetch, request):
+        try:
+            data = fetch(request)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(stock_codes, data or [])
+
+
+class FetchWorker(QObject):
+    """
+    后台行情抓取器。
+    在独立的 QThread 中调用 fetcher.get_realtime_quotes，通过信号把结果送回 GUI 线程，
+    同一时刻最多只有一次抓取在进行，抓取未完成时到来的刷新请求会被直接丢弃；
+    不能丢弃的请求 (例如收盘快照) 用 queue=True 排队，在当前抓取结束后立即开始。
+    """
+    data_ready = pyqtSignal(list)       # 行情数据（在 GUI 线程中发射）
+    fetch_failed = pyqtSignal(str)
+    _start_fetch = pyqtSignal(list)
+    _start_batches = pyqtSignal(list)
+
+    def __init__(self, fetcher, parent=None):
+        super().__init__(parent)
+        self.fetcher = fetcher
+        self.busy = False
+        self.skipped_ticks = 0
+        self._pending = []  # 排队的批次,当前抓取结束后合并为一次抓取
+
+        self._thread = QThread()
+        self._task = _FetchTask(fetcher)
+        self._task.moveToThread(self._thread)
+        self._start_fetch.connect(self._task.run)
+        self._start_batches.connect(self._task.run_batches)
+        self._task.finished.connect(self._on_finished)
+        self._task.failed.connect(self._on_failed)
+        self._thread.start()
+
+    def request_fetch(self, stock_codes):
+        """
+        请求一次抓取。
+        如果上一次抓取仍在进行则跳过本次请求并返回 False。
+        """
+        if not stock_codes:
+            return False
+        if self.busy:
+            self.skipped_ticks += 1
+            return False
+        self.busy = True
+        self._start_fetch.emit(list(stock_codes))
+        return True
+
+    def request_batches(self, batches, queue=False):
+        """
+        请求一次分批抓取 (fetcher.get_quotes_batches),每批单独请求。
+        与 request_fetch 共用同一个单飞限制;queue 为 True 时抓取进行中的请求不丢弃,
+        排队到当前抓取结束后再开始 (此时也返回 False)。
+        batches 也可以是返回批次的函数,只在确实开始 (或排队) 时才调用,
+        例如 engine.poll_batches: 跳过的刷新不会消耗到期的级别。
+        跳过的次数只在这里计入 skipped_ticks。
+        """
+        if not callable(batches):
+            batches = [list(batch) for batch in batches if batch]
+            if not batches:
+                return False
+        if self.busy:
+            if queue:
+                self._pending.extend(batches() if callable(batches) else batches)
+            else:
+                self.skipped_ticks += 1
+            return False
+        if callable(batches):
+            batches = [list(batch) for batch in batches() if batch]
+            if not batches:
+                return False
+        self.busy = True
+        self._start_batches.emit(batches)
+        return True
+
+    def _start_pending(self):
+        # data_ready 的处理函数可能已经开始了新的抓取,排队的请求等它结束
+        if self.busy:
+            return
+        # 多次排队的请求合并为一次抓取,同一代码只抓取一次
+        seen = set()
+        batches = []
+        for batch in self._pending:
+            batch = [code for code in batch if code not in seen]
+            seen.update(batch)
+            if batch:
+                batches.append(batch)
+        self._pending = []
+        self.request_batches(batches)
+
+    def _on_finished(self, stock_codes, data):
+        self.busy = False
+        self.data_ready.emit(data)
+        if self._pending:
+            self._start_pending()
+
+    def _on_failed(self, message):
+        self.busy = False
+        print(f"后台抓取失败: {message}")
+        self.fetch_failed.emit(message)
+        if self._pending:
+            self._start_pending()
+
+    def stop(self, timeout_ms=5000, on_stopped=None):
+        """
+        停止后台线程（程序退出时调用），返回线程是否已在 timeout_ms 内结束。
+        on_stopped 在线程结束后调用 (例如关闭 fetcher 的连接池)；超时时抓取仍在使用连接，
+        不能立即关闭，改为在后台线程结束时由该线程调用。
+        """
+        self._pending = []
+        self._thread.quit()
+        if self._thread.wait(timeout_ms):
+            if on_stopped is not None:
+                on_stopped()
+            return True
+        print(f"后台抓取 {timeout_ms} 毫秒内未结束，线程结束后再释放连接")
+        if on_stopped is not None:
+            self._thread.finished.connect(on_stopped, Qt.ConnectionType.DirectConnection)
+        return False
@@ -1,11 +1,17 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, 
-                             QLabel, QHeaderView, QFormLayout, QDoubleSpinBox, 
+                             QLineEdit, QPushButton, QTableView, QAbstractItemView,
+                             QLabel, QHeaderView, QFormLayout,
                              QCheckBox, QGroupBox, QScrollArea)
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QColor
+from PyQt6.QtCore import Qt, QSortFilterProxyModel, pyqtSignal
+from gui.stock_table_model import StockTableModel
+from gui.threshold_inputs import ThresholdInputs
 
 class MainWindow(QMainWindow):
+    # 增删股票或修改阈值后发射，用于通知预警窗口刷新
+    data_changed = pyqtSignal()
+    # 修改阈值后产生的预警触发/解除事件 (AlertEvent 列表)，与行情刷新的事件一样发送通知
+    alert_events = pyqtSignal(list)
+    
     def __init__(self, engine, fetcher):
         super().__init__()
         self.engine = engine
@@ -54,11 +60,21 @@ class MainWindow(QMainWindow):
         add_layout.addWidget(self.add_btn)
         left_layout.addLayout(add_layout)
 
-        # 股票表格
-        self.table = QTableWidget()
+        # 股票表格 (模型/视图: 只重绘发生变化的单元格)
+        self.model = StockTableModel(engine, self.data_fields, self)
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setSortRole(Qt.ItemDataRole.UserRole)
+        self.table = QTableView()
+        self.table.setModel(self.proxy_model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        self.table.verticalHeader().setVisible(False)
         self.update_table_columns()
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.table.itemSelectionChanged.connect(self.on_selection_changed)
+        self.table.selectionModel().selectionChanged.connect(self.on_selection_changed)
         left_layout.addWidget(self.table)
         
         main_layout.addLayout(left_layout, 2)
@@ -74,27 +90,9 @@ class MainWindow(QMainWindow):
         
         scroll_layout.addWidget(QLabel("监控阈值设置"))
         
-        # 动态生成阈值输入框
-        self.threshold_widgets = {}
+        # 阈值输入框由 alert_rules.THRESHOLD_SPECS 生成
         self.threshold_form = QFormLayout()
-        
-        for field_key, field_info in self.data_fields.items():
-            upper_sb = QDoubleSpinBox()
-            upper_sb.setRange(0, 999999)
-            upper_sb.setDecimals(2)
-            lower_sb = QDoubleSpinBox()
-            lower_sb.setRange(-999999, 999999)
-            lower_sb.setDecimals(2)
-            
-            self.threshold_widgets[field_key] = {
-                'upper': upper_sb,
-                'lower': lower_sb,
-                'upper_label': QLabel(f"{field_info['name']}上限:"),
-                'lower_label': QLabel(f"{field_info['name']}下限:")
-            }
-            
-            self.threshold_form.addRow(self.threshold_widgets[field_key]['upper_label'], upper_sb)
-            self.threshold_form.addRow(self.threshold_widgets[field_key]['lower_label'], lower_sb)
+        self.threshold_inputs = ThresholdInputs(self.threshold_form)
         
         scroll_layout.addLayout(self.threshold_form)
         
@@ -115,6 +113,7 @@ class MainWindow(QMainWindow):
         
         # 初始化时更新阈值控件可见性
         self.update_threshold_visibility()
+        self.refresh_table()
 
     def on_field_selection_changed(self):
         """字段选择改变时更新表格和阈值设置"""
@@ -123,23 +122,15 @@ class MainWindow(QMainWindow):
         self.refresh_table()
 
     def update_table_columns(self):
-        """根据勾选状态更新表格列"""
-        headers = ["代码", "名称"]
-        for field_key, checkbox in self.field_checkboxes.items():
-            if checkbox.isChecked():
-                headers.append(self.data_fields[field_key]['name'])
-        
-        self.table.setColumnCount(len(headers))
-        self.table.setHorizontalHeaderLabels(headers)
+        """根据勾选状态显示/隐藏表格列"""
+        for col, (field_key, _) in enumerate(self.model.columns):
+            checkbox = self.field_checkboxes.get(field_key)
+            self.table.setColumnHidden(col, checkbox is not None and not checkbox.isChecked())
 
     def update_threshold_visibility(self):
         """根据勾选状态显示/隐藏对应的阈值设置"""
         for field_key, checkbox in self.field_checkboxes.items():
-            visible = checkbox.isChecked()
-            self.threshold_widgets[field_key]['upper'].setVisible(visible)
-            self.threshold_widgets[field_key]['lower'].setVisible(visible)
-            self.threshold_widgets[field_key]['upper_label'].setVisible(visible)
-            self.threshold_widgets[field_key]['lower_label'].setVisible(visible)
+            self.threshold_inputs.set_field_visible(field_key, checkbox.isChecked())
 
     def add_stock(self):
         code = self.code_input.text().strip()
@@ -148,99 +139,50 @@ class MainWindow(QMainWindow):
                 self.refresh_table()
                 self.code_input.clear()
                 self.engine.save_config()  # 保存配置
+                self.data_changed.emit()
+
+    def selected_code(self):
+        """返回当前选中行的股票代码，没有选中时返回 None"""
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return None
+        return self.model.code_at(self.proxy_model.mapToSource(rows[0]).row())
 
     def remove_stock(self):
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        code = self.selected_code()
+        if code is None:
             return
-        code = self.table.item(selected_items[0].row(), 0).text()
         self.engine.remove_stock(code)
         self.refresh_table()
         self.engine.save_config()  # 保存配置
+        self.data_changed.emit()
 
     def on_selection_changed(self):
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        code = self.selected_code()
+        if code is None:
             return
-        code = self.table.item(selected_items[0].row(), 0).text()
         stock = self.engine.stocks.get(code)
         if stock:
             # 加载当前股票的阈值设置
-            self.threshold_widgets['price']['upper'].setValue(stock.upper_price if stock.upper_price is not None else 0)
-            self.threshold_widgets['price']['lower'].setValue(stock.lower_price if stock.lower_price is not None else 0)
-            self.threshold_widgets['pct_change']['upper'].setValue(stock.upper_pct if stock.upper_pct is not None else 0)
-            self.threshold_widgets['pct_change']['lower'].setValue(stock.lower_pct if stock.lower_pct is not None else 0)
-            
-            # 其他字段阈值（如果 StockItem 支持）
-            for field in ['volume', 'high', 'low', 'amount']:
-                upper_attr = f'upper_{field}'
-                lower_attr = f'lower_{field}'
-                if hasattr(stock, upper_attr):
-                    self.threshold_widgets[field]['upper'].setValue(getattr(stock, upper_attr) or 0)
-                if hasattr(stock, lower_attr):
-                    self.threshold_widgets[field]['lower'].setValue(getattr(stock, lower_attr) or 0)
+            self.threshold_inputs.load(stock)
 
     def save_thresholds(self):
-        selected_items = self.table.selectedItems()
-        if not selected_items:
+        code = self.selected_code()
+        if code is None:
             return
-        code = self.table.item(selected_items[0].row(), 0).text()
         stock = self.engine.stocks.get(code)
         if stock:
-            # 保存价格和涨跌幅阈值
-            up = self.threshold_widgets['price']['upper'].value()
-            lp = self.threshold_widgets['price']['lower'].value()
-            uct = self.threshold_widgets['pct_change']['upper'].value()
-            lct = self.threshold_widgets['pct_change']['lower'].value()
-            
-            stock.set_thresholds(
-                upper_price=up if up > 0 else None,
-                lower_price=lp if lp > 0 else None,
-                upper_pct=uct if uct != 0 else None,
-                lower_pct=lct if lct != 0 else None
-            )
-            
-            # 保存其他字段阈值（如果需要扩展）
-            for field in ['volume', 'high', 'low', 'amount']:
-                upper_val = self.threshold_widgets[field]['upper'].value()
-                lower_val = self.threshold_widgets[field]['lower'].value()
-                setattr(stock, f'upper_{field}', upper_val if upper_val > 0 else None)
-                setattr(stock, f'lower_{field}', lower_val if lower_val != 0 else None)
+            changes = self.engine.update_thresholds(code, self.threshold_inputs.values())
             
+            self.refresh_table()
             self.engine.save_config()  # 保存配置
+            if changes.events:
+                self.alert_events.emit(changes.events)
+            self.data_changed.emit()
 
-    def refresh_table(self):
-        stocks = self.engine.get_all_stocks()
-        self.table.setRowCount(len(stocks))
-        
-        for i, stock in enumerate(stocks):
-            col = 0
-            # 代码和名称固定显示
-            self.table.setItem(i, col, QTableWidgetItem(stock.code))
-            col += 1
-            self.table.setItem(i, col, QTableWidgetItem(stock.name))
-            col += 1
-            
-            # 根据勾选状态显示其他字段
-            for field_key, checkbox in self.field_checkboxes.items():
-                if checkbox.isChecked():
-                    value = getattr(stock, field_key, 0)
-                    
-                    # 特殊处理涨跌幅显示
-                    if field_key == 'pct_change':
-                        item = QTableWidgetItem(f"{value}%")
-                        if value > 0:
-                            item.setForeground(QColor("red"))
-                        elif value < 0:
-                            item.setForeground(QColor("green"))
-                    else:
-                        item = QTableWidgetItem(str(value))
-                    
-                    self.table.setItem(i, col, item)
-                    col += 1
-            
-            # 如果触发预警，整行背景变色
-            if stock.is_alerting:
-                for j in range(self.table.columnCount()):
-                    if self.table.item(i, j):
-                        self.table.item(i, j).setBackground(QColor("#ffcccc"))
+    def refresh_table(self, changes=None):
+        """
+        刷新表格。传入 MonitorEngine.update_stocks_data 返回的 ChangeSet 时
+        只检查发生变化的股票，否则检查全部股票。
+        """
+        self.model.refresh(changes.changed if changes is not None else None)
@@ -0,0 +1,125 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor
+
+# 颜色只创建一次，避免每次刷新都分配新的 QColor
+RISE_COLOR = QColor("red")
+FALL_COLOR = QColor("green")
+ALERT_BACKGROUND = QColor("#ffcccc")
+
+class StockTableModel(QAbstractTableModel):
+    """
+    主窗口股票表格的数据模型，直接读取 MonitorEngine 中的数据。
+
+    行按股票加入的顺序排列（排序交给 QSortFilterProxyModel），
+    refresh() 对比上一次显示的值，只对发生变化的单元格发出 dataChanged，
+    增删股票时使用 beginInsertRows/beginRemoveRows，视图的排序和选中状态得以保留。
+    """
+
+    def __init__(self, engine, data_fields, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        # 列: 代码、名称 + 行情字段
+        self.columns = [('code', '代码'), ('name', '名称')]
+        self.columns += [(key, info['name']) for key, info in data_fields.items()]
+        self._codes = []
+        self._rows = {}
+        self._snapshots = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._codes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][1]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        snapshot = self._snapshots[index.row()]
+        field = self.columns[index.column()][0]
+        value = snapshot[index.column()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if field == 'pct_change':
+                return f"{value}%"
+            return str(value)
+        if role == Qt.ItemDataRole.UserRole:
+            # 排序使用原始数值
+            return value
+        if role == Qt.ItemDataRole.ForegroundRole and field == 'pct_change':
+            if value > 0:
+                return RISE_COLOR
+            if value < 0:
+                return FALL_COLOR
+            return None
+        if role == Qt.ItemDataRole.BackgroundRole and snapshot[-1]:
+            # 触发预警的整行背景变色
+            return ALERT_BACKGROUND
+        return None
+
+    def code_at(self, row):
+        return self._codes[row]
+
+    def row_of(self, code):
+        return self._rows.get(code)
+
+    def _snapshot(self, stock):
+        return tuple(getattr(stock, field) for field, _ in self.columns) + (stock.is_alerting,)
+
+    def refresh(self, changed_codes=None):
+        """
+        与引擎同步。
+        changed_codes 为 None 时检查所有股票，否则只检查给定的代码
+        （股票的增删总会被同步）。
+        """
+        stocks = self.engine.stocks
+        self._sync_rows(stocks)
+        codes = self._codes if changed_codes is None else changed_codes
+        last_column = len(self.columns) - 1
+        for code in codes:
+            row = self._rows.get(code)
+            stock = stocks.get(code)
+            if row is None or stock is None:
+                continue
+            old = self._snapshots[row]
+            new = self._snapshot(stock)
+            if new == old:
+                continue
+            self._snapshots[row] = new
+            if new[-1] != old[-1]:
+                # 预警状态变化，整行背景都要重绘
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+                continue
+            # 按连续的列区间发出 dataChanged
+            start = None
+            for col in range(len(self.columns) + 1):
+                differs = col < len(self.columns) and new[col] != old[col]
+                if differs and start is None:
+                    start = col
+                elif not differs and start is not None:
+                    self.dataChanged.emit(self.index(row, start), self.index(row, col - 1))
+                    start = None
+
+    def _sync_rows(self, stocks):
+        removed = [row for row, code in enumerate(self._codes) if code not in stocks]
+        for row in reversed(removed):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._codes[row]
+            del self._snapshots[row]
+            self.endRemoveRows()
+        if removed:
+            self._rows = {code: row for row, code in enumerate(self._codes)}
+
+        added = [code for code in stocks if code not in self._rows]
+        if added:
+            first = len(self._codes)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            for code in added:
+                self._rows[code] = len(self._codes)
+                self._codes.append(code)
+                self._snapshots.append(self._snapshot(stocks[code]))
+            self.endInsertRows()
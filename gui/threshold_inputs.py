@@ -0,0 +1,53 @@
+from PyQt6.QtWidgets import QCheckBox, QDoubleSpinBox, QLabel
+from alert_rules import THRESHOLD_SPECS
+
+class ThresholdInputs:
+    """
+    按 alert_rules.THRESHOLD_SPECS 生成的一组阈值输入控件，主窗口和阈值编辑对话框共用。
+    数值阈值为输入框（输入 0 表示不设置），开关型阈值为复选框。
+    """
+
+    def __init__(self, form, specs=THRESHOLD_SPECS):
+        self.specs = specs
+        # 阈值名 -> (标签, 输入控件)
+        self.widgets = {}
+        for spec in specs:
+            if spec.flag:
+                widget = QCheckBox(spec.form_label)
+                label = QLabel("")
+            else:
+                widget = QDoubleSpinBox()
+                widget.setRange(spec.minimum, spec.maximum)
+                widget.setDecimals(spec.decimals)
+                label = QLabel(spec.form_label)
+            form.addRow(label, widget)
+            self.widgets[spec.key] = (label, widget)
+
+    def load(self, stock):
+        """显示某只股票当前的阈值"""
+        for spec in self.specs:
+            widget = self.widgets[spec.key][1]
+            value = getattr(stock, spec.key)
+            if spec.flag:
+                widget.setChecked(bool(value))
+            else:
+                widget.setValue(value if value is not None else 0)
+
+    def values(self):
+        """返回 阈值名 -> 值，未设置的阈值为 None"""
+        result = {}
+        for spec in self.specs:
+            widget = self.widgets[spec.key][1]
+            if spec.flag:
+                result[spec.key] = True if widget.isChecked() else None
+            else:
+                value = widget.value()
+                result[spec.key] = value if value != 0 else None
+        return result
+
+    def set_field_visible(self, field, visible):
+        """显示/隐藏比较某个字段的全部阈值"""
+        for spec in self.specs:
+            if spec.field == field:
+                for widget in self.widgets[spec.key]:
+                    widget.setVisible(visible)
@@ -0,0 +1,28 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtWidgets import QApplication, QStyle, QSystemTrayIcon
+
+
+class TrayNotifier(QObject):
+    """
+    通过系统托盘气泡显示桌面通知。
+    show 可以在任意线程中调用 (notifier.DesktopSink 在后台线程发送),
+    信号跨线程时自动排队到界面线程再显示;系统不支持托盘时忽略通知。
+    """
+    message = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tray = None
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            icon = QApplication.style().standardIcon(QStyle.StandardPixmap.SP_MessageBoxWarning)
+            self.tray = QSystemTrayIcon(icon, self)
+            self.tray.setToolTip("股票监控")
+            self.tray.show()
+        self.message.connect(self._show)
+
+    def show(self, title, text):
+        self.message.emit(title, text)
+
+    def _show(self, title, text):
+        if self.tray is not None:
+            self.tray.showMessage(title, text, QSystemTrayIcon.MessageIcon.Warning)
@@ -0,0 +1,250 @@
+"""
+滚动窗口技术指标。
+
+每只股票的历史保存在固定长度的环形缓冲区中,配合滑动求和,
+每次刷新对每只股票的更新都是 O(1),不回看完整历史;所有股票按列一次性计算。
+
+指标 (尚无足够历史时为 NaN):
+    ma            最近 ma_window 次行情的价格均线
+    ma_cross      本次价格上穿均线为 1,下穿为 -1,否则为 0
+    move_pct      相对 move_seconds 秒前价格的涨跌幅 (%)
+    volume_ratio  本次每秒成交量 (增量除以间隔秒数) / 之前 volume_window 次的均值;
+                  刷新间隔变化 (例如分级抓取换级) 时仍可比较
+    volatility    每秒价格波动 (%/√秒): 相邻两次行情涨跌幅的平方除以间隔秒数,
+                  按 volatility_window 次行情做指数加权平均后开方;
+                  不同股票的刷新间隔不同时仍可相互比较
+"""
+from typing import Dict, List
+
+import numpy as np
+
+INDICATOR_FIELDS = ('ma', 'ma_cross', 'move_pct', 'volume_ratio', 'volatility')
+
+class IndicatorEngine:
+    """
+    按股票代码维护指标状态。行情只在数值变化时送入,
+    因此"一次行情"指一次有变化的刷新 (停牌时不会被重复计入均线)。
+    """
+
+    def __init__(self, ma_window: int = 20, move_seconds: float = 300.0, volume_window: int = 20,
+                 history: int = 256, capacity: int = 64, volatility_window: int = 20):
+        self.ma_window = ma_window
+        self.move_seconds = move_seconds
+        self.volume_window = volume_window
+        self.volatility_alpha = 2.0 / (volatility_window + 1)
+        # move_pct 的时间窗口内最多能容纳的行情次数,需大于 move_seconds / 刷新间隔
+        self.history = history
+        self.index: Dict[str, int] = {}
+        self._free: List[int] = []
+        # 每只股票占各数组的一行,先建空数组再统一扩容
+        self.capacity = 0
+        self._ma_buf = np.zeros((0, ma_window))
+        self._ma_sum = np.zeros(0)
+        self._ma_count = np.zeros(0, dtype=np.intp)
+        self._ma_pos = np.zeros(0, dtype=np.intp)
+        self._prev_diff = np.zeros(0)
+        self._hist_ts = np.zeros((0, history))
+        self._hist_price = np.zeros((0, history))
+        self._hist_start = np.zeros(0, dtype=np.intp)
+        self._hist_len = np.zeros(0, dtype=np.intp)
+        self._prev_volume = np.zeros(0)
+        self._prev_volume_ts = np.zeros(0)
+        self._vol_buf = np.zeros((0, volume_window))
+        self._vol_sum = np.zeros(0)
+        self._vol_count = np.zeros(0, dtype=np.intp)
+        self._vol_pos = np.zeros(0, dtype=np.intp)
+        self._last_price = np.zeros(0)
+        self._last_ts = np.zeros(0)
+        self._variance = np.zeros(0)
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity: int):
+        old, self.capacity = self.capacity, capacity
+
+        def grow(array, fill):
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:old] = array[:old]
+            return grown
+
+        self._ma_buf = grow(self._ma_buf, 0.0)
+        self._ma_sum = grow(self._ma_sum, 0.0)
+        self._ma_count = grow(self._ma_count, 0)
+        self._ma_pos = grow(self._ma_pos, 0)
+        self._prev_diff = grow(self._prev_diff, np.nan)
+        self._hist_ts = grow(self._hist_ts, 0.0)
+        self._hist_price = grow(self._hist_price, 0.0)
+        self._hist_start = grow(self._hist_start, 0)
+        self._hist_len = grow(self._hist_len, 0)
+        self._prev_volume = grow(self._prev_volume, np.nan)
+        self._prev_volume_ts = grow(self._prev_volume_ts, np.nan)
+        self._vol_buf = grow(self._vol_buf, 0.0)
+        self._vol_sum = grow(self._vol_sum, 0.0)
+        self._vol_count = grow(self._vol_count, 0)
+        self._vol_pos = grow(self._vol_pos, 0)
+        self._last_price = grow(self._last_price, np.nan)
+        self._last_ts = grow(self._last_ts, np.nan)
+        self._variance = grow(self._variance, np.nan)
+
+    def _reset_slot(self, slot: int):
+        self._ma_buf[slot] = 0.0
+        self._ma_sum[slot] = 0.0
+        self._ma_count[slot] = 0
+        self._ma_pos[slot] = 0
+        self._prev_diff[slot] = np.nan
+        self._hist_start[slot] = 0
+        self._hist_len[slot] = 0
+        self._prev_volume[slot] = np.nan
+        self._prev_volume_ts[slot] = np.nan
+        self._last_price[slot] = np.nan
+        self._last_ts[slot] = np.nan
+        self._variance[slot] = np.nan
+        self._reset_volume(slot)
+
+    def _reset_volume(self, slot: int):
+        self._vol_buf[slot] = 0.0
+        self._vol_sum[slot] = 0.0
+        self._vol_count[slot] = 0
+        self._vol_pos[slot] = 0
+
+    def slots(self, codes: List[str]) -> np.ndarray:
+        """代码对应的状态行号,新代码自动分配"""
+        index = self.index
+        try:
+            # 常见情况: 全部是已有代码
+            return np.array([index[code] for code in codes], dtype=np.intp)
+        except KeyError:
+            pass
+        result = np.empty(len(codes), dtype=np.intp)
+        for i, code in enumerate(codes):
+            slot = index.get(code)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    slot = len(index)
+                    if slot >= self.capacity:
+                        self._allocate(self.capacity * 2)
+                self._reset_slot(slot)
+                index[code] = slot
+            result[i] = slot
+        return result
+
+    def remove(self, code: str):
+        slot = self.index.pop(code, None)
+        if slot is not None:
+            self._free.append(slot)
+
+    def clear(self):
+        self._free.extend(self.index.values())
+        self.index.clear()
+
+    def update(self, codes: List[str], ts: float, price: np.ndarray, volume: np.ndarray) -> Dict[str, np.ndarray]:
+        """送入一批行情,返回与 codes 对齐的各指标数组"""
+        slots = self.slots(codes)
+        price = np.asarray(price, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        ma, ma_cross = self._update_ma(slots, price)
+        return {
+            'ma': ma,
+            'ma_cross': ma_cross,
+            'move_pct': self._update_move(slots, ts, price),
+            'volume_ratio': self._update_volume(slots, ts, volume),
+            'volatility': self._update_volatility(slots, ts, price),
+        }
+
+    def _update_ma(self, slots, price):
+        window = self.ma_window
+        pos = self._ma_pos[slots]
+        # 滑动求和: 加上新值,减去被覆盖的旧值 (缓冲未满时旧值为 0)
+        self._ma_sum[slots] += price - self._ma_buf[slots, pos]
+        self._ma_buf[slots, pos] = price
+        self._ma_pos[slots] = (pos + 1) % window
+        count = np.minimum(self._ma_count[slots] + 1, window)
+        self._ma_count[slots] = count
+        ma = np.where(count == window, self._ma_sum[slots] / window, np.nan)
+
+        diff = price - ma
+        prev = self._prev_diff[slots]
+        ma_cross = np.where(np.isnan(diff), np.nan, 0.0)
+        ma_cross[(prev <= 0) & (diff > 0)] = 1.0
+        ma_cross[(prev >= 0) & (diff < 0)] = -1.0
+        self._prev_diff[slots] = diff
+        return ma, ma_cross
+
+    def _update_move(self, slots, ts, price):
+        size = self.history
+        start = self._hist_start[slots]
+        length = self._hist_len[slots]
+        # 写入新样本;缓冲满时覆盖最旧的样本
+        full = length == size
+        pos = (start + length) % size
+        self._hist_ts[slots, pos] = ts
+        self._hist_price[slots, pos] = price
+        start = np.where(full, (start + 1) % size, start)
+        length = np.where(full, length, length + 1)
+
+        # 丢弃比基准点更旧的样本: 基准点是时间不晚于 ts - move_seconds 的最后一个样本。
+        # 每个样本只会被丢弃一次,均摊 O(1)
+        cutoff = ts - self.move_seconds
+        while True:
+            nxt = (start + 1) % size
+            drop = (length > 1) & (self._hist_ts[slots, nxt] <= cutoff)
+            if not drop.any():
+                break
+            start = np.where(drop, nxt, start)
+            length = np.where(drop, length - 1, length)
+        self._hist_start[slots] = start
+        self._hist_len[slots] = length
+
+        base_ts = self._hist_ts[slots, start]
+        base = self._hist_price[slots, start]
+        # 历史还不够覆盖整个时间窗口时不给出数值,避免刚启动时误报
+        valid = (base_ts <= cutoff) & (base != 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(valid, (price - base) / base * 100, np.nan)
+
+    def _update_volume(self, slots, ts, volume):
+        window = self.volume_window
+        prev = self._prev_volume[slots]
+        dt = ts - self._prev_volume_ts[slots]
+        self._prev_volume[slots] = volume
+        self._prev_volume_ts[slots] = ts
+        delta = volume - prev
+        # 第一次行情没有增量;累计成交量变小说明换了交易日,重新开始统计
+        restart = delta < 0
+        if restart.any():
+            for slot in slots[restart].tolist():
+                self._reset_volume(slot)
+        # 按每秒成交量比较,抓取间隔不同的两次增量才可比
+        valid = ~np.isnan(delta) & ~restart & (dt > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = delta / dt
+
+        count = self._vol_count[slots]
+        mean = self._vol_sum[slots] / np.maximum(count, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(valid & (count == window) & (mean > 0), rate / mean, np.nan)
+
+        # 把本次速率放入窗口 (先算比值,窗口只包含之前的速率)
+        slots, rate = slots[valid], rate[valid]
+        pos = self._vol_pos[slots]
+        self._vol_sum[slots] += rate - self._vol_buf[slots, pos]
+        self._vol_buf[slots, pos] = rate
+        self._vol_pos[slots] = (pos + 1) % window
+        self._vol_count[slots] = np.minimum(self._vol_count[slots] + 1, window)
+        return ratio
+
+    def _update_volatility(self, slots, ts, price):
+        last_price = self._last_price[slots]
+        dt = ts - self._last_ts[slots]
+        self._last_price[slots] = price
+        self._last_ts[slots] = ts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = ((price - last_price) / last_price * 100) ** 2 / dt
+        # 第一次行情、时间没有前进或价格无效时不更新
+        valid = np.isfinite(rate) & (dt > 0)
+        variance = self._variance[slots]
+        alpha = self.volatility_alpha
+        variance = np.where(valid, np.where(np.isnan(variance), rate, variance + alpha * (rate - variance)), variance)
+        self._variance[slots] = variance
+        return np.sqrt(variance)
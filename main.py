@@ -1,38 +1,118 @@
+import os
 import sys
+import time
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import QTimer
 from test_data_fetcher import TestDataFetcher
 from monitor_engine import MonitorEngine
+from tick_recorder import TickRecorder
+from market_session import (CALL_AUCTION, CLOSED, CLOSING_AUCTION, CONTINUOUS, MarketSession,
+                            PollSchedule, load_holidays)
 from gui.main_window import MainWindow
 from gui.alert_window import AlertWindow
+from gui.fetch_worker import FetchWorker
+from gui.tray_notifier import TrayNotifier
+from notifier import alert_records, load_notifier
 
-def main():
+def main(config_file=None, data_dir=None):
+    """
+    config_file: 配置文件路径，默认取环境变量 STOCK_MONITOR_CONFIG，否则为程序目录下的 stock_config.json；
+    data_dir: 逐笔行情 (ticks)、notify.json 和 holidays.txt 所在目录，
+              默认取环境变量 STOCK_MONITOR_DATA，否则为配置文件所在目录。
+    """
     app = QApplication(sys.argv)
     
     fetcher = TestDataFetcher()
-    engine = MonitorEngine()
+    # 阈值修改后由后台线程合并写入配置文件，不阻塞界面；
+    # 价格在阈值附近波动时用 0.2% 的滞回带和 60 秒冷却避免预警反复出现/消失
+    config_file = config_file or os.environ.get("STOCK_MONITOR_CONFIG") or "stock_config.json"
+    engine = MonitorEngine(config_file, write_behind=True, hysteresis=0.002, cooldown=60)
     engine.load_config()  # 加载配置文件
+    data_dir = data_dir or os.environ.get("STOCK_MONITOR_DATA") or os.path.dirname(engine.config_file)
+    # 逐笔行情按交易日记录在数据目录下的 ticks 目录
+    engine.recorder = TickRecorder(os.path.join(data_dir, "ticks"))
+    
+    # 预警变化除了显示在预警窗口，还发送到桌面通知和 notify.json 中配置的日志、webhook、邮件
+    tray = TrayNotifier()
+    notifier = load_notifier(os.path.join(data_dir, "notify.json"), tray.show)
     
     main_window = MainWindow(engine, fetcher)
     alert_window = AlertWindow(engine)
     
     # 连接 alert_window 的信号到 main_window 的刷新方法
     alert_window.data_changed.connect(main_window.refresh_table)
+    # 主窗口增删股票或修改阈值后，预警列表可能变化
+    main_window.data_changed.connect(
+        lambda: alert_window.update_alerts(engine.get_alerting_stocks()))
+    # 修改阈值引起的预警变化与行情刷新一样发送通知
+    def on_alert_events(events):
+        notifier.submit(alert_records(engine, events))
     
-    def refresh_data():
-        stock_codes = [s.code for s in engine.get_all_stocks()]
-        if stock_codes:
-            data = fetcher.get_realtime_quotes(stock_codes)
-            engine.update_stocks_data(data)
-            main_window.refresh_table()
-            
+    main_window.alert_events.connect(on_alert_events)
+    alert_window.alert_events.connect(on_alert_events)
+    
+    # 行情抓取放到后台线程，避免网络阻塞界面
+    worker = FetchWorker(fetcher)
+    
+    def on_data_ready(data):
+        changes = engine.update_stocks_data(data)
+        # 行情没有变化 (停牌、午休等) 时不重绘
+        if not changes:
+            return
+        main_window.refresh_table(changes)
+        if changes.events:
+            notifier.submit(alert_records(engine, changes.events))
+        
+        if changes.alerts_changed:
             alerting_stocks = engine.get_alerting_stocks()
             alert_window.update_alerts(alerting_stocks)
+    
+    worker.data_ready.connect(on_data_ready)
+    
+    def refresh_data():
+        now = time.time()
+        if schedule.phase(now) == CLOSED:
+            # 收盘快照: 全部股票。抓取进行中时排队，不能跳过，否则当天不会再抓取收盘价
+            worker.request_batches([[s.code for s in engine.get_all_stocks()]], queue=True)
+            return
+        # 按离阈值远近分级，只抓取到期的级别，每级一批；
+        # 上一次抓取尚未完成时由 worker 跳过本次并计数，到期的级别留到下一次
+        worker.request_batches(lambda: engine.poll_batches(now))
 
-    # 设置定时器，每 5 秒刷新一次
+    # 只在交易时段内刷新，午休、收盘后和节假日暂停，收盘后再抓取一次收盘快照；
+    # 交易时段内按最快一级的间隔检查哪些级别到期。节假日列表放在数据目录下的 holidays.txt 中
+    holidays = load_holidays(os.path.join(data_dir, "holidays.txt"))
+    tick = engine.polling.intervals[0]
+    session = MarketSession(holidays, {CALL_AUCTION: tick, CONTINUOUS: tick, CLOSING_AUCTION: tick})
+    schedule = PollSchedule(session, time.time())
     timer = QTimer()
-    timer.timeout.connect(refresh_data)
-    timer.start(5000)
+    timer.setSingleShot(True)
+    
+    def on_timer():
+        if schedule.due(time.time()):
+            refresh_data()
+        timer.start(int(schedule.wait_time(time.time()) * 1000))
+    
+    timer.timeout.connect(on_timer)
+    timer.start(0)
+    
+    def fetch_unquoted():
+        # 休市期间 (启动时、新增股票后) 按计划要到下一次开盘才抓取，表格会一直显示 0，
+        # 因此立即补抓一次还没有行情的股票；请求过仍没有行情的 (代码无效、停牌) 不再重复抓取，
+        # 交易时段内由分级抓取负责
+        if session.is_open(time.time()):
+            return
+        # 上一次抓取尚未完成时排队，结束后立即补抓
+        worker.request_batches([engine.take_unquoted()], queue=True)
+    
+    fetch_unquoted()
+    main_window.data_changed.connect(fetch_unquoted)
+    
+    # 后台线程停止后再关闭连接池；抓取超时未结束时等线程结束后再关闭
+    app.aboutToQuit.connect(lambda: worker.stop(on_stopped=fetcher.close))
+    app.aboutToQuit.connect(notifier.close)  # 尽量发出剩余的通知
+    app.aboutToQuit.connect(engine.close)   # 写出尚未保存的配置
+    app.aboutToQuit.connect(engine.recorder.close)  # 写出缓冲的逐笔行情
     
     main_window.show()
     
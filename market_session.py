@@ -0,0 +1,182 @@
+"""
+沪深交易时段与抓取计划。
+
+每个交易日 (北京时间) 的时段:
+
+    09:15-09:30  集合竞价 call_auction
+    09:30-11:30  连续竞价 continuous
+    11:30-13:00  午间休市 lunch_break
+    13:00-14:57  连续竞价 continuous
+    14:57-15:00  收盘集合竞价 closing_auction
+    其余时间     休市 closed (周末和节假日全天休市)
+
+沪市自 2018 年起与深市一样实行收盘集合竞价,两市时段相同。
+每个时段的抓取间隔可以配置,间隔为 None 的时段不抓取;
+收盘后 post_close_delay 秒额外抓取一次,取得收盘价作为当天最后的快照。
+抓取时间按时段起点对齐 (起点 + k * 间隔),与每次抓取的耗时无关,不会漂移。
+
+节假日由调用方提供 (交易所每年公布一次),可以用 load_holidays 从文件读取。
+"""
+import json
+import math
+import os
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+# 北京时间没有夏令时,固定 UTC+8
+CHINA_TZ = timezone(timedelta(hours=8), 'Asia/Shanghai')
+
+CALL_AUCTION = 'call_auction'
+CONTINUOUS = 'continuous'
+LUNCH_BREAK = 'lunch_break'
+CLOSING_AUCTION = 'closing_auction'
+CLOSED = 'closed'
+
+PHASE_NAMES = {
+    CALL_AUCTION: '集合竞价',
+    CONTINUOUS: '连续竞价',
+    LUNCH_BREAK: '午间休市',
+    CLOSING_AUCTION: '收盘集合竞价',
+    CLOSED: '休市',
+}
+
+# 交易日内各时段的起点,最后一个时段持续到下一个交易日开盘
+SESSION_PHASES = (
+    (dtime(9, 15), CALL_AUCTION),
+    (dtime(9, 30), CONTINUOUS),
+    (dtime(11, 30), LUNCH_BREAK),
+    (dtime(13, 0), CONTINUOUS),
+    (dtime(14, 57), CLOSING_AUCTION),
+    (dtime(15, 0), CLOSED),
+)
+MARKET_CLOSE = dtime(15, 0)
+
+# 各时段的默认抓取间隔 (秒),None 表示不抓取
+DEFAULT_INTERVALS: Dict[str, Optional[float]] = {
+    CALL_AUCTION: 5.0,
+    CONTINUOUS: 5.0,
+    LUNCH_BREAK: None,
+    CLOSING_AUCTION: 5.0,
+    CLOSED: None,
+}
+
+def load_holidays(path: str) -> set:
+    """
+    从文件读取节假日: JSON 日期列表,或每行一个 YYYY-MM-DD (# 开头为注释)。
+    文件不存在时返回空集合。
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        values = json.loads(text)
+    else:
+        values = [line.split('#', 1)[0].strip() for line in text.splitlines()]
+    return {date.fromisoformat(value) for value in values if value}
+
+class MarketSession:
+    """按北京时间判断交易时段,并计算下一次应抓取的时间"""
+
+    def __init__(self, holidays: Iterable = (), intervals: Optional[Dict[str, Optional[float]]] = None,
+                 post_close_delay: Optional[float] = 30.0):
+        self.holidays = {value if isinstance(value, date) else date.fromisoformat(value) for value in holidays}
+        self.intervals = dict(DEFAULT_INTERVALS)
+        if intervals:
+            unknown = set(intervals) - set(DEFAULT_INTERVALS)
+            if unknown:
+                raise ValueError(f"未知的交易时段: {', '.join(sorted(unknown))}")
+            self.intervals.update(intervals)
+        for phase, interval in self.intervals.items():
+            if interval is not None and interval <= 0:
+                raise ValueError(f"{phase} 的抓取间隔必须大于 0")
+        # None 表示收盘后不额外抓取
+        self.post_close_delay = post_close_delay
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def _day_phases(self, day: date):
+        """某个交易日各时段的 (起点时间戳, 时段)"""
+        return [(datetime.combine(day, start, CHINA_TZ).timestamp(), phase) for start, phase in SESSION_PHASES]
+
+    def _next_open(self, day: date) -> float:
+        """day 之后 (不含) 第一个交易日的开盘时间戳"""
+        for _ in range(366):
+            day += timedelta(days=1)
+            if self.is_trading_day(day):
+                return self._day_phases(day)[0][0]
+        raise ValueError("一年内没有交易日,请检查节假日设置")
+
+    def phase_at(self, ts: float) -> Tuple[str, float, float]:
+        """返回 ts 所在的 (时段, 起点时间戳, 终点时间戳)"""
+        day = datetime.fromtimestamp(ts, CHINA_TZ).date()
+        if self.is_trading_day(day):
+            phases = self._day_phases(day)
+            if ts >= phases[0][0]:
+                for i, (start, phase) in enumerate(phases):
+                    end = phases[i + 1][0] if i + 1 < len(phases) else self._next_open(day)
+                    if ts < end:
+                        return phase, start, end
+        # 开盘前、周末或节假日: 休市从上一个交易日收盘算起
+        previous = day
+        for _ in range(366):
+            previous -= timedelta(days=1)
+            if self.is_trading_day(previous):
+                break
+        start = datetime.combine(previous, MARKET_CLOSE, CHINA_TZ).timestamp()
+        end = self._next_open(day - timedelta(days=1))
+        return CLOSED, start, end
+
+    def is_open(self, ts: float) -> bool:
+        return self.intervals[self.phase_at(ts)[0]] is not None
+
+    def next_fetch(self, after: float, inclusive: bool = False) -> float:
+        """
+        after 之后 (inclusive 时含 after) 下一次应抓取的时间戳:
+        有抓取间隔的时段内为 起点 + k * 间隔,休市时为收盘快照时间或下一个可抓取时段的起点。
+        """
+        cursor = after
+        for _ in range(64):
+            phase, start, end = self.phase_at(cursor)
+            interval = self.intervals[phase]
+            if interval is not None:
+                steps = (cursor - start) / interval
+                k = math.ceil(steps) if inclusive or cursor > after else math.floor(steps) + 1
+                due = start + k * interval
+                if due < end:
+                    return due
+            elif phase == CLOSED and self.post_close_delay is not None:
+                snapshot = start + self.post_close_delay
+                # 只有真正的收盘 (15:00) 之后才有收盘快照
+                closing = datetime.fromtimestamp(start, CHINA_TZ)
+                if (closing.time() == MARKET_CLOSE and snapshot < end
+                        and (snapshot > after or (inclusive and snapshot == after))):
+                    return snapshot
+            cursor = end
+        raise ValueError("找不到下一次抓取时间,请检查抓取间隔设置")
+
+class PollSchedule:
+    """
+    根据 MarketSession 安排抓取: 到点时 due() 返回 True 并计算下一次的时间;
+    错过的抓取点 (例如抓取耗时过长、休眠唤醒) 直接跳过,不连续补抓。
+    wait_time 把等待时间限制在 max_wait 以内,长时间休市期间定期醒来重新核对时间。
+    """
+
+    def __init__(self, session: MarketSession, now: float, max_wait: float = 60.0):
+        self.session = session
+        self.max_wait = max_wait
+        self.next_due = session.next_fetch(now, inclusive=True)
+
+    def due(self, now: float) -> bool:
+        # 定时器可能提前几毫秒触发
+        if now < self.next_due - 0.005:
+            return False
+        self.next_due = self.session.next_fetch(max(now, self.next_due))
+        return True
+
+    def wait_time(self, now: float) -> float:
+        return min(max(self.next_due - now, 0.0), self.max_wait)
+
+    def phase(self, now: float) -> str:
+        return self.session.phase_at(now)[0]
@@ -0,0 +1,92 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+# pandas 和 AkShare 只在真正下载全市场快照时才导入,不拖慢程序启动
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 东方财富全市场行情列名 -> 行情字典字段
+EM_COLUMNS = {
+    'price': '最新价',
+    'pct_change': '涨跌幅',
+    'volume': '成交量',
+    'high': '最高',
+    'low': '最低',
+    'amount': '成交额',
+}
+
+def _load_em_spot() -> 'pd.DataFrame':
+    """通过 AkShare 获取东方财富全市场实时行情"""
+    import akshare as ak
+    return ak.stock_zh_a_spot_em()
+
+class MarketSnapshotCache:
+    """
+    全市场行情快照缓存。
+
+    全市场数据(5000+ 行)在 ttl 秒内只下载一次,下载后转换为按列存放的数组,
+    并建立 代码 -> 行号 索引;查询时只为请求的代码构造行情字典。
+    实例可以在多个 fetcher / 线程之间共享。
+    """
+
+    def __init__(self, loader: Optional[Callable[[], 'pd.DataFrame']] = None, ttl: float = 30.0):
+        self.loader = loader or _load_em_spot
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index: Dict[str, int] = {}
+        self._names = []
+        self._columns: Dict[str, list] = {}
+        self._loaded_at: Optional[float] = None
+        self.load_count = 0
+        self.last_error: Optional[Exception] = None  # 最近一次下载失败的异常,成功时为 None
+
+    def get(self, stock_codes: List[str]) -> List[Dict]:
+        """返回 stock_codes 中在快照里存在的代码的行情字典,顺序与 stock_codes 一致"""
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._refresh()
+            index, names, columns = self._index, self._names, self._columns
+
+        results = []
+        for code in stock_codes:
+            i = index.get(code)
+            if i is None:
+                continue
+            item = {'code': code, 'name': names[i]}
+            for key, values in columns.items():
+                item[key] = values[i]
+            results.append(item)
+        return results
+
+    def invalidate(self):
+        """丢弃当前快照,下次查询时重新下载"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _refresh(self):
+        # 无论成功与否都记录时间,失败时在 ttl 内不会反复拉取全市场数据
+        self._loaded_at = time.monotonic()
+        self.load_count += 1
+        try:
+            df = self.loader()
+            self.last_error = None
+        except Exception as e:
+            print(f"AkShare 接口失败: {e}")
+            self.last_error = e
+            df = None
+        if df is None or df.empty:
+            self._index, self._names, self._columns = {}, [], {}
+            return
+
+        import pandas as pd
+        codes = df['代码'].astype(str).tolist()
+        self._index = {code: i for i, code in enumerate(codes)}
+        self._names = df['名称'].astype(str).tolist()
+        self._columns = {
+            key: pd.to_numeric(df[column], errors='coerce').fillna(0.0).astype(float).tolist()
+            for key, column in EM_COLUMNS.items()
+        }
+
+# 进程内共享的快照,连续多次兜底请求在 ttl 内复用同一份数据
+shared_snapshot = MarketSnapshotCache()
@@ -1,39 +1,122 @@
 from typing import List, Dict, Optional
 import time
-import json
+import operator
 import os
 import sys
+import numpy as np
+from quote_store import QuoteStore, DATA_FIELDS
+from quote_store import THRESHOLD_FIELDS
+from alert_rules import OPS, OP_DIRECTION, THRESHOLD_SPECS, THRESHOLD_SPEC_BY_KEY, Rule, RuleIndex, is_indexable, rule_from_dict
+from indicators import IndicatorEngine, INDICATOR_FIELDS
+from alert_state import AlertEvent, AlertStates
+from polling_tiers import PollingTiers, field_distance
+from config_persister import ConfigPersister, write_json_atomic
+from config_schema import CONFIG_VERSION, loads_config
+
+def _data_property(field):
+    def getter(self):
+        return float(self._store.columns[field][self._row])
+
+    def setter(self, value):
+        self._store.columns[field][self._row] = value
+    return property(getter, setter)
+
+def _indicator_property(field):
+    # 技术指标只读,历史不足时为 None
+    def getter(self):
+        value = self._store.columns[field][self._row]
+        return None if value != value else float(value)
+    return property(getter)
+
+def _threshold_property(field):
+    # 未设置的阈值在表中存为 NaN,对外仍表现为 None
+    def getter(self):
+        value = self._store.columns[field][self._row]
+        return None if value != value else float(value)
+
+    def setter(self, value):
+        self._store.columns[field][self._row] = np.nan if value is None else value
+    return property(getter, setter)
+
+def _flag_property(field):
+    # 开关型阈值: 开启时列中存 1,关闭时为 NaN
+    def getter(self):
+        return bool(self._store.columns[field][self._row] == 1.0)
+
+    def setter(self, value):
+        self._store.columns[field][self._row] = 1.0 if value else np.nan
+    return property(getter, setter)
+
+# 每个阈值列编译一次: (阈值描述, 单值比较, 按列比较)
+_THRESHOLD_CHECKS = tuple((spec,) + OPS[spec.op] for spec in THRESHOLD_SPECS)
 
 class StockItem:
-    def __init__(self, code: str, name: str = ""):
+    """
+    单只股票的行情、阈值和预警状态。
+    数值字段存放在 QuoteStore 的一行中,本对象只是该行的视图;
+    不指定 store 时使用一个只有一行的私有表。
+    阈值属性 (upper_price、lower_pct、alert_ma_cross 等) 由 alert_rules.THRESHOLD_SPECS 生成,
+    rules 为另外设置的自定义规则 (Rule / All / Any)。
+    """
+    __slots__ = ('code', 'name', 'alert_reasons', '_store', '_row', '_rules')
+
+    def __init__(self, code: str, name: str = "", store: Optional[QuoteStore] = None):
         self.code = code
         self.name = name
-        self.price = 0.0
-        self.pct_change = 0.0
-        self.volume = 0.0
-        self.high = 0.0
-        self.low = 0.0
-        self.amount = 0.0
-        
-        # 阈值设置 - 价格和涨跌幅
-        self.upper_price = None
-        self.lower_price = None
-        self.upper_pct = None
-        self.lower_pct = None
-        
-        # 阈值设置 - 其他字段
-        self.upper_volume = None
-        self.lower_volume = None
-        self.upper_high = None
-        self.lower_high = None
-        self.upper_low = None
-        self.lower_low = None
-        self.upper_amount = None
-        self.lower_amount = None
-        
-        # 预警状态
-        self.is_alerting = False
+        # 预警原因
         self.alert_reasons = []
+        self._rules = ()
+        self._store = store if store is not None else QuoteStore(capacity=1)
+        self._row = self._store._attach(self)
+
+    @classmethod
+    def create_many(cls, store: QuoteStore, codes: List[str], names: List[str]) -> List['StockItem']:
+        """在 store 中一次性创建多只股票的视图 (不逐只扩容)"""
+        items = []
+        for code, name in zip(codes, names):
+            item = cls.__new__(cls)
+            item.code = code
+            item.name = name
+            item.alert_reasons = []
+            item._rules = ()
+            items.append(item)
+        store.extend(items)
+        return items
+
+    # 行情数据
+    price = _data_property('price')
+    pct_change = _data_property('pct_change')
+    volume = _data_property('volume')
+    high = _data_property('high')
+    low = _data_property('low')
+    amount = _data_property('amount')
+
+    # 技术指标 (由 MonitorEngine 的 IndicatorEngine 计算)
+    ma = _indicator_property('ma')
+    ma_cross = _indicator_property('ma_cross')
+    move_pct = _indicator_property('move_pct')
+    volume_ratio = _indicator_property('volume_ratio')
+    volatility = _indicator_property('volatility')
+
+    @property
+    def rules(self) -> tuple:
+        """自定义规则"""
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules):
+        self._rules = tuple(rules)
+        # 通知 MonitorEngine 重新建立规则索引
+        self._store.rules_dirty = True
+
+    # 预警状态
+    @property
+    def is_alerting(self) -> bool:
+        return bool(self._store.alerting[self._row])
+
+    @is_alerting.setter
+    def is_alerting(self, value: bool):
+        self._store.alerting[self._row] = value
 
     def update_data(self, data: Dict):
         self.name = data.get('name', self.name)
@@ -52,50 +135,98 @@ class StockItem:
         self.lower_pct = lower_pct
         self.check_alerts()
 
+    def update_thresholds(self, thresholds: Dict, check: bool = True):
+        """
+        按 阈值名 -> 值 (None 表示不设置) 修改阈值并重新检查,未给出的阈值保持不变。
+        由 MonitorEngine 管理的股票应调用 MonitorEngine.update_thresholds (check=False,由引擎重新检查)。
+        """
+        for key in thresholds:
+            if key not in THRESHOLD_SPEC_BY_KEY:
+                raise ValueError(f"未知的阈值: {key}")
+        for key, value in thresholds.items():
+            setattr(self, key, value)
+        if check:
+            self.check_alerts()
+
+    def field_values(self, fields) -> Dict[str, float]:
+        columns, row = self._store.columns, self._row
+        return {field: float(columns[field][row]) for field in fields}
+
     def check_alerts(self):
+        """检查单只股票的阈值和自定义规则 (批量更新时由 MonitorEngine 按列统一计算)"""
         self.alert_reasons = []
-        
-        # 检查价格阈值
-        if self.upper_price is not None and self.price >= self.upper_price:
-            self.alert_reasons.append(f"价格突破上限: {self.price} >= {self.upper_price}")
-        if self.lower_price is not None and self.price <= self.lower_price:
-            self.alert_reasons.append(f"价格跌破下限: {self.price} <= {self.lower_price}")
-        
-        # 检查涨跌幅阈值
-        if self.upper_pct is not None and self.pct_change >= self.upper_pct:
-            self.alert_reasons.append(f"涨幅超过上限: {self.pct_change}% >= {self.upper_pct}%")
-        if self.lower_pct is not None and self.pct_change <= self.lower_pct:
-            self.alert_reasons.append(f"跌幅超过下限: {self.pct_change}% <= {self.lower_pct}%")
-        
-        # 检查成交量阈值
-        if self.upper_volume is not None and self.volume >= self.upper_volume:
-            self.alert_reasons.append(f"成交量超过上限: {self.volume} >= {self.upper_volume}")
-        if self.lower_volume is not None and self.volume <= self.lower_volume:
-            self.alert_reasons.append(f"成交量低于下限: {self.volume} <= {self.lower_volume}")
-        
-        # 检查最高价阈值
-        if self.upper_high is not None and self.high >= self.upper_high:
-            self.alert_reasons.append(f"最高价超过上限: {self.high} >= {self.upper_high}")
-        if self.lower_high is not None and self.high <= self.lower_high:
-            self.alert_reasons.append(f"最高价低于下限: {self.high} <= {self.lower_high}")
-        
-        # 检查最低价阈值
-        if self.upper_low is not None and self.low >= self.upper_low:
-            self.alert_reasons.append(f"最低价超过上限: {self.low} >= {self.upper_low}")
-        if self.lower_low is not None and self.low <= self.lower_low:
-            self.alert_reasons.append(f"最低价低于下限: {self.low} <= {self.lower_low}")
-        
-        # 检查成交额阈值
-        if self.upper_amount is not None and self.amount >= self.upper_amount:
-            self.alert_reasons.append(f"成交额超过上限: {self.amount} >= {self.upper_amount}")
-        if self.lower_amount is not None and self.amount <= self.lower_amount:
-            self.alert_reasons.append(f"成交额低于下限: {self.amount} <= {self.lower_amount}")
+        columns, row = self._store.columns, self._row
+        for spec, test, _ in _THRESHOLD_CHECKS:
+            value = float(columns[spec.field][row])
+            threshold = float(columns[spec.key][row])
+            if test(value, threshold):
+                self.alert_reasons.append(spec.describe(value, threshold))
+        for rule in self._rules:
+            values = self.field_values(rule.fields())
+            if rule.test(values):
+                self.alert_reasons.append(rule.describe(values))
         
         self.is_alerting = len(self.alert_reasons) > 0
 
+# 阈值属性,例如 upper_price / lower_price 对应列 'upper_price' / 'lower_price'
+for _spec in THRESHOLD_SPECS:
+    setattr(StockItem, _spec.key, _flag_property(_spec.key) if _spec.flag else _threshold_property(_spec.key))
+del _spec
+
+# 行情字典中各数值字段,按 DATA_FIELDS 的顺序一次取出
+_get_data_fields = operator.itemgetter(*DATA_FIELDS)
+
+def _positions(index):
+    """np.nonzero 的结果转为 (行, 列) 的 Python 整数对"""
+    return zip(*(axis.tolist() for axis in index))
+
+class ChangeSet:
+    """
+    一次 update_stocks_data 的变化集合。
+    changed: 数值或名称发生变化的代码,以及冷却结束后重新检查的代码
+    alert_on / alert_off: 由未预警变为预警 / 由预警恢复正常的代码
+    alerting: changed 中当前处于预警状态的代码 (预警原因可能随数值变化)
+    events: 各规则的状态变化 (AlertEvent,触发或解除)
+    """
+    __slots__ = ('changed', 'alert_on', 'alert_off', 'alerting', 'events')
+
+    def __init__(self, changed=None, alert_on=None, alert_off=None, alerting=None, events=None):
+        self.changed: List[str] = changed or []
+        self.alert_on: List[str] = alert_on or []
+        self.alert_off: List[str] = alert_off or []
+        self.alerting: List[str] = alerting or []
+        self.events: List[AlertEvent] = events or []
+
+    def __bool__(self):
+        return bool(self.changed)
+
+    @property
+    def alerts_changed(self) -> bool:
+        """预警列表 (成员或内容) 是否需要更新"""
+        return bool(self.alert_on or self.alert_off or self.alerting or self.events)
+
+    def __repr__(self):
+        return (f"ChangeSet(changed={len(self.changed)}, alert_on={self.alert_on}, "
+                f"alert_off={self.alert_off})")
+
 class MonitorEngine:
-    def __init__(self, config_file: str = "stock_config.json"):
+    def __init__(self, config_file: str = "stock_config.json", write_behind: bool = False,
+                 save_delay: float = 1.0, recorder=None, indicators: Optional[IndicatorEngine] = None,
+                 hysteresis: float = 0.0, cooldown: float = 0.0, polling: Optional[PollingTiers] = None):
+        # 所有股票的数值存放在同一张列式表中,stocks 按代码索引对应的 StockItem 视图
+        self.store = QuoteStore()
         self.stocks: Dict[str, StockItem] = {}
+        # 均线、短时涨跌幅、量比等滚动指标,每次刷新后写入 store 的指标列
+        self.indicators = indicators if indicators is not None else IndicatorEngine()
+        # 每只股票每条规则的预警状态;hysteresis 为滞回带 (阈值的比例),cooldown 为解除后的冷却秒数
+        self.alert_states = AlertStates(len(THRESHOLD_SPECS), hysteresis, cooldown)
+        # 按离阈值远近分级抓取 (见 poll_batches)
+        self.polling = polling if polling is not None else PollingTiers()
+        # 已经请求过但仍没有行情的代码 (代码无效、停牌、退市等),之后只在最慢一级重试
+        self._unquoted_requested: set = set()
+        # 自定义规则的索引,规则变化后在下一次检查时重建
+        self._rule_index = RuleIndex()
+        self._rule_groups = []
         # 确保配置文件保存在程序运行目录
         if not os.path.isabs(config_file):
             # 如果是相对路径，保存在程序所在目录
@@ -108,24 +239,342 @@ class MonitorEngine:
             self.config_file = os.path.join(app_dir, config_file)
         else:
             self.config_file = config_file
+        
+        # write_behind 时 save_config 只提交快照,由后台线程合并短时间内的多次修改后写入
+        self._persister = ConfigPersister(self.config_file, save_delay) if write_behind else None
+        # 可选的逐笔行情记录器 (TickRecorder),每次刷新后记录数值发生变化的股票
+        self.recorder = recorder
 
     def add_stock(self, code: str):
         if code not in self.stocks:
-            self.stocks[code] = StockItem(code)
+            self.stocks[code] = StockItem(code, store=self.store)
             return True
         return False
 
     def remove_stock(self, code: str):
         if code in self.stocks:
             del self.stocks[code]
+            self.store.remove(code)
+            self.indicators.remove(code)
+            self.alert_states.remove(code)
+            self._unquoted_requested.discard(code)
             return True
         return False
 
-    def update_stocks_data(self, realtime_data: List[Dict]):
-        for data in realtime_data:
-            code = data['code']
-            if code in self.stocks:
-                self.stocks[code].update_data(data)
+    def update_stocks_data(self, realtime_data: List[Dict], ts: Optional[float] = None) -> 'ChangeSet':
+        """
+        批量写入行情、更新技术指标并按列统一检查阈值,返回本次的变化集合。
+        ts 为行情时间 (默认当前时间),用于按时间窗口计算的指标和逐笔记录。
+        数值和名称都没有变化的股票不会重新检查阈值,冷却刚结束的股票除外;
+        只为触发预警的股票生成预警原因文字。
+        """
+        store = self.store
+        ts = time.time() if ts is None else ts
+        # 冷却结束是按时间发生的状态变化,价格不变 (午休、停牌、慢速级别) 也要重新检查
+        expired = [code for code in self.alert_states.expire(ts) if code in store.index]
+        batch = [data for data in realtime_data if data['code'] in store.index]
+        rows = store.rows([data['code'] for data in batch])
+
+        # 一次取出所有字段 (缺少字段的行情按 0 处理),再按列比较
+        try:
+            table = np.array([_get_data_fields(data) for data in batch], dtype=float)
+        except KeyError:
+            table = np.array([[data.get(field, 0.0) for field in DATA_FIELDS] for data in batch], dtype=float)
+        table = table.reshape(len(batch), len(DATA_FIELDS))
+        changed = np.zeros(len(rows), dtype=bool)
+        new_values = {}
+        for k, field in enumerate(DATA_FIELDS):
+            values = table[:, k]
+            changed |= store.columns[field][rows] != values
+            new_values[field] = values
+        items = store.items
+        for i, (data, row) in enumerate(zip(batch, rows.tolist())):
+            name = data.get('name')
+            if name is not None and name != items[row].name:
+                items[row].name = name
+                changed[i] = True
+
+        rows = rows[changed]
+        if len(rows):
+            for field in DATA_FIELDS:
+                new_values[field] = new_values[field][changed]
+                store.columns[field][rows] = new_values[field]
+            codes = store.codes
+            changed_codes = [codes[row] for row in rows.tolist()]
+            indicator_values = self.indicators.update(changed_codes, ts, new_values['price'], new_values['volume'])
+            for field in INDICATOR_FIELDS:
+                store.columns[field][rows] = indicator_values[field]
+            if self.recorder is not None:
+                self.recorder.record(changed_codes, new_values, ts)
+        if expired:
+            expired_rows = store.rows(expired)
+            expired_rows = expired_rows[store.columns['price'][expired_rows] != 0]
+            rows = np.union1d(rows, expired_rows).astype(rows.dtype)
+        if not len(rows):
+            return ChangeSet()
+        codes = store.codes
+        return self._check_rows(rows, [codes[row] for row in rows.tolist()], ts)
+
+    def _check_rows(self, rows: np.ndarray, codes: List[str], now: float) -> 'ChangeSet':
+        """检查指定行的预警并汇总为 ChangeSet"""
+        store = self.store
+        was_alerting = store.alerting[rows]
+        events = self._evaluate_alerts(rows, codes, now)
+        is_alerting = store.alerting[rows]
+        codes = store.codes
+        return ChangeSet(
+            changed=[codes[row] for row in rows.tolist()],
+            events=events,
+            alert_on=[codes[row] for row in rows[is_alerting & ~was_alerting].tolist()],
+            alert_off=[codes[row] for row in rows[was_alerting & ~is_alerting].tolist()],
+            alerting=[codes[row] for row in rows[is_alerting].tolist()]
+        )
+
+    def update_thresholds(self, code: str, thresholds: Dict, now: Optional[float] = None) -> 'ChangeSet':
+        """
+        修改某只股票的阈值 (格式见 StockItem.update_thresholds) 并重新检查,
+        返回的 ChangeSet 与行情刷新一样包含预警的触发/解除事件。
+        """
+        stock = self.stocks.get(code)
+        if stock is None:
+            return ChangeSet()
+        stock.update_thresholds(thresholds, check=False)
+        return self.reevaluate([code], now)
+
+    def reevaluate(self, codes: List[str], now: Optional[float] = None) -> 'ChangeSet':
+        """
+        阈值或自定义规则修改后,按当前行情重新检查指定股票。
+        与行情刷新经过同一个状态机 (滞回、冷却),返回包含触发/解除事件的 ChangeSet;
+        还没有行情的股票跳过,收到第一笔行情时再检查。
+        """
+        store = self.store
+        rows = store.rows([code for code in dict.fromkeys(codes) if code in store.index])
+        rows = rows[store.columns['price'][rows] != 0]
+        if not len(rows):
+            return ChangeSet()
+        codes = store.codes
+        return self._check_rows(rows, [codes[row] for row in rows.tolist()], time.time() if now is None else now)
+
+    def _evaluate_alerts(self, rows: np.ndarray, codes: List[str], now: float) -> List[AlertEvent]:
+        """
+        对指定行一次性比较所有阈值列 (未设置的阈值为 NaN,比较结果恒为 False),
+        再检查这些行上的自定义规则;比较结果经过状态机 (滞回、冷却) 得到预警状态。
+        返回本次的状态变化事件。
+        """
+        store = self.store
+        columns = store.columns
+        states = self.alert_states
+        band = states.hysteresis
+        hit = np.empty((len(rows), len(_THRESHOLD_CHECKS)), dtype=bool)
+        hold = np.empty_like(hit)
+        checked = []
+        for j, (spec, _, column_test) in enumerate(_THRESHOLD_CHECKS):
+            values = columns[spec.field][rows]
+            thresholds = columns[spec.key][rows]
+            hit[:, j] = column_test(values, thresholds)
+            if band > 0 and not spec.flag:
+                # 解除条件放宽到滞回带之外
+                hold[:, j] = column_test(values, thresholds - OP_DIRECTION[spec.op] * band * np.abs(thresholds))
+            else:
+                hold[:, j] = hit[:, j]
+            checked.append((values, thresholds))
+        triggered, fired, released = states.update(codes, hit, hold, now)
+
+        rule_reasons, events = self._evaluate_rules(rows, codes, now)
+        alerting = triggered.any(axis=1)
+        if rule_reasons:
+            position = {row: i for i, row in enumerate(rows.tolist())}
+            alerting[[position[row] for row in rule_reasons]] = True
+
+        items = store.items
+        was_alerting = store.alerting[rows]
+        store.alerting[rows] = alerting
+        for row in rows[was_alerting & ~alerting].tolist():
+            items[row].alert_reasons = []
+
+        # 只为处于预警状态的股票生成原因文字,顺序与 StockItem.check_alerts 一致
+        texts = {}
+        for i, j in _positions(np.nonzero(triggered & hit)):
+            spec = _THRESHOLD_CHECKS[j][0]
+            values, thresholds = checked[j]
+            texts[i, j] = spec.describe(values.item(i), thresholds.item(i))
+            # 记住原因: 数值处于滞回带内时沿用,解除事件也带上它
+            states.reasons[codes[i], spec.key] = texts[i, j]
+        for i, j in _positions(np.nonzero(triggered & ~hit)):
+            # 数值处于滞回带内: 沿用上次条件满足时的原因
+            texts[i, j] = states.reasons.get((codes[i], _THRESHOLD_CHECKS[j][0].key), "")
+
+        for i, j in _positions(fired):
+            events.append(AlertEvent(codes[i], _THRESHOLD_CHECKS[j][0].key, 'triggered', now, texts[i, j]))
+        for i, j in _positions(released):
+            key = _THRESHOLD_CHECKS[j][0].key
+            events.append(AlertEvent(codes[i], key, 'cleared', now, states.reasons.pop((codes[i], key), "")))
+
+        if alerting.any():
+            reasons = {}
+            for (i, j), text in sorted(texts.items()):
+                reasons.setdefault(i, []).append(text)
+            row_list = rows.tolist()
+            for i in np.flatnonzero(alerting).tolist():
+                row = row_list[i]
+                items[row].alert_reasons = reasons.get(i, []) + rule_reasons.get(row, [])
+        return events
+
+    def _rebuild_rules(self):
+        """
+        根据各股票的自定义规则重建索引:
+        简单规则放入 RuleIndex,按 (字段, 运算) 分组一次比较所有股票;
+        组合规则按内容分组,同一条规则对持有它的所有股票一次按列计算。
+        """
+        store = self.store
+        entries = []
+        groups: Dict = {}
+        for item in store.items:
+            for rule in item.rules:
+                if is_indexable(rule):
+                    entries.append((item._row, rule))
+                else:
+                    groups.setdefault(rule, []).append(item._row)
+        self._rule_index = RuleIndex(entries)
+        self._rule_groups = [(rule, np.array(rule_rows, dtype=np.intp)) for rule, rule_rows in groups.items()]
+        for item in store.items:
+            self.alert_states.retain_rules(item.code, item.rules)
+        store.rules_dirty = False
+
+    def _evaluate_rules(self, rows: np.ndarray, codes: List[str], now: float):
+        """
+        检查指定行上的自定义规则并更新其状态,
+        返回 (行号 -> 已触发规则的原因, 状态变化事件)。
+        """
+        store = self.store
+        if store.rules_dirty:
+            self._rebuild_rules()
+        if not self._rule_groups and not len(self._rule_index):
+            return {}, []
+        columns = store.columns
+        items = store.items
+        states = self.alert_states
+        in_tick = np.zeros(store.size, dtype=bool)
+        in_tick[rows] = True
+        # 行号 -> 满足条件的规则 -> 原因;只有满足条件的规则需要生成原因
+        hits: Dict[int, Dict] = {}
+        for row, rule in self._rule_index.triggered(columns, in_tick):
+            hits.setdefault(row, {})[rule] = rule.describe({rule.field: float(columns[rule.field][row])})
+
+        for rule, rule_rows in self._rule_groups:
+            active = rule_rows[in_tick[rule_rows]]
+            if not len(active):
+                continue
+            for row in active[rule.mask(columns, active)].tolist():
+                hits.setdefault(row, {})[rule] = rule.describe(items[row].field_values(rule.fields()))
+
+        # 没有满足的条件、但仍有规则处于已触发状态的股票也要更新 (解除)
+        for code in states.rule_alerting:
+            row = store.index.get(code)
+            if row is not None and in_tick[row]:
+                hits.setdefault(row, {})
+
+        # 按规则在股票中的顺序更新状态,原因顺序与 StockItem.check_alerts 一致
+        reasons: Dict[int, List[str]] = {}
+        events = []
+        for row in sorted(hits):
+            row_hits = hits[row]
+            item = items[row]
+            for rule in item.rules:
+                hit = rule in row_hits
+                kind = states.update_rule(item.code, rule, hit, now)
+                if kind == 'triggered':
+                    events.append(AlertEvent(item.code, rule, kind, now, row_hits[rule]))
+                elif kind == 'cleared':
+                    # 与阈值规则一样,解除事件带上最后一次触发时的原因
+                    events.append(AlertEvent(item.code, rule, kind, now, states.reasons.pop((item.code, rule), "")))
+                if hit and states.rule_triggered(item.code, rule):
+                    states.reasons[item.code, rule] = row_hits[rule]
+                    reasons.setdefault(row, []).append(row_hits[rule])
+        return reasons, events
+
+    def set_rules(self, code: str, rules, now: Optional[float] = None) -> 'ChangeSet':
+        """设置某只股票的自定义规则并重新检查,返回值同 update_thresholds"""
+        stock = self.stocks.get(code)
+        if stock is None:
+            return ChangeSet()
+        stock.rules = rules
+        return self.reevaluate([code], now)
+
+    def threshold_distance(self) -> np.ndarray:
+        """
+        每只股票 (按 store 行号) 离最近一个已设置阈值或自定义规则条件的距离,
+        按价格变动的百分比计 (见 polling_tiers);没有任何阈值时为 NaN。
+        """
+        store = self.store
+        rows = np.arange(store.size)
+        columns = store.columns
+        nearest = np.full(store.size, np.inf)
+        for spec in THRESHOLD_SPECS:
+            distance = field_distance(spec.field, spec.op, columns, rows, columns[spec.key][rows])
+            np.fmin(nearest, distance, out=nearest)
+        # 自定义规则只有少数股票使用,逐条计算每个比较条件
+        for item in store.items[:store.size]:
+            leaves = list(item.rules)
+            while leaves:
+                rule = leaves.pop()
+                if not isinstance(rule, Rule):
+                    leaves.extend(rule.rules)
+                    continue
+                row = np.array([item._row])
+                distance = field_distance(rule.field, rule.op, columns, row, rule.value)[0]
+                if distance == distance:
+                    nearest[item._row] = min(nearest[item._row], distance)
+        nearest[np.isinf(nearest)] = np.nan
+        return nearest
+
+    def polling_tiers(self) -> np.ndarray:
+        """
+        每只股票 (按 store 行号) 的抓取级别,0 为最快。
+        还没有行情的股票第一次在最快一级 (尽快取得第一笔行情),请求过仍没有行情的在最慢一级。
+        """
+        store = self.store
+        tiers = self.polling.classify(self.threshold_distance(), store.column('volatility'))
+        unquoted = np.flatnonzero(store.column('price') == 0)
+        if len(unquoted):
+            codes, requested = store.codes, self._unquoted_requested
+            slowest = len(self.polling.intervals) - 1
+            tiers[unquoted] = [slowest if codes[row] in requested else 0 for row in unquoted.tolist()]
+        return tiers
+
+    def take_unquoted(self) -> List[str]:
+        """
+        返回还没有行情、也还没有请求过的股票代码,并记为已请求。
+        用于休市期间补抓新增股票的第一笔行情,请求过仍没有行情的代码不再重复返回。
+        """
+        store = self.store
+        codes, requested = store.codes, self._unquoted_requested
+        result = [codes[row] for row in np.flatnonzero(store.column('price') == 0).tolist()
+                  if codes[row] not in requested]
+        requested.update(result)
+        return result
+
+    def poll_batches(self, now: Optional[float] = None) -> List[List[str]]:
+        """
+        返回此刻到期需要抓取的各级股票代码,每级一批 (由快到慢);没有到期的级别时返回空列表。
+        每次调用都按最新的行情和阈值重新分级,股票离阈值变近后在下一次快速级抓取时即被包含。
+        """
+        now = time.time() if now is None else now
+        due = self.polling.due(now)
+        if not due or not self.store.size:
+            return []
+        tiers = self.polling_tiers()
+        codes = self.store.codes
+        batches = []
+        for tier in due:
+            rows = np.flatnonzero(tiers == tier)
+            if len(rows):
+                batches.append([codes[row] for row in rows.tolist()])
+        if 0 in due:
+            # 最快一级中还没有行情的股票已请求过一次,之后移到最慢一级
+            unquoted = np.flatnonzero((tiers == 0) & (self.store.column('price') == 0))
+            self._unquoted_requested.update(codes[row] for row in unquoted.tolist())
+        return batches
 
     def get_alerting_stocks(self) -> List[StockItem]:
         return [stock for stock in self.stocks.values() if stock.is_alerting]
@@ -135,71 +584,105 @@ class MonitorEngine:
         return sorted(list(self.stocks.values()), key=lambda x: x.code)
 
     def save_config(self):
-        """保存股票列表和阈值配置到本地文件"""
-        config_data = {
-            'stocks': []
-        }
-        
-        for stock in self.stocks.values():
-            stock_config = {
-                'code': stock.code,
-                'name': stock.name,
-                'thresholds': {
-                    'upper_price': stock.upper_price,
-                    'lower_price': stock.lower_price,
-                    'upper_pct': stock.upper_pct,
-                    'lower_pct': stock.lower_pct,
-                    'upper_volume': stock.upper_volume,
-                    'lower_volume': stock.lower_volume,
-                    'upper_high': stock.upper_high,
-                    'lower_high': stock.lower_high,
-                    'upper_low': stock.upper_low,
-                    'lower_low': stock.lower_low,
-                    'upper_amount': stock.upper_amount,
-                    'lower_amount': stock.lower_amount
-                }
-            }
-            config_data['stocks'].append(stock_config)
+        """
+        保存股票列表和阈值配置到本地文件 (原子替换,不会留下写了一半的文件)。
+        启用 write_behind 时只提交快照并立即返回,实际写入在后台线程中进行。
+        """
+        config_data = self._build_config()
+        if self._persister is not None:
+            self._persister.submit(config_data)
+            return True
         
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, ensure_ascii=False, indent=2)
+            write_json_atomic(self.config_file, config_data)
             return True
         except Exception as e:
             print(f"保存配置失败: {e}")
             return False
 
+    def flush_config(self):
+        """立即写出尚未写入的配置"""
+        if self._persister is not None:
+            return self._persister.flush()
+        return True
+
+    def close(self):
+        """程序退出时调用:写出剩余配置并停止后台写入线程"""
+        if self._persister is not None:
+            self._persister.close()
+            self._persister = None
+
+    def _build_config(self) -> Dict:
+        """生成版本 2 的稀疏配置:只写出已设置的阈值"""
+        store = self.store
+        rows = store.rows(list(self.stocks))
+        # 按列取出所有股票的阈值,只对已设置的格子生成字典项
+        columns = {field: store.column(field)[rows].tolist() for field in THRESHOLD_FIELDS}
+        stocks = []
+        for i, stock in enumerate(self.stocks.values()):
+            stock_config = {'code': stock.code, 'name': stock.name}
+            thresholds = {}
+            for field in THRESHOLD_FIELDS:
+                value = columns[field][i]
+                if value == value:
+                    thresholds[field] = value
+            if thresholds:
+                stock_config['thresholds'] = thresholds
+            if stock.rules:
+                stock_config['rules'] = [rule.to_dict() for rule in stock.rules]
+            stocks.append(stock_config)
+        return {'version': CONFIG_VERSION, 'stocks': stocks}
+
     def load_config(self):
         """从本地文件加载股票列表和阈值配置"""
+        self.flush_config()
         if not os.path.exists(self.config_file):
             print(f"配置文件 {self.config_file} 不存在，将使用空列表")
             return False
         
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                config_data = loads_config(f.read())
             
-            self.stocks.clear()
+            # 去掉重复代码 (保留第一次出现的配置)
+            entries = {}
             for stock_config in config_data.get('stocks', []):
-                code = stock_config['code']
-                stock = StockItem(code, stock_config.get('name', ''))
-                
-                # 恢复阈值设置
-                thresholds = stock_config.get('thresholds', {})
-                stock.upper_price = thresholds.get('upper_price')
-                stock.lower_price = thresholds.get('lower_price')
-                stock.upper_pct = thresholds.get('upper_pct')
-                stock.lower_pct = thresholds.get('lower_pct')
-                stock.upper_volume = thresholds.get('upper_volume')
-                stock.lower_volume = thresholds.get('lower_volume')
-                stock.upper_high = thresholds.get('upper_high')
-                stock.lower_high = thresholds.get('lower_high')
-                stock.upper_low = thresholds.get('upper_low')
-                stock.lower_low = thresholds.get('lower_low')
-                stock.upper_amount = thresholds.get('upper_amount')
-                stock.lower_amount = thresholds.get('lower_amount')
-                
-                self.stocks[code] = stock
+                entries.setdefault(stock_config['code'], stock_config)
+            
+            self.stocks.clear()
+            self.store.clear()
+            self.indicators.clear()
+            self.alert_states.clear()
+            self._unquoted_requested.clear()
+            codes = list(entries)
+            items = StockItem.create_many(self.store, codes,
+                                          [entry.get('name', '') for entry in entries.values()])
+            self.stocks.update(zip(codes, items))
+            
+            # 恢复阈值设置: 稀疏配置中只有已设置的阈值,按列一次写入
+            thresholds = {field: ([], []) for field in THRESHOLD_FIELDS}
+            for item, entry in zip(items, entries.values()):
+                for key, value in (entry.get('thresholds') or {}).items():
+                    column = thresholds.get(key)
+                    if column is None or value is None:
+                        continue
+                    column[0].append(item._row)
+                    column[1].append(value)
+            for field, (rows, values) in thresholds.items():
+                if rows:
+                    self.store.columns[field][rows] = values
+            
+            # 恢复自定义规则,无效的规则跳过
+            for item, entry in zip(items, entries.values()):
+                if not entry.get('rules'):
+                    continue
+                rules = []
+                for rule_config in entry['rules']:
+                    try:
+                        rules.append(rule_from_dict(rule_config))
+                    except ValueError as e:
+                        print(f"忽略股票 {item.code} 的规则: {e}")
+                item.rules = rules
             
             print(f"成功加载 {len(self.stocks)} 只股票配置")
             return True
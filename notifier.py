@@ -0,0 +1,327 @@
+"""
+预警通知。
+
+MonitorEngine 每次刷新产生的预警状态变化 (ChangeSet.events) 经 alert_records 转换为字典后
+交给 Notifier.submit,立即返回,不拖慢刷新;每个通知渠道 (sink) 有自己的有界队列和后台线程:
+
+    submit --> [队列 (满时丢弃最旧的通知)] --> 攒批 --> 限速 --> 发送 (失败时退避重试)
+
+一个渠道变慢或出错不影响其他渠道。内置渠道:
+    LogFileSink   追加写 JSON Lines 日志文件
+    WebhookSink   HTTP POST JSON {"alerts": [...]}
+    SmtpSink      每批发送一封邮件
+    DesktopSink   调用给定的函数显示桌面通知 (界面中由系统托盘显示,见 gui/tray_notifier.py)
+
+渠道只需提供 name 属性和 send(records) 方法,send 抛出异常视为发送失败。
+各渠道的发送、重试、丢弃次数等统计见 Notifier.stats()。
+"""
+import json
+import os
+import smtplib
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Callable, Dict, List, Optional, Sequence
+
+from alert_rules import THRESHOLD_SPEC_BY_KEY
+
+KIND_NAMES = {'triggered': '触发', 'cleared': '解除'}
+
+def alert_records(engine, events) -> List[Dict]:
+    """把 AlertEvent 转换为通知用的字典,附带股票名称和当前价格"""
+    records = []
+    for event in events:
+        stock = engine.stocks.get(event.code)
+        record = event.to_dict()
+        record['name'] = stock.name if stock else ""
+        record['price'] = stock.price if stock else None
+        records.append(record)
+    return records
+
+def format_record(record: Dict) -> str:
+    """一条通知的单行文字,如 "09:31:05 600000 浦发银行 触发: 价格突破上限 ..." """
+    reason = record.get('reason')
+    if not reason:
+        rule = record.get('rule')
+        spec = THRESHOLD_SPEC_BY_KEY.get(rule) if isinstance(rule, str) else None
+        reason = spec.label if spec else str(rule)
+    clock = datetime.fromtimestamp(record['ts']).strftime('%H:%M:%S')
+    return (f"{clock} {record['code']} {record.get('name', '')} "
+            f"{KIND_NAMES.get(record['kind'], record['kind'])}: {reason}")
+
+class LogFileSink:
+    """追加写 JSON Lines 日志,每批打开文件写入一次"""
+
+    def __init__(self, path: str, name: str = "log"):
+        self.path = path
+        self.name = name
+
+    def send(self, records: List[Dict]):
+        lines = ''.join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(lines)
+
+class WebhookSink:
+    """把一批通知以 JSON {"alerts": [...]} POST 到 url,非 2xx 响应视为失败"""
+
+    def __init__(self, url: str, timeout: float = 5.0, headers: Optional[Dict] = None, name: str = "webhook",
+                 session=None):
+        # 只有配置了 webhook 时才需要 requests
+        import requests
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.name = name
+        self.session = session or requests.Session()
+
+    def send(self, records: List[Dict]):
+        response = self.session.post(self.url, json={'alerts': records}, headers=self.headers,
+                                     timeout=self.timeout)
+        response.raise_for_status()
+
+class SmtpSink:
+    """每批发送一封纯文本邮件"""
+
+    def __init__(self, host: str, port: int, sender: str, recipients: Sequence[str],
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = False, timeout: float = 10.0, name: str = "smtp"):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.name = name
+
+    def send(self, records: List[Dict]):
+        message = EmailMessage()
+        triggered = sum(1 for record in records if record['kind'] == 'triggered')
+        message['Subject'] = f"股票预警: {triggered} 条触发, {len(records) - triggered} 条解除"
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content('\n'.join(format_record(record) for record in records))
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(message)
+
+class DesktopSink:
+    """
+    桌面通知: 调用 show(标题, 内容)。
+    show 在后台线程中被调用,界面中应传入 Qt 信号的 emit (跨线程自动排队到界面线程)。
+    """
+
+    def __init__(self, show: Callable[[str, str], None], name: str = "desktop"):
+        self.show = show
+        self.name = name
+
+    def send(self, records: List[Dict]):
+        if len(records) == 1:
+            title = f"{records[0]['code']} {records[0].get('name', '')}"
+        else:
+            title = f"{len(records)} 条股票预警"
+        self.show(title, '\n'.join(format_record(record) for record in records))
+
+class SinkWorker:
+    """
+    一个渠道的后台发送线程。
+    队列最多保存 queue_size 条通知,满时丢弃最旧的;每次最多发送 batch_size 条,
+    第一条到达后最多再等 batch_delay 秒攒批;rate 为每秒最多发送的批数 (None 为不限,
+    burst 为允许的突发批数),限速期间到达的通知并入下一批;
+    发送失败时按 backoff * 2^n (不超过 max_backoff) 秒退避,最多重试 retries 次,仍失败则丢弃该批。
+    """
+
+    def __init__(self, sink, queue_size: int = 1000, batch_size: int = 20, batch_delay: float = 0.5,
+                 rate: Optional[float] = None, burst: int = 1, retries: int = 3,
+                 backoff: float = 1.0, max_backoff: float = 30.0):
+        self.sink = sink
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.batch_delay = batch_delay
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {'queued': 0, 'sent': 0, 'batches': 0, 'failed': 0, 'retries': 0,
+                      'dropped': 0, 'rate_limited': 0}
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._closing = threading.Event()
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"notify-{sink.name}", daemon=True)
+        self._thread.start()
+
+    def put(self, records: List[Dict]):
+        """放入队列,不阻塞;队列满时丢弃最旧的通知"""
+        with self._cond:
+            for record in records:
+                if len(self._pending) >= self.queue_size:
+                    self._pending.popleft()
+                    self.stats['dropped'] += 1
+                self._pending.append(record)
+                self.stats['queued'] += 1
+            self._cond.notify()
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def close(self, timeout: Optional[float] = None):
+        """发送剩余通知 (不再退避等待) 后停止线程"""
+        self._closing.set()
+        with self._cond:
+            self._cond.notify()
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing.is_set():
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # 攒批: 等到批次满、超过 batch_delay 或正在关闭
+                deadline = time.monotonic() + self.batch_delay
+                while len(self._pending) < self.batch_size and not self._closing.is_set():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            self._wait_for_token()
+            with self._cond:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            if batch:
+                self._deliver(batch)
+
+    def _wait_for_token(self):
+        if self.rate is None:
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        if self._tokens < 1:
+            self.stats['rate_limited'] += 1
+            self._closing.wait((1 - self._tokens) / self.rate)
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+        self._tokens = max(self._tokens - 1, 0.0)
+
+    def _deliver(self, batch: List[Dict]):
+        for attempt in range(self.retries + 1):
+            try:
+                self.sink.send(batch)
+            except Exception as e:
+                if attempt == self.retries:
+                    self.stats['failed'] += len(batch)
+                    print(f"通知渠道 {self.sink.name} 发送失败,丢弃 {len(batch)} 条通知: {e}")
+                    return
+                self.stats['retries'] += 1
+                # 关闭时立即重试,不再等待
+                self._closing.wait(min(self.backoff * 2 ** attempt, self.max_backoff))
+                continue
+            self.stats['sent'] += len(batch)
+            self.stats['batches'] += 1
+            return
+
+class Notifier:
+    """
+    预警通知分发。submit 把通知放入每个渠道的队列后立即返回。
+    add_sink 的关键字参数覆盖构造时给出的默认设置 (见 SinkWorker)。
+    """
+
+    def __init__(self, sinks: Sequence = (), **defaults):
+        self.defaults = defaults
+        self.workers: Dict[str, SinkWorker] = {}
+        self.submitted = 0
+        for sink in sinks:
+            self.add_sink(sink)
+
+    def add_sink(self, sink, **options) -> SinkWorker:
+        if sink.name in self.workers:
+            raise ValueError(f"通知渠道重名: {sink.name}")
+        worker = SinkWorker(sink, **{**self.defaults, **options})
+        self.workers[sink.name] = worker
+        return worker
+
+    def submit(self, records: List[Dict]):
+        if not records:
+            return
+        self.submitted += len(records)
+        for worker in self.workers.values():
+            worker.put(records)
+
+    def stats(self) -> Dict:
+        return {
+            'submitted': self.submitted,
+            'dropped': sum(worker.stats['dropped'] for worker in self.workers.values()),
+            'sinks': {name: dict(worker.stats, pending=worker.pending) for name, worker in self.workers.items()},
+        }
+
+    def close(self, timeout: float = 5.0):
+        """程序退出时调用: 尽量发送剩余通知,每个渠道最多等待 timeout 秒"""
+        for worker in self.workers.values():
+            worker._closing.set()
+        for worker in self.workers.values():
+            worker.close(timeout)
+
+def load_notifier(path: str, desktop: Optional[Callable[[str, str], None]] = None,
+                  strict: bool = False) -> Notifier:
+    """
+    按 JSON 配置文件创建 Notifier,文件不存在时只有桌面通知 (如果给出 desktop):
+        {"log_file": "alerts.log",
+         "webhook": {"url": "http://...", "rate": 1},
+         "smtp": {"host": "localhost", "port": 25, "sender": "...", "recipients": ["..."]},
+         "desktop": true,
+         "options": {"batch_size": 20, "retries": 3}}
+    webhook / smtp 中除渠道参数外还可以给出 SinkWorker 的设置 (rate、batch_size 等)。
+    log_file 为相对路径时相对于配置文件所在目录。
+    配置文件无法读取或内容无效 (JSON 格式错误、未知参数等) 时打印错误,只使用桌面通知
+    (没有给出 desktop 时不发送任何通知),不影响程序启动;
+    strict 为 True 时文件必须存在,错误直接抛出,由调用方决定如何处理。
+    """
+    notifier = None
+    try:
+        config = {}
+        if strict or os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                config = json.load(f)
+        notifier = Notifier(**config.get('options', {}))
+        worker_keys = ('queue_size', 'batch_size', 'batch_delay', 'rate', 'burst', 'retries', 'backoff',
+                       'max_backoff')
+
+        def split(section):
+            section = dict(section)
+            return section, {key: section.pop(key) for key in worker_keys if key in section}
+
+        if config.get('log_file'):
+            log_file = os.path.join(os.path.dirname(os.path.abspath(path)), config['log_file'])
+            notifier.add_sink(LogFileSink(log_file))
+        if config.get('webhook'):
+            params, options = split(config['webhook'])
+            notifier.add_sink(WebhookSink(**params), **options)
+        if config.get('smtp'):
+            params, options = split(config['smtp'])
+            notifier.add_sink(SmtpSink(**params), **options)
+        if desktop is not None and config.get('desktop', True):
+            notifier.add_sink(DesktopSink(desktop))
+        return notifier
+    except Exception as e:
+        if notifier is not None:
+            notifier.close(timeout=1.0)
+        if strict:
+            raise
+        print(f"加载通知配置 {path} 失败,{'只使用桌面通知' if desktop is not None else '不发送通知'}: {e}")
+    notifier = Notifier()
+    if desktop is not None:
+        notifier.add_sink(DesktopSink(desktop))
+    return notifier
@@ -0,0 +1,98 @@
+"""
+按离阈值远近给股票分级抓取。
+
+离阈值很近、波动又大的股票需要每秒刷新,离阈值很远的股票一两分钟刷新一次也不会漏掉预警。
+距离统一换算成"相当于价格变动百分之几":
+    价格类字段 (最新价、最高、最低、均线等)  |阈值 - 当前值| / 当前值 * 100
+    百分比字段 (涨跌幅、短时涨跌幅)         |阈值 - 当前值|
+    均线穿越                               |最新价 - 均线| / 最新价 * 100
+成交量、成交额、量比也按相对距离计算。
+
+价格按随机游走估计: 每秒波动为 σ (IndicatorEngine 的 volatility 指标,%/√秒),
+t 秒内的变动约为 σ * √t。一个分级的抓取间隔 T 满足 距离 >= z * σ * √T 时,
+一个间隔内越过阈值的可能性很小,股票被分到满足条件的最慢一级;
+没有任何阈值的股票在最慢一级;还没有行情的股票第一次在最快一级 (尽快取得第一笔行情),
+请求过仍没有行情的 (代码无效、停牌) 在最慢一级 (见 MonitorEngine.polling_tiers)。
+"""
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# 默认分级的抓取间隔 (秒),由快到慢
+DEFAULT_TIER_INTERVALS = (1.0, 5.0, 30.0, 60.0)
+
+# 以百分点表示的字段,距离直接相减
+POINT_FIELDS = ('pct_change', 'move_pct')
+
+# 开关型字段的距离由两个数值字段的相对差决定
+PROXIMITY_FIELDS = {'ma_cross': ('price', 'ma')}
+
+def field_distance(field: str, op: str, columns, rows: np.ndarray, threshold) -> np.ndarray:
+    """
+    指定行离阈值的距离 (按价格变动的百分比计);阈值为 NaN (未设置) 或数值无效时为 NaN。
+    threshold 可以是标量或与 rows 对齐的数组。
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if field in PROXIMITY_FIELDS:
+            base, other = PROXIMITY_FIELDS[field]
+            values = columns[base][rows]
+            distance = np.abs(values - columns[other][rows]) / np.abs(values) * 100
+            # 开关型阈值未开启时为 NaN
+            return np.where(np.isnan(threshold), np.nan, distance)
+        values = columns[field][rows]
+        if op == 'abs>=':
+            values = np.abs(values)
+        if field in POINT_FIELDS:
+            return np.abs(threshold - values)
+        distance = np.abs(threshold - values) / np.abs(values) * 100
+        return np.where(np.isfinite(distance), distance, np.nan)
+
+class PollingTiers:
+    """
+    分级和按级安排抓取。
+    classify 根据距离和波动率给出每只股票的级别 (0 为最快);
+    due 返回到期需要抓取的级别,各级的抓取时间按各自间隔对齐,错过的抓取点直接跳过。
+    """
+
+    def __init__(self, intervals: Sequence[float] = DEFAULT_TIER_INTERVALS, z: float = 3.0,
+                 default_volatility: float = 0.03, min_volatility: float = 0.005):
+        if not intervals or any(b <= a for a, b in zip(intervals, intervals[1:])) or intervals[0] <= 0:
+            raise ValueError("分级间隔必须为递增的正数")
+        self.intervals = tuple(float(interval) for interval in intervals)
+        self.z = z
+        # 还没有波动率 (历史不足) 时使用的默认值;波动率很小时也不低于 min_volatility,避免长期停在慢速级
+        self.default_volatility = default_volatility
+        self.min_volatility = min_volatility
+        self._next_due: List[Optional[float]] = [None] * len(self.intervals)
+
+    def classify(self, distance: np.ndarray, volatility: np.ndarray) -> np.ndarray:
+        """
+        distance 为离最近阈值的距离 (NaN 表示没有任何阈值),volatility 为每秒波动率 (NaN 表示未知),
+        返回每只股票的级别下标。
+        """
+        sigma = np.where(np.isnan(volatility), self.default_volatility, volatility)
+        sigma = np.maximum(sigma, self.min_volatility)
+        # 该距离在 z 倍标准差下需要的时间: 间隔不超过它的最慢一级
+        with np.errstate(divide='ignore', invalid='ignore'):
+            reach = (distance / (self.z * sigma)) ** 2
+        tiers = np.searchsorted(np.array(self.intervals), reach, side='right') - 1
+        tiers = np.clip(tiers, 0, len(self.intervals) - 1)
+        tiers[np.isnan(distance)] = len(self.intervals) - 1
+        return tiers
+
+    def due(self, now: float) -> List[int]:
+        """返回到期的级别,并安排它们的下一次抓取"""
+        result = []
+        for tier, interval in enumerate(self.intervals):
+            next_due = self._next_due[tier]
+            if next_due is None:
+                next_due = now
+            if now >= next_due - 0.005:
+                result.append(tier)
+                next_due += (np.floor((now - next_due) / interval) + 1) * interval
+            self._next_due[tier] = float(next_due)
+        return result
+
+    def reset(self):
+        """下一次 due 时所有级别都到期 (例如新开盘或重新加载配置后)"""
+        self._next_due = [None] * len(self.intervals)
@@ -0,0 +1,83 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+class ProviderHealth:
+    """
+    单个行情接口的健康状态。
+
+    记录最近 window 次调用的成功/失败与耗时,统计成功率、p50/p95 延迟和连续失败次数。
+    连续失败达到 failure_threshold 次后熔断,cooldown 秒内不再调用该接口;
+    冷却结束后放行一次试探调用,成功则恢复,失败则再次熔断。
+    """
+
+    def __init__(self, name: str, window: int = 50, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self._samples = deque(maxlen=window)   # (是否成功, 耗时秒)
+        self._lock = threading.Lock()
+
+    def record(self, ok: bool, latency: float, now: Optional[float] = None):
+        """记录一次调用结果"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._samples.append((ok, latency))
+            if ok:
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+            else:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= self.failure_threshold:
+                    self.open_until = now + self.cooldown
+                    print(f"{self.name} 接口连续失败 {self.consecutive_failures} 次,熔断 {self.cooldown:g} 秒")
+
+    def is_available(self, now: Optional[float] = None) -> bool:
+        """熔断器是否放行(未熔断或冷却已结束)"""
+        now = time.monotonic() if now is None else now
+        return now >= self.open_until
+
+    @property
+    def success_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 1.0
+            return sum(1 for ok, _ in self._samples if ok) / len(self._samples)
+
+    def latency_percentile(self, pct: float) -> Optional[float]:
+        """最近调用耗时的百分位数(最近秩法),没有样本时返回 None"""
+        with self._lock:
+            latencies = sorted(latency for _, latency in self._samples)
+        if not latencies:
+            return None
+        rank = max(1, math.ceil(pct / 100.0 * len(latencies)))
+        return latencies[min(rank, len(latencies)) - 1]
+
+    def stats(self, now: Optional[float] = None) -> Dict:
+        """返回可直接展示/记录日志的统计信息"""
+        now = time.monotonic() if now is None else now
+        return {
+            'name': self.name,
+            'calls': len(self._samples),
+            'success_rate': round(self.success_rate, 3),
+            'p50_latency': self.latency_percentile(50),
+            'p95_latency': self.latency_percentile(95),
+            'consecutive_failures': self.consecutive_failures,
+            'circuit_open': not self.is_available(now),
+            'retry_in': max(0.0, round(self.open_until - now, 1)),
+        }
+
+    def sort_key(self, min_samples: int = 5):
+        """
+        排序依据:成功率(按 0.1 分档,避免偶发失败导致顺序抖动)高者优先,
+        其次 p50 延迟低者优先;样本不足 min_samples 的接口视为健康但排在同档已测接口之后,
+        因此在首选接口健康时保持默认顺序。
+        """
+        if len(self._samples) < min_samples:
+            return (-1.0, float('inf'))
+        p50 = self.latency_percentile(50)
+        return (-round(self.success_rate, 1), p50)
@@ -0,0 +1,93 @@
+"""
+行情接口响应解析。
+
+直接在原始字节上用正则按字段位置捕获用到的字段,
+不切分整行,也不对用不到的字段做 GBK 解码。
+"""
+import re
+from typing import Dict, Iterable, Iterator, List
+
+# 腾讯接口每行格式: v_sh600000="1~浦发银行~600000~10.12~...";  共 80+ 个以 ~ 分隔的字段。
+# 用到的字段下标: 1 名称, 2 代码, 3 最新价, 6 成交量(手), 32 涨跌幅, 33 最高, 34 最低, 37 成交额(万元)。
+# 一个正则按位置只捕获这 8 个字段,其余字段只匹配不捕获,不切分整行也不生成对象;
+# 字段用独占量词 (Python 3.11+) 匹配,不回溯。与原实现一致要求至少 41 个字段,
+# 且只接受以 "; 结尾的完整行。
+_T = rb'[^~]*+'
+_TENCENT_RE = re.compile(
+    rb'v_[a-z]{2}\d+="' + _T + rb'~(' + _T + rb')~(' + _T + rb')~(' + _T + rb')~' + _T + rb'~' + _T + rb'~'
+    rb'(' + _T + rb')~(?:' + _T + rb'~){25}(' + _T + rb')~(' + _T + rb')~(' + _T + rb')~' + _T + rb'~' + _T + rb'~'
+    rb'(' + _T + rb')(?:~' + _T + rb'){3}[^"]*+";')
+
+def parse_tencent(raw: bytes) -> List[Dict]:
+    """
+    解析腾讯接口的原始响应(GBK 字节)。
+    返回的字典与原先 split 版解析结果完全一致;数值字段缺失或无法解析的行被跳过。
+    """
+    results = []
+    search, count = _TENCENT_RE.search, raw.count
+    pos = 0
+    while True:
+        m = search(raw, pos)
+        if m is None:
+            break
+        start, pos = m.span()
+        # 字段可以跨过引号:被截断的行会连上下一行一起匹配,
+        # 此时丢弃这一段,从下一行重新开始
+        if count(b'"', start, pos) != 2:
+            pos = start + 1
+            continue
+        name, code, price, volume, pct_change, high, low, amount = m.groups()
+        try:
+            results.append({
+                'code': code.decode('ascii'),
+                'name': name.decode('gbk', errors='replace'),
+                'price': float(price),
+                'pct_change': float(pct_change),
+                'volume': float(volume),
+                'high': float(high),
+                'low': float(low),
+                'amount': float(amount) * 10000
+            })
+        except ValueError:
+            continue
+    return results
+
+# 新浪接口每行格式: var hq_str_sh600000="浦发银行,10.20,10.23,10.12,...";
+# 用到的字段下标: 0 名称, 2 昨收, 3 最新价, 4 最高, 5 最低, 8 成交量(股), 9 成交额(元)。
+# 代码取自变量名,不依赖行号;已退市/不存在的代码返回空字符串 ="" 。
+# 与腾讯相同,按位置只捕获用到的字段,并要求至少 30 个字段;逐行匹配,不会跨行。
+_S = rb'[^,]*+'
+_SINA_RE = re.compile(
+    rb'hq_str_[a-z]{2}(\d+)="(' + _S + rb'),' + _S + rb',(' + _S + rb'),(' + _S + rb'),(' + _S + rb'),(' + _S + rb'),'
+    rb'' + _S + rb',' + _S + rb',(' + _S + rb'),(' + _S + rb')(?:,' + _S + rb'){20}[^"]*+"')
+
+def parse_sina_lines(lines: Iterable[bytes]) -> Iterator[Dict]:
+    """
+    逐行解析新浪接口响应(GBK 字节),可以直接传入 response.iter_lines()。
+    每解析出一只股票就产出一个行情字典;空行、空数据和字段不足的行被跳过。
+    """
+    search = _SINA_RE.search
+    for line in lines:
+        m = search(line)
+        if m is None:
+            continue
+        code, name, pre_close, price, high, low, volume, amount = m.groups()
+        try:
+            price = float(price)
+            pre_close = float(pre_close)
+            yield {
+                'code': code.decode('ascii'),
+                'name': name.decode('gbk', errors='replace'),
+                'price': price,
+                'pct_change': round((price - pre_close) / pre_close * 100, 2) if pre_close != 0 else 0,
+                'volume': float(volume) / 100,  # 新浪成交量单位是股,转为手
+                'high': float(high),
+                'low': float(low),
+                'amount': float(amount)
+            }
+        except ValueError:
+            continue
+
+def parse_sina(raw: bytes) -> List[Dict]:
+    """解析完整的新浪接口响应"""
+    return list(parse_sina_lines(raw.splitlines()))
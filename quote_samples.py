@@ -0,0 +1,61 @@
+"""
+测试和基准测试共用的行情样本:samples 目录下录制的接口响应,
+原先基于 str.split 的解析实现 (作为 quote_parsers 的对照),
+以及构造单条行情字典的 make_tick。
+"""
+import os
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'samples')
+
+
+def load_sample(name):
+    with open(os.path.join(SAMPLES_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def legacy_parse_tencent(text):
+    """原先基于 split 的解析实现，作为对照"""
+    results = []
+    for line in text.split(';'):
+        parts = line.split('~')
+        if len(parts) > 40:
+            results.append({
+                'code': parts[2],
+                'name': parts[1],
+                'price': float(parts[3]),
+                'pct_change': float(parts[32]),
+                'volume': float(parts[6]),
+                'high': float(parts[33]),
+                'low': float(parts[34]),
+                'amount': float(parts[37]) * 10000
+            })
+    return results
+
+
+def legacy_parse_sina(text, stock_codes):
+    """原先按行号映射代码的新浪解析实现，作为对照"""
+    results = []
+    for i, line in enumerate(text.split('\n')):
+        if '="' not in line:
+            continue
+        parts = line.split('="')[1].split('",')[0].split(',')
+        if len(parts) >= 30:
+            price = float(parts[3])
+            pre_close = float(parts[2])
+            results.append({
+                'code': stock_codes[i],
+                'name': parts[0],
+                'price': price,
+                'pct_change': round((price - pre_close) / pre_close * 100, 2) if pre_close != 0 else 0,
+                'volume': float(parts[8]) / 100,
+                'high': float(parts[4]),
+                'low': float(parts[5]),
+                'amount': float(parts[9])
+            })
+    return results
+
+
+def make_tick(code, price, pct_change=0.0, volume=0.0, name=None):
+    """一条行情字典 (fetcher 返回的格式),最高/最低价取最新价"""
+    return {'code': code, 'name': code if name is None else name, 'price': price, 'pct_change': pct_change,
+            'volume': volume, 'high': price, 'low': price, 'amount': 0.0}
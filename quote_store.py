@@ -0,0 +1,170 @@
+import numpy as np
+from typing import Dict, List
+from indicators import INDICATOR_FIELDS
+from alert_rules import THRESHOLD_SPECS
+
+# 行情数据列
+DATA_FIELDS = ('price', 'pct_change', 'volume', 'high', 'low', 'amount')
+
+# 阈值列由 alert_rules.THRESHOLD_SPECS 决定,未设置的阈值存为 NaN
+THRESHOLD_FIELDS = tuple(spec.key for spec in THRESHOLD_SPECS)
+
+# 初始值为 NaN 的列: 指标 (尚无足够历史) 和阈值 (未设置)
+NAN_FIELDS = INDICATOR_FIELDS + THRESHOLD_FIELDS
+
+class QuoteStore:
+    """
+    按列存放的行情与阈值表。
+
+    每个字段 (行情、技术指标、阈值) 是一个 float64 数组,每只股票占一行,通过 index 按代码定位行号;
+    另有一列 alerting 记录预警状态。StockItem 是对其中一行的轻量视图,
+    创建 StockItem(code, name, store=...) 时自动在表中分配一行。
+    删除股票时把最后一行移到被删除的位置,保持数组紧凑。
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = max(1, capacity)
+        self.size = 0
+        self.codes: List[str] = []
+        self.items: List = []
+        self.index: Dict[str, int] = {}
+        self.columns: Dict[str, np.ndarray] = {}
+        for field in DATA_FIELDS:
+            self.columns[field] = np.zeros(self.capacity)
+        for field in NAN_FIELDS:
+            self.columns[field] = np.full(self.capacity, np.nan)
+        self.alerting = np.zeros(self.capacity, dtype=bool)
+        # 自定义规则或行号发生变化,MonitorEngine 需要重建规则索引
+        self.rules_dirty = False
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, code):
+        return code in self.index
+
+    def _attach(self, item) -> int:
+        """为 StockItem 分配一行,返回行号"""
+        if item.code in self.index:
+            raise ValueError(f"股票 {item.code} 已存在")
+        if self.size == self.capacity:
+            self._grow(self.capacity * 2)
+        row = self.size
+        self.size += 1
+        self.codes.append(item.code)
+        self.items.append(item)
+        self.index[item.code] = row
+        for field in DATA_FIELDS:
+            self.columns[field][row] = 0.0
+        for field in NAN_FIELDS:
+            self.columns[field][row] = np.nan
+        self.alerting[row] = False
+        return row
+
+    def extend(self, items: List) -> int:
+        """
+        批量追加一组尚未分配行的 StockItem (加载配置时使用),容量只扩展一次。
+        新行的数值为 0、阈值为 NaN,返回第一行的行号。
+        """
+        start = self.size
+        end = start + len(items)
+        for item in items:
+            if item.code in self.index:
+                raise ValueError(f"股票 {item.code} 已存在")
+        if end > self.capacity:
+            capacity = self.capacity
+            while capacity < end:
+                capacity *= 2
+            self._grow(capacity)
+        for field in DATA_FIELDS:
+            self.columns[field][start:end] = 0.0
+        for field in NAN_FIELDS:
+            self.columns[field][start:end] = np.nan
+        self.alerting[start:end] = False
+        for row, item in enumerate(items, start):
+            item._store, item._row = self, row
+            self.codes.append(item.code)
+            self.items.append(item)
+            self.index[item.code] = row
+        self.size = end
+        return start
+
+    def _grow(self, capacity: int):
+        for field, values in self.columns.items():
+            fill = 0.0 if field in DATA_FIELDS else np.nan
+            grown = np.full(capacity, fill)
+            grown[:self.size] = values[:self.size]
+            self.columns[field] = grown
+        alerting = np.zeros(capacity, dtype=bool)
+        alerting[:self.size] = self.alerting[:self.size]
+        self.alerting = alerting
+        self.capacity = capacity
+
+    def remove(self, code: str):
+        """
+        删除一只股票,返回它的 StockItem。
+        被删除的视图会带着当前数值脱离本表,之后对它的修改不会影响其他股票。
+        """
+        row = self.index.pop(code)
+        item = self.items[row]
+        last = self.size - 1
+        self.rules_dirty = True
+
+        detached = QuoteStore(capacity=1)
+        detached._copy_row_from(self, row)
+        if row != last:
+            for values in self.columns.values():
+                values[row] = values[last]
+            self.alerting[row] = self.alerting[last]
+            moved = self.items[last]
+            self.codes[row] = moved.code
+            self.items[row] = moved
+            self.index[moved.code] = row
+            moved._row = row
+        self.codes.pop()
+        self.items.pop()
+        self.size -= 1
+
+        item._store, item._row = detached, 0
+        detached.codes.append(code)
+        detached.items.append(item)
+        detached.index[code] = 0
+        return item
+
+    def _copy_row_from(self, other: 'QuoteStore', row: int):
+        self.size = 1
+        for field, values in other.columns.items():
+            self.columns[field][0] = values[row]
+        self.alerting[0] = other.alerting[row]
+
+    def clear(self):
+        """
+        清空所有股票。
+        原有视图整体转移到一张脱离的表中,保留当前数值,之后的修改不再影响本表。
+        """
+        if not self.size:
+            return
+        detached = QuoteStore(capacity=self.size)
+        for field, values in self.columns.items():
+            detached.columns[field][:self.size] = values[:self.size]
+        detached.alerting[:self.size] = self.alerting[:self.size]
+        detached.size = self.size
+        detached.codes, detached.items, detached.index = self.codes, self.items, self.index
+        for item in detached.items:
+            item._store = detached
+        self.codes, self.items, self.index = [], [], {}
+        self.size = 0
+        self.rules_dirty = True
+
+    def rows(self, codes: List[str]) -> np.ndarray:
+        """返回代码对应的行号数组 (不存在的代码为 -1)"""
+        get = self.index.get
+        return np.array([get(code, -1) for code in codes], dtype=np.intp)
+
+    def column(self, field: str) -> np.ndarray:
+        """返回某一列有效部分的视图 (不复制)"""
+        return self.columns[field][:self.size]
+
+    def get(self, code: str):
+        row = self.index.get(code)
+        return None if row is None else self.items[row]
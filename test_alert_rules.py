@@ -0,0 +1,146 @@
+"""
+测试预警规则的编译、索引以及与阈值表的一致性
+"""
+import math
+import os
+import random
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+import pytest
+
+from alert_rules import All, Any, Rule, RuleIndex, THRESHOLD_SPECS, rule_from_dict
+from monitor_engine import MonitorEngine, StockItem
+from quote_store import THRESHOLD_FIELDS
+from quote_samples import make_tick
+
+
+def test_every_spec_has_column_and_property():
+    assert THRESHOLD_FIELDS == tuple(spec.key for spec in THRESHOLD_SPECS)
+    stock = StockItem('600000')
+    for spec in THRESHOLD_SPECS:
+        assert getattr(stock, spec.key) in (None, False)
+
+
+def test_compiled_closure_matches_mask():
+    rng = random.Random(3)
+    rule = Any(All(Rule('price', '>=', 10), Rule('volume_ratio', '>=', 3)), Rule('pct_change', '<', -5))
+    columns = {
+        'price': np.array([rng.uniform(8, 12) for _ in range(200)]),
+        'volume_ratio': np.array([rng.choice([math.nan, rng.uniform(0, 6)]) for _ in range(200)]),
+        'pct_change': np.array([rng.uniform(-8, 8) for _ in range(200)]),
+    }
+    rows = np.arange(200)
+    mask = rule.mask(columns, rows)
+    for row in range(200):
+        values = {field: float(columns[field][row]) for field in columns}
+        assert rule.test(values) == bool(mask[row])
+    assert mask.any() and not mask.all()
+
+
+def test_rule_round_trip_and_validation():
+    rule = All(Rule('price', '>=', 10), Any(Rule('move_pct', 'abs>=', 2), Rule('ma_cross', 'abs>=', 1)))
+    assert rule_from_dict(rule.to_dict()) == rule
+    with pytest.raises(ValueError):
+        Rule('nope', '>=', 1)
+    with pytest.raises(ValueError):
+        Rule('price', '~', 1)
+    with pytest.raises(ValueError):
+        rule_from_dict({'field': 'price'})
+
+
+def test_rule_index_groups_by_field_and_op():
+    ladder = [Rule('price', '>=', v) for v in (10, 11, 12, 13)] + [Rule('price', '>', 9), Rule('price', '<=', 8)]
+    entries = [(0, rule) for rule in ladder] + [(1, Rule('price', '>=', 1)), (2, Rule('move_pct', 'abs>=', 2))]
+    index = RuleIndex(entries)
+    assert len(index) == 8
+    assert index.rows.tolist() == [0, 1, 2]
+    # 每个 (字段, 运算) 一组,与股票数无关
+    assert len(index._groups) == 4
+
+    def triggered(price, move_pct=0.0, selected=(0, 1, 2)):
+        columns = {'price': np.array([price, price, price]), 'move_pct': np.array([0.0, 0.0, move_pct])}
+        mask = np.zeros(3, dtype=bool)
+        mask[list(selected)] = True
+        return {(row, rule.key()) for row, rule in index.triggered(columns, mask)}
+
+    assert {value for row, (_, _, value) in triggered(11.5) if row == 0} == {9, 10, 11}
+    # 恰好等于阈值: >= 触发, > 不触发
+    assert {value for row, (_, _, value) in triggered(9) if row == 0} == set()
+    assert triggered(8) == {(0, ('price', '<=', 8)), (1, ('price', '>=', 1))}
+    assert triggered(math.nan, math.nan) == set()
+    assert triggered(9.5, -2.5) == {(0, ('price', '>', 9)), (1, ('price', '>=', 1)), (2, ('move_pct', 'abs>=', 2))}
+    # 只检查选中的行
+    assert triggered(9.5, -2.5, selected=(2,)) == {(2, ('move_pct', 'abs>=', 2))}
+    with pytest.raises(ValueError):
+        RuleIndex([(0, All(Rule('price', '>=', 1)))])
+
+
+def test_engine_rules_vectorized_match_scalar(tmp_path):
+    rng = random.Random(7)
+    engine = MonitorEngine(config_file=str(tmp_path / 'config.json'))
+    shared = All(Rule('price', '>=', 10.5), Rule('pct_change', '>', 1))
+    for i in range(60):
+        code = f"{i:06d}"
+        engine.add_stock(code)
+        stock = engine.stocks[code]
+        stock.upper_price = 11.8
+        rules = [shared] if i % 2 else []
+        if i % 3 == 0:
+            rules += [Rule('price', '>=', 10 + i % 4 * 0.5), Rule('pct_change', '<=', -2)]
+        engine.set_rules(code, rules)
+
+    for _ in range(5):
+        tick = [make_tick(f"{i:06d}", rng.uniform(9, 12), rng.uniform(-4, 4), 100.0) for i in range(60)]
+        engine.update_stocks_data(tick)
+        for stock in engine.stocks.values():
+            reasons, flag = list(stock.alert_reasons), stock.is_alerting
+            stock.check_alerts()
+            assert stock.alert_reasons == reasons
+            assert stock.is_alerting == flag
+    assert any(len(stock.alert_reasons) > 1 for stock in engine.stocks.values())
+
+    # 删除股票后行号移动,规则仍对应原来的股票
+    engine.remove_stock('000000')
+    engine.update_stocks_data([make_tick('000059', 11.0, 2.0, 100.0)])
+    assert any('且' in reason for reason in engine.stocks['000059'].alert_reasons)
+
+
+def test_rules_are_saved_and_loaded(tmp_path):
+    path = str(tmp_path / 'config.json')
+    engine = MonitorEngine(config_file=path)
+    engine.add_stock('600000')
+    rules = [Rule('price', '>=', 10), Any(Rule('move_pct', 'abs>=', 2), Rule('volume_ratio', '>=', 3))]
+    engine.set_rules('600000', rules)
+    engine.save_config()
+
+    other = MonitorEngine(config_file=path)
+    other.load_config()
+    assert list(other.stocks['600000'].rules) == rules
+    other.update_stocks_data([make_tick('600000', 10.2, 0.0, 100.0)])
+    assert other.stocks['600000'].alert_reasons == ["最新价 >= 10 (当前 10.2)"]
+
+
+def test_threshold_inputs_round_trip():
+    from PyQt6.QtWidgets import QApplication, QFormLayout, QWidget
+    from gui.threshold_inputs import ThresholdInputs
+
+    app = QApplication.instance() or QApplication([])
+    widget = QWidget()
+    inputs = ThresholdInputs(QFormLayout(widget))
+    stock = StockItem('600000')
+    stock.upper_price = 12.5
+    stock.lower_pct = -3.0
+    stock.alert_ma_cross = True
+    inputs.load(stock)
+    values = inputs.values()
+    assert set(values) == set(THRESHOLD_FIELDS)
+    assert values['upper_price'] == 12.5 and values['lower_pct'] == -3.0
+    assert values['alert_ma_cross'] is True and values['upper_volume'] is None
+
+    other = StockItem('000001')
+    other.update_thresholds(values)
+    assert other.upper_price == 12.5 and other.alert_ma_cross and other.lower_price is None
+    with pytest.raises(ValueError):
+        other.update_thresholds({'upper_nothing': 1})
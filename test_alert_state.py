@@ -0,0 +1,152 @@
+"""
+测试预警状态机: 滞回、冷却与状态变化事件
+"""
+import numpy as np
+import pytest
+
+from alert_rules import Rule
+from alert_state import AlertStates, ARMED, COOLDOWN, TRIGGERED
+from monitor_engine import MonitorEngine
+from quote_samples import make_tick
+
+
+def _engine(tmp_path, **kwargs):
+    engine = MonitorEngine(config_file=str(tmp_path / 'config.json'), **kwargs)
+    engine.add_stock('a')
+    engine.stocks['a'].upper_price = 10.0
+    return engine
+
+
+def _kinds(changes):
+    return [(event.code, event.rule, event.kind) for event in changes.events]
+
+
+def test_states_transitions_and_cooldown():
+    states = AlertStates(1, cooldown=10.0)
+    hit, miss = np.array([[True]]), np.array([[False]])
+    _, fired, _ = states.update(['a'], hit, hit, 0.0)
+    assert fired[0].tolist() == [0] and states.state_of('a', 0) == TRIGGERED
+    _, fired, _ = states.update(['a'], hit, hit, 1.0)
+    assert not len(fired[0])
+    _, _, released = states.update(['a'], miss, miss, 2.0)
+    assert released[0].tolist() == [0] and states.state_of('a', 0) == COOLDOWN
+    # 冷却期内再次满足条件不触发
+    triggered, fired, _ = states.update(['a'], hit, hit, 5.0)
+    assert not triggered.any() and not len(fired[0])
+    _, fired, _ = states.update(['a'], hit, hit, 12.0)
+    assert fired[0].tolist() == [0]
+    states.remove('a')
+    assert states.state_of('a', 0) == ARMED
+
+
+def test_hysteresis_prevents_flapping(tmp_path):
+    engine = _engine(tmp_path, hysteresis=0.01)
+    changes = engine.update_stocks_data([make_tick('a', 10.0)], ts=0.0)
+    assert _kinds(changes) == [('a', 'upper_price', 'triggered')]
+    reason = engine.stocks['a'].alert_reasons
+    # 在 9.9 ~ 10.0 之间来回波动: 不产生事件,保持预警并沿用原因
+    for i, price in enumerate((9.95, 10.02, 9.91, 10.0), 1):
+        changes = engine.update_stocks_data([make_tick('a', price)], ts=float(i))
+        assert changes.events == []
+        assert engine.stocks['a'].is_alerting
+        assert engine.stocks['a'].alert_reasons[0].startswith("价格")
+    changes = engine.update_stocks_data([make_tick('a', 9.85)], ts=6.0)
+    assert _kinds(changes) == [('a', 'upper_price', 'cleared')]
+    assert changes.events[0].reason == reason[0]
+    assert 'a' in changes.alert_off and not engine.stocks['a'].is_alerting
+
+
+def test_cooldown_suppresses_retrigger(tmp_path):
+    engine = _engine(tmp_path, cooldown=60)
+    engine.update_stocks_data([make_tick('a', 10.5)], ts=0.0)
+    engine.update_stocks_data([make_tick('a', 9.5)], ts=1.0)
+    changes = engine.update_stocks_data([make_tick('a', 10.5)], ts=30.0)
+    assert changes.events == [] and not engine.stocks['a'].is_alerting
+    changes = engine.update_stocks_data([make_tick('a', 10.6)], ts=70.0)
+    assert _kinds(changes) == [('a', 'upper_price', 'triggered')]
+    assert 'a' in changes.alert_on
+
+
+def test_cooldown_expiry_refires_on_unchanged_quote(tmp_path):
+    engine = _engine(tmp_path, cooldown=60)
+    rule = Rule('price', '>=', 10.2)
+    engine.set_rules('a', [rule])
+    engine.update_stocks_data([make_tick('a', 10.5)], ts=0.0)
+    engine.update_stocks_data([make_tick('a', 9.5)], ts=1.0)
+    # 冷却期内重新越过阈值,随后价格不再变化 (午休、停牌)
+    changes = engine.update_stocks_data([make_tick('a', 10.5)], ts=30.0)
+    assert changes.events == []
+    assert not engine.update_stocks_data([make_tick('a', 10.5)], ts=50.0)
+    # 冷却结束后同样的行情也重新检查,条件仍满足则再次触发
+    changes = engine.update_stocks_data([make_tick('a', 10.5)], ts=70.0)
+    assert _kinds(changes) == [('a', rule, 'triggered'), ('a', 'upper_price', 'triggered')]
+    assert changes.alert_on == ['a'] and engine.stocks['a'].is_alerting
+    # 冷却结束的股票只重新检查一次
+    assert not engine.update_stocks_data([make_tick('a', 10.5)], ts=80.0)
+
+    # 冷却结束时条件不满足: 恢复为待触发,不产生事件
+    engine.update_stocks_data([make_tick('a', 9.5)], ts=90.0)
+    changes = engine.update_stocks_data([], ts=200.0)
+    assert changes.events == [] and engine.alert_states.state_of('a', 0) == ARMED
+    assert not engine.update_stocks_data([], ts=210.0)
+
+
+def test_default_states_are_level_triggered(tmp_path):
+    engine = _engine(tmp_path)
+    prices = [10.0, 9.99, 10.01, 10.02, 9.0, 11.0]
+    events = []
+    for i, price in enumerate(prices):
+        changes = engine.update_stocks_data([make_tick('a', price)], ts=float(i))
+        events.extend(event.kind for event in changes.events)
+        stock = engine.stocks['a']
+        vectorized = list(stock.alert_reasons)
+        stock.check_alerts()
+        assert stock.alert_reasons == vectorized
+        assert stock.is_alerting == (price >= 10.0)
+    assert events == ['triggered', 'cleared', 'triggered', 'cleared', 'triggered']
+
+
+def test_custom_rule_events(tmp_path):
+    engine = MonitorEngine(config_file=str(tmp_path / 'config.json'), cooldown=60)
+    engine.add_stock('a')
+    rule = Rule('price', '>=', 20.0)
+    engine.set_rules('a', [rule])
+    changes = engine.update_stocks_data([make_tick('a', 21.0)], ts=0.0)
+    assert _kinds(changes) == [('a', rule, 'triggered')]
+    assert changes.events[0].to_dict()['rule'] == rule.to_dict()
+    assert engine.update_stocks_data([make_tick('a', 22.0)], ts=1.0).events == []
+    changes = engine.update_stocks_data([make_tick('a', 19.0)], ts=2.0)
+    assert _kinds(changes) == [('a', rule, 'cleared')]
+    # 解除事件带上最后一次触发时的原因
+    assert changes.events[0].reason == "最新价 >= 20 (当前 22)"
+    # 冷却期内不再触发
+    changes = engine.update_stocks_data([make_tick('a', 21.0)], ts=3.0)
+    assert changes.events == [] and not engine.stocks['a'].is_alerting
+
+
+def test_threshold_and_rule_edits_go_through_states(tmp_path):
+    engine = _engine(tmp_path)
+    engine.update_stocks_data([make_tick('a', 9.0)], ts=0.0)
+    assert not engine.stocks['a'].is_alerting
+
+    # 修改阈值后按当前价格重新检查,与行情刷新一样产生事件
+    changes = engine.update_thresholds('a', {'upper_price': 8.5}, now=1.0)
+    assert _kinds(changes) == [('a', 'upper_price', 'triggered')]
+    assert changes.alert_on == ['a'] and engine.stocks['a'].is_alerting
+    changes = engine.update_thresholds('a', {'upper_price': None}, now=2.0)
+    assert _kinds(changes) == [('a', 'upper_price', 'cleared')]
+    assert changes.events[0].reason == "价格突破上限: 9.0 >= 8.5"
+    assert changes.alert_off == ['a'] and not engine.stocks['a'].is_alerting
+
+    rule = Rule('price', '<=', 9.5)
+    changes = engine.set_rules('a', [rule], now=3.0)
+    assert _kinds(changes) == [('a', rule, 'triggered')]
+    changes = engine.set_rules('a', [], now=4.0)
+    assert not engine.stocks['a'].is_alerting
+
+    # 还没有行情的股票不检查,收到第一笔行情时再触发
+    engine.add_stock('b')
+    assert not engine.update_thresholds('b', {'lower_price': 5.0})
+    with pytest.raises(ValueError):
+        engine.update_thresholds('a', {'upper_nothing': 1.0})
+
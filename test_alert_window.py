@@ -0,0 +1,78 @@
+"""
+测试预警窗口按代码增量更新
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication
+from monitor_engine import MonitorEngine
+from gui.alert_window import AlertWindow, ThresholdEditDialog
+
+
+def test_update_alerts_reuses_rows():
+    app = QApplication.instance() or QApplication([])
+    engine = MonitorEngine("test_alert_window_config.json")
+    for code in ('600000', '000001', '300750'):
+        engine.add_stock(code)
+        engine.stocks[code].upper_price = 10.0
+    window = AlertWindow(engine)
+
+    engine.update_stocks_data([{'code': '600000', 'name': '浦发银行', 'price': 10.5},
+                               {'code': '000001', 'name': '平安银行', 'price': 11.5}])
+    window.update_alerts(engine.get_alerting_stocks())
+    assert window.table.rowCount() == 2 and window.isVisible()
+    first_item = window.table.item(0, 0)
+
+    # 价格变化只更新文字，不重建单元格
+    engine.update_stocks_data([{'code': '600000', 'name': '浦发银行', 'price': 10.8}])
+    window.update_alerts(engine.get_alerting_stocks())
+    assert window.table.item(0, 0) is first_item
+    assert window.table.item(0, 2).text() == '10.8'
+    assert '10.8 >= 10.0' in window.table.item(0, 3).text()
+
+    # 离开预警的行被移除，新进入的行追加在末尾
+    engine.update_stocks_data([{'code': '600000', 'price': 9.0}, {'code': '300750', 'price': 20.0}])
+    window.update_alerts(engine.get_alerting_stocks())
+    codes = [window.table.item(r, 0).text() for r in range(window.table.rowCount())]
+    assert codes == ['000001', '300750']
+
+    window.delete_stock('000001')
+    assert [window.code_at(r) for r in range(window.table.rowCount())] == ['300750']
+    assert '000001' not in engine.stocks
+
+    engine.update_stocks_data([{'code': '300750', 'price': 1.0}])
+    window.update_alerts(engine.get_alerting_stocks())
+    assert window.table.rowCount() == 0 and not window.isVisible()
+
+    if os.path.exists(engine.config_file):
+        os.remove(engine.config_file)
+
+
+def test_edit_threshold_removes_cleared_row(monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    engine = MonitorEngine("test_alert_window_edit_config.json")
+    engine.add_stock('600000')
+    engine.stocks['600000'].upper_price = 10.0
+    window = AlertWindow(engine)
+    engine.update_stocks_data([{'code': '600000', 'name': '浦发银行', 'price': 10.5}])
+    window.update_alerts(engine.get_alerting_stocks())
+    assert window.table.rowCount() == 1 and window.isVisible()
+
+    # 对话框直接确认，把上限改到当前价之上
+    monkeypatch.setattr(ThresholdEditDialog, 'exec', lambda self: ThresholdEditDialog.DialogCode.Accepted)
+    monkeypatch.setattr(ThresholdEditDialog, 'get_thresholds', lambda self: {'upper_price': 11.0})
+    events = []
+    window.alert_events.connect(events.extend)
+    window.edit_threshold(engine.stocks['600000'])
+
+    assert [e.kind for e in events] == ['cleared']
+    assert window.table.rowCount() == 0 and not window.isVisible()
+
+    engine.close()
+    if os.path.exists(engine.config_file):
+        os.remove(engine.config_file)
+
+
+if __name__ == "__main__":
+    test_update_alerts_reuses_rows()
+    print("✓ 预警窗口测试通过")
@@ -0,0 +1,100 @@
+"""
+测试配置文件的原子写入与后台合并写入
+"""
+import json
+import os
+import stat
+import time
+
+from config_persister import ConfigPersister, write_json_atomic
+from monitor_engine import MonitorEngine
+
+
+def _leftover_temp_files(directory):
+    return [name for name in os.listdir(directory) if name.endswith('.tmp')]
+
+
+def test_write_json_atomic_replaces_file(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('旧内容', encoding='utf-8')
+    write_json_atomic(str(path), {'stocks': [{'code': '600000', 'name': '浦发银行'}]})
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f)['stocks'][0]['name'] == '浦发银行'
+    assert _leftover_temp_files(tmp_path) == []
+
+
+def test_write_json_atomic_keeps_file_mode(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{}', encoding='utf-8')
+    os.chmod(path, 0o644)
+    write_json_atomic(str(path), {'stocks': []})
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+    # 新建的文件按 umask 取默认权限,而不是临时文件的 0600
+    new_path = tmp_path / 'new.json'
+    umask = os.umask(0o022)
+    try:
+        write_json_atomic(str(new_path), {'stocks': []})
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(new_path).st_mode) == 0o644
+
+
+def test_write_json_atomic_keeps_old_file_on_error(tmp_path):
+    path = tmp_path / 'config.json'
+    write_json_atomic(str(path), {'stocks': []})
+    try:
+        write_json_atomic(str(path), {'stocks': [object()]})
+        assert False, "应当抛出异常"
+    except TypeError:
+        pass
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f) == {'stocks': []}
+    assert _leftover_temp_files(tmp_path) == []
+
+
+def test_submits_are_coalesced(tmp_path):
+    path = tmp_path / 'config.json'
+    persister = ConfigPersister(str(path), delay=0.1)
+    try:
+        for i in range(20):
+            persister.submit({'stocks': [], 'n': i})
+        deadline = time.monotonic() + 2
+        while persister.write_count == 0 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.2)
+        assert persister.write_count == 1
+        with open(path, 'r', encoding='utf-8') as f:
+            assert json.load(f)['n'] == 19
+    finally:
+        persister.close()
+
+
+def test_close_flushes_pending(tmp_path):
+    path = tmp_path / 'config.json'
+    persister = ConfigPersister(str(path), delay=60)
+    persister.submit({'stocks': [], 'n': 1})
+    assert persister.has_pending
+    persister.close()
+    assert not persister.has_pending
+    assert persister.write_count == 1
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f)['n'] == 1
+
+
+def test_engine_write_behind(tmp_path):
+    path = str(tmp_path / 'stock_config.json')
+    engine = MonitorEngine(config_file=path, write_behind=True, save_delay=60)
+    engine.add_stock('600000')
+    engine.stocks['600000'].upper_price = 10.5
+    assert engine.save_config()
+    assert not os.path.exists(path)
+
+    # 加载前会先写出尚未保存的配置
+    engine.load_config()
+    assert engine.stocks['600000'].upper_price == 10.5
+    engine.close()
+
+    other = MonitorEngine(config_file=path)
+    other.load_config()
+    assert other.stocks['600000'].upper_price == 10.5
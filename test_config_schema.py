@@ -0,0 +1,83 @@
+"""
+测试稀疏配置格式、旧版本迁移和批量加载
+"""
+import json
+import math
+
+import pytest
+
+from config_schema import CONFIG_VERSION, dumps_config, loads_config, migrate_config
+from monitor_engine import MonitorEngine
+
+V1_CONFIG = {
+    'stocks': [
+        {'code': '600000', 'name': '浦发银行',
+         'thresholds': {'upper_price': 12.5, 'lower_price': None, 'upper_pct': None, 'lower_pct': -5.0,
+                        'upper_volume': None, 'lower_volume': None, 'upper_high': None, 'lower_high': None,
+                        'upper_low': None, 'lower_low': None, 'upper_amount': None, 'lower_amount': None}},
+        {'code': '000001', 'name': '平安银行',
+         'thresholds': {'upper_price': None, 'lower_price': None}},
+    ]
+}
+
+
+def test_migrate_v1_drops_null_thresholds():
+    migrated = migrate_config(V1_CONFIG)
+    assert migrated['version'] == CONFIG_VERSION
+    assert migrated['stocks'][0]['thresholds'] == {'upper_price': 12.5, 'lower_pct': -5.0}
+    assert 'thresholds' not in migrated['stocks'][1]
+
+
+def test_unknown_version_is_rejected():
+    with pytest.raises(ValueError):
+        migrate_config({'version': 99, 'stocks': []})
+
+
+def test_round_trip_keeps_chinese_names():
+    raw = dumps_config(migrate_config(V1_CONFIG))
+    assert '浦发银行'.encode('utf-8') in raw
+    assert loads_config(raw) == migrate_config(V1_CONFIG)
+
+
+def test_engine_loads_v1_and_saves_sparse_v2(tmp_path):
+    path = tmp_path / 'stock_config.json'
+    path.write_text(json.dumps(V1_CONFIG, ensure_ascii=False), encoding='utf-8')
+
+    engine = MonitorEngine(config_file=str(path))
+    assert engine.load_config()
+    stock = engine.stocks['600000']
+    assert stock.name == '浦发银行'
+    assert stock.upper_price == 12.5 and stock.lower_pct == -5.0
+    assert stock.lower_price is None
+    assert engine.stocks['000001'].upper_price is None
+
+    assert engine.save_config()
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    assert saved['version'] == CONFIG_VERSION
+    assert saved['stocks'][0]['thresholds'] == {'upper_price': 12.5, 'lower_pct': -5.0}
+    assert 'thresholds' not in saved['stocks'][1]
+
+
+def test_bulk_load_many_stocks(tmp_path):
+    path = tmp_path / 'stock_config.json'
+    stocks = [{'code': f"{i:06d}", 'name': f"股票{i}"} for i in range(1000)]
+    for i in range(0, 1000, 7):
+        stocks[i]['thresholds'] = {'upper_price': float(i), 'lower_volume': 100.0}
+    # 重复代码只保留第一次出现的配置
+    stocks.append({'code': '000000', 'name': '重复', 'thresholds': {'upper_price': -1.0}})
+    path.write_bytes(dumps_config({'version': 2, 'stocks': stocks}))
+
+    engine = MonitorEngine(config_file=str(path))
+    assert engine.load_config()
+    assert len(engine.stocks) == len(engine.store) == 1000
+    assert engine.stocks['000000'].name == '股票0'
+    assert engine.stocks['000007'].upper_price == 7.0
+    assert engine.stocks['000007'].lower_volume == 100.0
+    assert engine.stocks['000008'].upper_price is None
+    assert math.isnan(engine.store.column('upper_price')[8])
+    # 加载后的视图与列式表一一对应,可以继续增删
+    engine.remove_stock('000000')
+    engine.add_stock('999999')
+    assert engine.stocks['000007'].upper_price == 7.0
+    assert engine.store.get('999999') is engine.stocks['999999']
@@ -0,0 +1,144 @@
+"""
+测试无界面守护进程: 调度器不漂移、JSON Lines 输出、不依赖 PyQt6
+"""
+import io
+import json
+import os
+import subprocess
+import sys
+
+from daemon import JsonLinesSink, MonitorDaemon, Scheduler, main
+from monitor_engine import MonitorEngine
+from quote_samples import make_tick
+
+
+class FakeClock:
+    """任务执行时推进时间,用来模拟每次刷新的耗时"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_scheduler_is_drift_free():
+    clock = FakeClock()
+    scheduler = Scheduler(5.0, clock)
+    starts = []
+    waits = []
+    scheduler._stop.wait = lambda timeout: (waits.append(timeout), setattr(clock, 'now', clock.now + timeout))
+
+    def task():
+        starts.append(clock.now)
+        clock.now += 1.3  # 每次任务耗时 1.3 秒
+
+    scheduler.run(task, max_runs=5)
+    # 触发时间严格落在 start + k * interval 上,不累积任务耗时
+    assert starts == [100.0, 105.0, 110.0, 115.0, 120.0]
+    assert all(abs(w - 3.7) < 1e-9 for w in waits)
+    assert scheduler.skipped == 0
+
+
+def test_scheduler_skips_missed_ticks():
+    clock = FakeClock()
+    scheduler = Scheduler(5.0, clock)
+    starts = []
+    scheduler._stop.wait = lambda timeout: setattr(clock, 'now', clock.now + timeout)
+    durations = iter([12.0, 1.0, 1.0])
+
+    def task():
+        starts.append(clock.now)
+        clock.now += next(durations)
+
+    scheduler.run(task, max_runs=3)
+    # 第一次耗时 12 秒,错过 105 和 110 两个触发点,下一次在 115 执行
+    assert starts == [100.0, 115.0, 120.0]
+    assert scheduler.skipped == 2
+
+
+class FakeFetcher:
+    def __init__(self, prices):
+        self.prices = iter(prices)
+
+    def get_realtime_quotes(self, codes):
+        price = next(self.prices)
+        return [make_tick(code, price, name='测试') for code in codes]
+
+
+def test_daemon_emits_json_lines(tmp_path):
+    engine = MonitorEngine(str(tmp_path / 'config.json'))
+    engine.add_stock('600000')
+    engine.stocks['600000'].upper_price = 10.0
+    stream = io.StringIO()
+    daemon = MonitorDaemon(engine, FakeFetcher([9.0, 10.5, 10.6, 9.5]), JsonLinesSink(stream))
+    for ts in range(4):
+        daemon.run_once(float(ts))
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(r['kind'], r['rule'], r['ts']) for r in records] == [
+        ('triggered', 'upper_price', 1.0), ('cleared', 'upper_price', 3.0)]
+    assert records[0]['name'] == '测试' and records[0]['price'] == 10.5
+    assert daemon.event_count == 2 and daemon.tick_count == 4
+
+
+def test_daemon_survives_fetch_errors(tmp_path, capsys):
+    class BrokenFetcher:
+        def get_realtime_quotes(self, codes):
+            raise ConnectionError("timeout")
+
+    engine = MonitorEngine(str(tmp_path / 'config.json'))
+    engine.add_stock('600000')
+    daemon = MonitorDaemon(engine, BrokenFetcher(), JsonLinesSink(io.StringIO()))
+    assert daemon.run_once() is None
+    assert daemon.error_count == 1
+
+
+def test_main_writes_file_sink(tmp_path, monkeypatch):
+    import test_data_fetcher
+    monkeypatch.setattr(test_data_fetcher, 'TestDataFetcher',
+                        lambda: type('F', (FakeFetcher,), {'close': lambda self: None})([11.0]))
+    config = tmp_path / 'config.json'
+    engine = MonitorEngine(str(config))
+    engine.add_stock('600000')
+    engine.stocks['600000'].upper_price = 10.0
+    engine.save_config()
+
+    output = tmp_path / 'alerts.jsonl'
+    assert main(['--config', str(config), '--output', str(output), '--count', '1', '--always']) == 0
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert [r['kind'] for r in records] == ['triggered']
+
+
+def test_main_exits_when_notify_config_cannot_be_loaded(tmp_path, capsys):
+    config = tmp_path / 'config.json'
+    MonitorEngine(str(config)).save_config()
+    bad = tmp_path / 'notify.json'
+    bad.write_text('{"webhook": {"url": "http://127.0.0.1:9", "bogus": 1}}', encoding='utf-8')
+    for notify in (bad, tmp_path / 'missing.json'):
+        assert main(['--config', str(config), '--notify', str(notify), '--count', '1', '--always']) == 2
+        assert '加载通知配置' in capsys.readouterr().err
+
+
+def test_daemon_pauses_outside_sessions(tmp_path):
+    from market_session import MarketSession
+    # 2024-06-03 (周一) 11:29:50 北京时间起,时间由等待推进
+    clock = [1717385390.0]
+    engine = MonitorEngine(str(tmp_path / 'config.json'))
+    engine.add_stock('600000')
+    fetched = []
+    fetcher = FakeFetcher([10.0] * 10)
+    fetcher.get_realtime_quotes = lambda codes: fetched.append(clock[0]) or []
+    daemon = MonitorDaemon(engine, fetcher, JsonLinesSink(io.StringIO()), session=MarketSession(),
+                           wall_clock=lambda: clock[0])
+    daemon.scheduler._stop.wait = lambda timeout: clock.__setitem__(0, clock[0] + timeout)
+    daemon.run(max_ticks=3)
+    # 午休前两次,之后等到 13:00
+    assert [t - 1717385390.0 for t in fetched] == [0.0, 5.0, 5410.0]
+
+
+def test_daemon_does_not_import_qt():
+    code = "import sys, daemon; print('PyQt6' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip() == 'False'
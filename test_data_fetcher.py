@@ -1,135 +1,290 @@
-import pandas as pd
 import time
 import random
+import importlib.util
 import requests
+from requests.adapters import HTTPAdapter
 import re
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable
 from data_fetcher import DataFetcher
+from market_snapshot import MarketSnapshotCache, shared_snapshot
+from provider_health import ProviderHealth
+from quote_parsers import parse_tencent, parse_sina_lines
 
-# AkShare 作为可选依赖,如果导入失败也不影响程序运行
-try:
-    import akshare as ak
-    AKSHARE_AVAILABLE = True
-except ImportError:
-    AKSHARE_AVAILABLE = False
-    print("警告: AkShare 未安装或导入失败,将使用腾讯/新浪接口。")
+# AkShare 作为可选依赖: 启动时只检查是否安装,不导入 (导入要数秒),
+# 直到腾讯/新浪都失败、真正需要全市场快照时才由 market_snapshot 导入;导入失败按接口失败处理
+AKSHARE_AVAILABLE = importlib.util.find_spec("akshare") is not None
+if not AKSHARE_AVAILABLE:
+    print("警告: AkShare 未安装,将使用腾讯/新浪接口。")
+
+def _check_status(response):
+    """非 200 响应视为接口失败"""
+    if response.status_code != 200:
+        raise requests.HTTPError(f"HTTP {response.status_code}: {response.url}", response=response)
 
 class TestDataFetcher(DataFetcher):
     """
     测试数据获取实现类,负责从 AkShare 获取股票实时行情数据。
     支持多源备份(AkShare EM接口 -> 腾讯财经 -> 新浪财经)。
+    
+    腾讯/新浪接口按 batch_size 将代码分批,通过最多 max_workers 个线程并发请求,
+    结果按分批顺序合并。每个接口最近一次请求的分批耗时记录在 chunk_timings 中,
+    便于调整批大小。
+    
+    每个接口持有一个长连接 requests.Session (keep-alive,连接池大小与并发数一致),
+    避免每次刷新都重新建立 TCP 连接和 DNS 解析。可以通过 sessions/urls 参数注入
+    自定义的 Session 和接口地址(例如测试时指向本地桩服务器),用完后调用 close()。
+    
+    AkShare 兜底使用带 TTL 的全市场快照缓存,默认在所有实例间共享。
+    全市场快照中也没有的代码 (无效或退市代码) 按 missing_backoff 秒起、每次加倍、
+    最多 max_missing_backoff 秒退避,退避期间不再为它们下载全市场数据。
+    
+    每个接口的成功率、延迟和连续失败次数记录在 health 中 (见 get_provider_health),
+    熔断中的接口会被跳过,其余接口按健康状况排序,AkShare 因为是全量下载始终放在最后。
     """
+    __test__ = False  # 类名以 Test 开头,避免被 pytest 当作测试类收集
+    
+    DEFAULT_URLS = {
+        'tencent': 'http://qt.gtimg.cn/q=',
+        'sina': 'http://hq.sinajs.cn/list=',
+    }
+    DEFAULT_HEADERS = {
+        'sina': {'Referer': 'http://finance.sina.com.cn'},  # 新浪接口需要 Referer
+    }
+    # 需要下载全市场数据的接口,对已知缺失的代码退避
+    FULL_MARKET_PROVIDERS = ('akshare',)
+    
+    def __init__(self, batch_size: int = 100, max_workers: int = 4,
+                 sessions: Optional[Dict[str, requests.Session]] = None,
+                 urls: Optional[Dict[str, str]] = None, timeout: float = 3,
+                 market_snapshot: Optional[MarketSnapshotCache] = None,
+                 missing_backoff: float = 60.0, max_missing_backoff: float = 3600.0):
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.market_snapshot = market_snapshot or shared_snapshot
+        self.health: Dict[str, ProviderHealth] = {
+            name: ProviderHealth(name) for name in ('tencent', 'sina', 'akshare')
+        }
+        self.chunk_timings: Dict[str, List[Dict]] = {}
+        self.missing_codes: List[str] = []  # 最近一次获取后所有接口都没有返回的代码
+        self.missing_backoff = missing_backoff
+        self.max_missing_backoff = max_missing_backoff
+        # 全市场快照中也没有的代码 -> (下次允许向全市场接口请求的时间, 当前退避秒数)
+        self._known_missing: Dict[str, tuple] = {}
+        self.urls = dict(self.DEFAULT_URLS)
+        if urls:
+            self.urls.update(urls)
+        
+        # 注入的 Session 由调用方负责关闭,这里只关闭自己创建的
+        self.sessions: Dict[str, requests.Session] = dict(sessions or {})
+        self._owned_sessions = []
+        for provider in self.DEFAULT_URLS:
+            if provider not in self.sessions:
+                self.sessions[provider] = self._create_session()
+                self._owned_sessions.append(self.sessions[provider])
+    
+    def _create_session(self) -> requests.Session:
+        """创建带连接池的长连接 Session"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+    
+    def close(self):
+        """关闭自己创建的 Session,释放连接池"""
+        for session in self._owned_sessions:
+            session.close()
+        self._owned_sessions = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
     
     def get_realtime_quotes(self, stock_codes: List[str]) -> List[Dict]:
         """
         获取指定股票代码列表的实时行情数据。
         优先使用针对性强的"指定代码"接口,避免获取全量数据。
+        按代码逐只跟踪:前一个接口缺失的代码才交给下一个接口补齐,结果按代码合并,
+        返回顺序与 stock_codes 一致。
         """
         if not stock_codes:
             return []
-            
-        # 尝试 1: 腾讯财经接口 (最推荐:支持指定代码,速度极快且稳定)
-        results = self._get_from_tencent(stock_codes)
-        if results and len(results) >= len(stock_codes) * 0.8:
-            return results
-
-        # 尝试 2: 新浪财经接口 (备份:同样支持指定代码)
-        print("尝试 [接口 2] 新浪财经备份...")
-        results = self._get_from_sina(stock_codes)
-        if results and len(results) >= len(stock_codes) * 0.8:
-            return results
-
-        # 尝试 3: AkShare 东方财富接口 (最终兜底:虽然是全量获取,但在前两个接口都挂掉时作为保障)
+        
+        merged = self._fill_gaps(stock_codes, self._providers())
+        if not merged:
+            print("所有接口获取失败,请检查网络或股票代码是否正确。")
+        return [merged[code] for code in dict.fromkeys(stock_codes) if code in merged]
+
+    def _providers(self) -> List[tuple]:
+        """
+        返回本次应尝试的 (接口名, 获取函数) 列表。
+        默认优先级:
+        1. 腾讯财经 (最推荐:支持指定代码,速度极快且稳定)
+        2. 新浪财经 (备份:同样支持指定代码)
+        3. AkShare 东方财富 (最终兜底:虽然是全量获取,但在前两个接口都挂掉时作为保障)
+        前两个接口按观测到的健康状况重新排序,熔断中的接口被跳过;
+        如果所有接口都处于熔断状态,仍按原顺序全部尝试。
+        """
+        targeted = [('tencent', self._get_from_tencent), ('sina', self._get_from_sina)]
+        targeted.sort(key=lambda p: self.health[p[0]].sort_key())
+        providers = targeted
         if AKSHARE_AVAILABLE:
-            print("尝试 [接口 3] AkShare EM 兜底...")
+            providers = providers + [('akshare', self._get_from_akshare)]
+        available = [p for p in providers if self.health[p[0]].is_available()]
+        return available or providers
+
+    def get_provider_health(self) -> Dict[str, Dict]:
+        """返回各接口的健康统计,供界面展示或日志记录"""
+        return {name: health.stats() for name, health in self.health.items()}
+
+    def _call_provider(self, name: str, fetch: Callable[[List[str]], List[Dict]],
+                       stock_codes: List[str]) -> List[Dict]:
+        """
+        调用一个接口并记录耗时和成败。
+        只有网络错误、HTTP 错误等异常才算失败;接口正常响应但缺少部分代码 (如无效或退市代码) 仍算成功,
+        否则一个无效代码就会让每次补请求都记为失败,把健康的接口熔断。
+        """
+        start = time.perf_counter()
+        try:
+            results = fetch(stock_codes)
+            ok = True
+        except Exception as e:
+            print(f"{name} 接口获取失败: {e}")
+            results = []
+            ok = False
+        self.health[name].record(ok, time.perf_counter() - start)
+        return results
+
+    def _fill_gaps(self, stock_codes: List[str], providers: List[tuple],
+                   merged: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """
+        依次用各接口补齐 merged 中缺失的代码,每个接口只请求仍然缺失的代码。
+        全市场接口跳过退避中的已知缺失代码。返回 {代码: 行情字典}。
+        """
+        merged = dict(merged or {})
+        missing = [code for code in dict.fromkeys(stock_codes) if code not in merged]
+        now = time.monotonic()
+        for i, (name, fetch) in enumerate(providers):
+            if not missing:
+                break
+            wanted = missing
+            if name in self.FULL_MARKET_PROVIDERS:
+                wanted = [code for code in missing
+                          if code not in self._known_missing or now >= self._known_missing[code][0]]
+                if not wanted:
+                    continue
+            if merged or i > 0:
+                print(f"尝试 [{name}] 补齐 {len(wanted)} 只股票...")
+            wanted_set = set(wanted)
+            for item in self._call_provider(name, fetch, wanted):
+                code = item.get('code')
+                if code in wanted_set and code not in merged:
+                    merged[code] = item
+            missing = [code for code in missing if code not in merged]
+            # 全市场接口正常返回却仍然没有的代码,加入 (或延长) 退避
+            if name in self.FULL_MARKET_PROVIDERS and self.health[name].consecutive_failures == 0:
+                for code in wanted:
+                    if code not in merged:
+                        delay = self._known_missing.get(code, (0.0, self.missing_backoff / 2))[1] * 2
+                        delay = min(delay, self.max_missing_backoff)
+                        self._known_missing[code] = (now + delay, delay)
+        for code in merged:
+            self._known_missing.pop(code, None)
+        self.missing_codes = missing
+        return merged
+
+    def _get_from_akshare(self, stock_codes: List[str]) -> List[Dict]:
+        """从 AkShare 东方财富全市场快照(带缓存)中查询指定代码"""
+        if not AKSHARE_AVAILABLE:
+            return []
+        results = self.market_snapshot.get(stock_codes)
+        if self.market_snapshot.last_error is not None:
+            raise RuntimeError(f"全市场快照下载失败: {self.market_snapshot.last_error}")
+        return results
+
+    def _fetch_in_chunks(self, provider: str, fetch_chunk: Callable[[List[str]], List[Dict]],
+                         stock_codes: List[str]) -> List[Dict]:
+        """
+        将代码按 batch_size 分批,并发调用 fetch_chunk,按分批顺序合并结果。
+        每批的耗时记录到 chunk_timings[provider] (只保留最近一次调用的记录)。
+        个别批次出错时跳过该批,返回其余批次的结果;所有批次都出错时抛出第一个错误。
+        """
+        chunks = [stock_codes[i:i + self.batch_size]
+                  for i in range(0, len(stock_codes), self.batch_size)]
+        timings = [None] * len(chunks)
+        errors = [None] * len(chunks)
+
+        def run(index: int) -> List[Dict]:
+            start = time.perf_counter()
             try:
-                df = ak.stock_zh_a_spot_em()
-                if df is not None and not df.empty:
-                    mask = df['代码'].isin(stock_codes)
-                    filtered_df = df[mask].copy()
-                    results = []
-                    for _, row in filtered_df.iterrows():
-                        results.append({
-                            'code': str(row['代码']),
-                            'name': str(row['名称']),
-                            'price': float(row['最新价']) if pd.notnull(row['最新价']) else 0.0,
-                            'pct_change': float(row['涨跌幅']) if pd.notnull(row['涨跌幅']) else 0.0,
-                            'volume': float(row['成交量']) if pd.notnull(row['成交量']) else 0.0,
-                            'high': float(row['最高']) if pd.notnull(row['最高']) else 0.0,
-                            'low': float(row['最低']) if pd.notnull(row['最低']) else 0.0,
-                            'amount': float(row['成交额']) if pd.notnull(row['成交额']) else 0.0
-                        })
-                    return results
+                chunk_results = fetch_chunk(chunks[index])
             except Exception as e:
-                print(f"AkShare 接口失败: {e}")
-        
-        print("所有接口获取失败,请检查网络或股票代码是否正确。")
-        return []
+                errors[index] = e
+                chunk_results = []
+            timings[index] = {
+                'provider': provider,
+                'chunk': index,
+                'size': len(chunks[index]),
+                'received': len(chunk_results),
+                'elapsed': time.perf_counter() - start
+            }
+            return chunk_results
 
-    def _get_from_tencent(self, stock_codes: List[str]) -> List[Dict]:
-        """从腾讯财经接口获取数据"""
+        if len(chunks) == 1:
+            chunk_results = [run(0)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+                chunk_results = list(pool.map(run, range(len(chunks))))
+
+        self.chunk_timings[provider] = [t for t in timings if t is not None]
+        failed = [e for e in errors if e is not None]
+        if failed and len(failed) == len(chunks):
+            raise failed[0]
+        for index, error in enumerate(errors):
+            if error is not None:
+                print(f"{provider} 接口第 {index + 1} 批获取失败: {error}")
         results = []
+        for part in chunk_results:
+            results.extend(part)
+        return results
+
+    def _get_from_tencent(self, stock_codes: List[str]) -> List[Dict]:
+        """从腾讯财经接口获取数据(分批并发)"""
+        return self._fetch_in_chunks('tencent', self._fetch_tencent_chunk, stock_codes)
+
+    def _fetch_tencent_chunk(self, stock_codes: List[str]) -> List[Dict]:
+        """从腾讯财经接口获取一批数据,网络错误和非 200 响应抛出异常 (计入接口健康状况)"""
         formatted_codes = [f"sh{c}" if c.startswith(('6', '9')) else f"sz{c}" for c in stock_codes]
-        url = f"http://qt.gtimg.cn/q={','.join(formatted_codes)}"
-        try:
-            response = requests.get(url, timeout=3)
-            if response.status_code == 200:
-                lines = response.text.split(';')
-                for line in lines:
-                    parts = line.split('~')
-                    if len(parts) > 40:
-                        results.append({
-                            'code': parts[2],
-                            'name': parts[1],
-                            'price': float(parts[3]),
-                            'pct_change': float(parts[32]),
-                            'volume': float(parts[6]),
-                            'high': float(parts[33]),
-                            'low': float(parts[34]),
-                            'amount': float(parts[37]) * 10000 
-                        })
-            return results
-        except Exception as e:
-            print(f"腾讯接口获取失败: {e}")
-        return []
+        url = f"{self.urls['tencent']}{','.join(formatted_codes)}"
+        response = self.sessions['tencent'].get(url, timeout=self.timeout)
+        _check_status(response)
+        # 直接解析原始字节,只解码用到的字段
+        return parse_tencent(response.content)
 
     def _get_from_sina(self, stock_codes: List[str]) -> List[Dict]:
-        """从新浪财经接口获取数据"""
-        results = []
+        """从新浪财经接口获取数据(分批并发)"""
+        return self._fetch_in_chunks('sina', self._fetch_sina_chunk, stock_codes)
+
+    def _fetch_sina_chunk(self, stock_codes: List[str]) -> List[Dict]:
+        """
+        从新浪财经接口获取一批数据(边接收边解析,代码取自返回的变量名),
+        网络错误和非 200 响应抛出异常 (计入接口健康状况)
+        """
         formatted_codes = [f"sh{c}" if c.startswith(('6', '9')) else f"sz{c}" for c in stock_codes]
-        url = f"http://hq.sinajs.cn/list={','.join(formatted_codes)}"
-        headers = {'Referer': 'http://finance.sina.com.cn'} # 新浪接口需要 Referer
-        try:
-            response = requests.get(url, headers=headers, timeout=3)
-            if response.status_code == 200:
-                lines = response.text.split('\n')
-                for i, line in enumerate(lines):
-                    if '="' not in line: continue
-                    data_str = line.split('="')[1].split('",')[0]
-                    parts = data_str.split(',')
-                    if len(parts) >= 30:
-                        code = stock_codes[i]
-                        price = float(parts[3])
-                        pre_close = float(parts[2])
-                        pct_change = round((price - pre_close) / pre_close * 100, 2) if pre_close != 0 else 0
-                        results.append({
-                            'code': code,
-                            'name': parts[0],
-                            'price': price,
-                            'pct_change': pct_change,
-                            'volume': float(parts[8]) / 100, # 新浪成交量单位是股,转为手
-                            'high': float(parts[4]),
-                            'low': float(parts[5]),
-                            'amount': float(parts[9])
-                        })
-            return results
-        except Exception as e:
-            print(f"新浪接口获取失败: {e}")
-        return []
+        url = f"{self.urls['sina']}{','.join(formatted_codes)}"
+        with self.sessions['sina'].get(url, headers=self.DEFAULT_HEADERS['sina'],
+                                       timeout=self.timeout, stream=True) as response:
+            _check_status(response)
+            return list(parse_sina_lines(response.iter_lines()))
 
 if __name__ == "__main__":
     # 测试代码
-    fetcher = TestDataFetcher()
-    test_codes = ['600000', '000001']
-    data = fetcher.get_realtime_quotes(test_codes)
-    print(data)
+    with TestDataFetcher() as fetcher:
+        test_codes = ['600000', '000001']
+        data = fetcher.get_realtime_quotes(test_codes)
+        print(data)
@@ -0,0 +1,125 @@
+"""
+测试后台行情抓取器：结果回到 GUI 线程，且同一时刻最多一次抓取
+"""
+import threading
+import time
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+from gui.fetch_worker import FetchWorker
+
+
+class SlowFetcher:
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.threads = []
+
+    def get_realtime_quotes(self, stock_codes):
+        self.calls += 1
+        self.threads.append(threading.current_thread())
+        time.sleep(self.delay)
+        return [{'code': c, 'name': c, 'price': 1.0} for c in stock_codes]
+
+
+def _wait(ms):
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec()
+
+
+def test_fetch_worker_single_flight():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    fetcher = SlowFetcher()
+    worker = FetchWorker(fetcher)
+    received = []
+    worker.data_ready.connect(lambda data: received.append(data))
+
+    assert worker.request_fetch(['600000', '000001'])
+    # 抓取进行中，后续请求被跳过
+    assert not worker.request_fetch(['600000'])
+    assert not worker.request_fetch(['600000'])
+    assert worker.skipped_ticks == 2
+
+    _wait(600)
+    worker.stop()
+
+    assert fetcher.calls == 1
+    assert fetcher.threads[0] is not threading.main_thread()
+    assert len(received) == 1
+    assert [d['code'] for d in received[0]] == ['600000', '000001']
+    assert not worker.busy
+
+
+def test_fetch_worker_batches():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    fetcher = SlowFetcher(delay=0.0)
+    fetcher.get_quotes_batches = lambda batches: [item for batch in batches
+                                                  for item in fetcher.get_realtime_quotes(batch)]
+    worker = FetchWorker(fetcher)
+    received = []
+    worker.data_ready.connect(lambda data: received.append(data))
+
+    assert not worker.request_batches([[], []])
+    assert worker.request_batches([['600000'], ['000001', '300750']])
+    # 抓取进行中: 批次函数不会被调用，跳过只计一次
+    polled = []
+    assert not worker.request_batches(lambda: polled.append(1) or [['600000']])
+    assert polled == [] and worker.skipped_ticks == 1
+    _wait(300)
+    worker.stop()
+
+    # 每级单独请求一次
+    assert fetcher.calls == 2
+    assert [d['code'] for d in received[0]] == ['600000', '000001', '300750']
+
+
+def test_fetch_worker_queues_requests_while_busy():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    fetcher = SlowFetcher(delay=0.2)
+    fetcher.get_quotes_batches = lambda batches: [item for batch in batches
+                                                  for item in fetcher.get_realtime_quotes(batch)]
+    worker = FetchWorker(fetcher)
+    received = []
+    worker.data_ready.connect(lambda data: received.append([d['code'] for d in data]))
+
+    assert worker.request_batches([['600000']])
+    # 抓取进行中到期的收盘快照排队，不丢弃也不计入跳过次数
+    assert not worker.request_batches([['600000', '000001']], queue=True)
+    assert not worker.request_batches([['000001', '300750']], queue=True)
+    assert worker.skipped_ticks == 0
+
+    _wait(1000)
+    worker.stop()
+
+    # 排队的请求在第一次抓取结束后合并为一次抓取，重复的代码只抓取一次
+    assert received == [['600000'], ['600000', '000001', '300750']]
+    assert not worker.busy
+
+
+def test_stop_defers_close_until_fetch_finishes():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    fetcher = SlowFetcher(delay=0.5)
+    closed = []
+    fetcher.close = lambda: closed.append(fetcher.calls)
+    worker = FetchWorker(fetcher)
+
+    assert worker.request_fetch(['600000'])
+    time.sleep(0.1)
+    # 抓取仍在进行: 超时返回 False，不立即关闭
+    assert not worker.stop(timeout_ms=50, on_stopped=fetcher.close)
+    assert closed == []
+    # 抓取结束、线程退出后才关闭
+    time.sleep(0.8)
+    assert closed == [1]
+
+    idle = FetchWorker(SlowFetcher())
+    stopped = []
+    assert idle.stop(on_stopped=lambda: stopped.append(True))
+    assert stopped == [True]
+
+
+if __name__ == "__main__":
+    test_fetch_worker_single_flight()
+    test_fetch_worker_batches()
+    test_fetch_worker_queues_requests_while_busy()
+    test_stop_defers_close_until_fetch_finishes()
+    print("✓ FetchWorker 测试通过")
@@ -0,0 +1,133 @@
+"""
+测试滚动窗口技术指标及其预警
+"""
+import math
+import random
+
+import numpy as np
+
+from indicators import IndicatorEngine
+from monitor_engine import MonitorEngine
+from quote_samples import make_tick
+
+
+def _reference_ma(prices, window):
+    return sum(prices[-window:]) / window if len(prices) >= window else math.nan
+
+
+def test_ma_matches_full_recomputation():
+    rng = random.Random(1)
+    engine = IndicatorEngine(ma_window=5, capacity=2)
+    history = {code: [] for code in ('a', 'b', 'c')}
+    for _ in range(40):
+        # 每次只送入部分股票,顺序也不固定
+        codes = rng.sample(list(history), rng.randint(1, 3))
+        prices = [rng.uniform(9, 11) for _ in codes]
+        result = engine.update(codes, 0.0, np.array(prices), np.zeros(len(codes)))
+        for code, price, ma in zip(codes, prices, result['ma']):
+            history[code].append(price)
+            expected = _reference_ma(history[code], 5)
+            assert (math.isnan(ma) and math.isnan(expected)) or abs(ma - expected) < 1e-9
+
+
+def test_ma_cross_direction():
+    engine = IndicatorEngine(ma_window=3)
+    crosses = [engine.update(['a'], 0.0, np.array([p]), np.zeros(1))['ma_cross'][0]
+               for p in (10, 10, 10, 11, 11, 11, 9)]
+    assert math.isnan(crosses[0]) and math.isnan(crosses[1])
+    assert crosses[3] == 1.0
+    assert crosses[4:6] == [0.0, 0.0]
+    assert crosses[6] == -1.0
+
+
+def test_move_pct_uses_price_at_window_start():
+    engine = IndicatorEngine(move_seconds=60, history=8)
+    moves = [engine.update(['a'], t, np.array([10.0 + t / 10]), np.zeros(1))['move_pct'][0]
+             for t in range(0, 200, 15)]
+    # 窗口未覆盖 60 秒之前没有数值
+    assert all(math.isnan(m) for m in moves[:4])
+    # t=60 时基准为 t=0 的价格 10.0
+    assert abs(moves[4] - 60.0) < 1e-9
+    # t=195 时基准为 t=135 (<=135 的最后一个样本) 的价格 23.5
+    assert abs(moves[-1] - (29.5 - 23.5) / 23.5 * 100) < 1e-9
+
+
+def test_volume_ratio_against_rolling_mean():
+    engine = IndicatorEngine(volume_window=3)
+    volume = 0.0
+    ratios = []
+    for i, delta in enumerate((0, 100, 100, 100, 300, 100)):
+        volume += delta
+        ratios.append(engine.update(['a'], i * 5.0, np.zeros(1), np.array([volume]))['volume_ratio'][0])
+    assert all(math.isnan(r) for r in ratios[:4])
+    assert ratios[4] == 3.0
+    assert abs(ratios[5] - 100 / (500 / 3)) < 1e-9
+    # 累计成交量变小 (新交易日) 时重新积累
+    assert math.isnan(engine.update(['a'], 30.0, np.zeros(1), np.array([50.0]))['volume_ratio'][0])
+
+
+def test_volume_ratio_across_interval_change():
+    # 成交节奏不变 (每秒 20 手),抓取间隔从 5 秒变为 60 秒 (分级抓取换级): 量比保持 1,不误报
+    engine = IndicatorEngine(volume_window=3)
+    ts, volume, ratios = 0.0, 0.0, []
+    for dt in (5, 5, 5, 5, 60, 60, 1):
+        ts += dt
+        volume += 20 * dt
+        ratios.append(engine.update(['a'], ts, np.zeros(1), np.array([volume]))['volume_ratio'][0])
+    assert all(abs(r - 1.0) < 1e-9 for r in ratios[4:])
+    # 成交加速才会抬高量比
+    ratio = engine.update(['a'], ts + 1, np.zeros(1), np.array([volume + 100]))['volume_ratio'][0]
+    assert abs(ratio - 5.0) < 1e-9
+
+
+def test_volatility_is_per_second():
+    engine = IndicatorEngine(volatility_window=1)
+    first = engine.update(['a', 'b'], 0.0, np.array([10.0, 10.0]), np.zeros(2))['volatility']
+    assert np.isnan(first).all()
+    # a 1 秒涨 0.1%,b 4 秒涨 0.2%: 每秒波动相同
+    a = engine.update(['a'], 1.0, np.array([10.01]), np.zeros(1))['volatility'][0]
+    b = engine.update(['b'], 4.0, np.array([10.02]), np.zeros(1))['volatility'][0]
+    assert abs(a - 0.1) < 1e-9 and abs(b - 0.1) < 1e-9
+
+
+def test_removed_code_starts_fresh():
+    engine = IndicatorEngine(ma_window=2)
+    engine.update(['a'], 0.0, np.array([10.0]), np.zeros(1))
+    engine.update(['a'], 0.0, np.array([10.0]), np.zeros(1))
+    engine.remove('a')
+    assert math.isnan(engine.update(['b'], 0.0, np.array([5.0]), np.zeros(1))['ma'][0])
+
+
+def test_engine_indicator_alerts_match_scalar_check(tmp_path):
+    engine = MonitorEngine(config_file=str(tmp_path / 'config.json'),
+                           indicators=IndicatorEngine(ma_window=3, move_seconds=30, volume_window=3))
+    for code in ('a', 'b'):
+        engine.add_stock(code)
+        stock = engine.stocks[code]
+        stock.alert_ma_cross = True
+        stock.upper_move_pct = 5.0
+        stock.upper_volume_ratio = 2.5
+
+    prices = [10.0, 10.0, 10.1, 9.9, 11.0]
+    volumes = [100.0, 200.0, 300.0, 400.0, 800.0]
+    for i, (price, volume) in enumerate(zip(prices, volumes)):
+        tick = [make_tick('a', price, volume=volume), make_tick('b', 10.0 + i * 0.01, volume=volume)]
+        changes = engine.update_stocks_data(tick, ts=i * 10.0)
+
+    a = engine.stocks['a']
+    assert a.ma_cross == 1.0 and a.volume_ratio == 4.0
+    assert abs(a.move_pct - 10.0) < 1e-9
+    assert 'a' in changes.alerting
+    vectorized = list(a.alert_reasons)
+    assert len(vectorized) == 3
+    a.check_alerts()
+    assert a.alert_reasons == vectorized
+    assert a.is_alerting
+
+    # 指标阈值随配置保存与加载
+    engine.save_config()
+    other = MonitorEngine(config_file=str(tmp_path / 'config.json'))
+    other.load_config()
+    assert other.stocks['a'].alert_ma_cross
+    assert other.stocks['a'].upper_volume_ratio == 2.5
+    assert other.stocks['a'].ma is None
@@ -0,0 +1,76 @@
+"""
+测试沪深交易时段判断和按时段安排抓取
+"""
+from datetime import date, datetime
+
+import pytest
+
+from market_session import (CALL_AUCTION, CLOSED, CLOSING_AUCTION, CONTINUOUS, LUNCH_BREAK, CHINA_TZ,
+                            MarketSession, PollSchedule, load_holidays)
+
+
+def at(y, m, d, hh, mm, ss=0):
+    return datetime(y, m, d, hh, mm, ss, tzinfo=CHINA_TZ).timestamp()
+
+
+# 2024-06-03 为周一
+def test_phases_of_a_trading_day():
+    session = MarketSession()
+    expected = [((9, 0), CLOSED), ((9, 20), CALL_AUCTION), ((10, 0), CONTINUOUS), ((12, 0), LUNCH_BREAK),
+                ((13, 0), CONTINUOUS), ((14, 58), CLOSING_AUCTION), ((15, 0), CLOSED), ((20, 0), CLOSED)]
+    for (hh, mm), phase in expected:
+        assert session.phase_at(at(2024, 6, 3, hh, mm))[0] == phase
+    assert session.phase_at(at(2024, 6, 1, 10, 0))[0] == CLOSED  # 周六
+
+
+def test_lunch_break_resumes_at_one():
+    session = MarketSession()
+    # 11:29:55 是最后一个上午的抓取点,之后直接到 13:00
+    assert session.next_fetch(at(2024, 6, 3, 11, 29, 55)) == at(2024, 6, 3, 13, 0)
+    assert session.next_fetch(at(2024, 6, 3, 12, 0)) == at(2024, 6, 3, 13, 0)
+
+
+def test_fetch_times_are_aligned_to_phase_start():
+    session = MarketSession(intervals={CONTINUOUS: 3.0})
+    assert session.next_fetch(at(2024, 6, 3, 9, 30, 1)) == at(2024, 6, 3, 9, 30, 3)
+    assert session.next_fetch(at(2024, 6, 3, 9, 30, 3)) == at(2024, 6, 3, 9, 30, 6)
+    assert session.next_fetch(at(2024, 6, 3, 9, 30, 3), inclusive=True) == at(2024, 6, 3, 9, 30, 3)
+
+
+def test_post_close_snapshot_then_next_open_after_weekend_and_holiday():
+    # 2024-06-07 周五收盘;2024-06-10 端午节休市
+    session = MarketSession(holidays=['2024-06-10'], post_close_delay=30)
+    snapshot = session.next_fetch(at(2024, 6, 7, 14, 59, 59))
+    assert snapshot == at(2024, 6, 7, 15, 0, 30)
+    assert session.next_fetch(snapshot) == at(2024, 6, 11, 9, 15)
+    assert session.next_fetch(at(2024, 6, 8, 3, 0)) == at(2024, 6, 11, 9, 15)
+    assert not session.is_open(at(2024, 6, 10, 10, 0))
+
+    no_snapshot = MarketSession(post_close_delay=None)
+    assert no_snapshot.next_fetch(at(2024, 6, 7, 14, 59, 59)) == at(2024, 6, 10, 9, 15)
+
+
+def test_poll_schedule_pauses_and_skips_missed_points():
+    session = MarketSession()
+    schedule = PollSchedule(session, at(2024, 6, 3, 11, 29, 50))
+    assert schedule.due(at(2024, 6, 3, 11, 29, 50))
+    # 抓取耗时 7 秒,错过 11:29:55,直接进入午休
+    assert schedule.next_due == at(2024, 6, 3, 11, 29, 55)
+    assert schedule.due(at(2024, 6, 3, 11, 30, 2))
+    assert schedule.next_due == at(2024, 6, 3, 13, 0)
+    assert not schedule.due(at(2024, 6, 3, 12, 0))
+    assert schedule.wait_time(at(2024, 6, 3, 12, 0)) == 60.0
+    assert schedule.wait_time(at(2024, 6, 3, 12, 59, 58)) == 2.0
+
+
+def test_intervals_and_holidays_validation(tmp_path):
+    with pytest.raises(ValueError):
+        MarketSession(intervals={'night': 5.0})
+    with pytest.raises(ValueError):
+        MarketSession(intervals={CONTINUOUS: 0})
+    path = tmp_path / 'holidays.txt'
+    path.write_text("# 2024 端午\n2024-06-10\n\n", encoding='utf-8')
+    assert load_holidays(str(path)) == {date(2024, 6, 10)}
+    path.write_text('["2024-10-01", "2024-10-02"]', encoding='utf-8')
+    assert len(load_holidays(str(path))) == 2
+    assert load_holidays(str(tmp_path / 'missing.txt')) == set()
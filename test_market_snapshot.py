@@ -0,0 +1,87 @@
+"""
+测试全市场快照缓存：TTL 内只下载一次、按代码索引查询、启动时不导入 pandas
+"""
+import os
+import subprocess
+import sys
+import time
+import pandas as pd
+from market_snapshot import MarketSnapshotCache
+
+
+def make_market():
+    return pd.DataFrame({
+        '代码': ['600000', '000001', '300750'],
+        '名称': ['浦发银行', '平安银行', '宁德时代'],
+        '最新价': [10.12, 11.5, None],
+        '涨跌幅': [-1.08, 0.88, None],
+        '成交量': [759256.0, 1200000.0, 0],
+        '最高': [10.27, 11.62, None],
+        '最低': [10.06, 11.35, None],
+        '成交额': [769320000.0, 1380000000.0, None],
+    })
+
+
+def test_snapshot_cached_within_ttl():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return make_market()
+
+    cache = MarketSnapshotCache(loader, ttl=60)
+    first = cache.get(['000001', '600000', '999999'])
+    second = cache.get(['300750'])
+
+    assert len(calls) == 1
+    assert [d['code'] for d in first] == ['000001', '600000']
+    assert first[1] == {
+        'code': '600000', 'name': '浦发银行', 'price': 10.12, 'pct_change': -1.08,
+        'volume': 759256.0, 'high': 10.27, 'low': 10.06, 'amount': 769320000.0
+    }
+    # 停牌股票的空值转为 0.0
+    assert second[0]['price'] == 0.0
+    assert isinstance(second[0]['price'], float)
+
+
+def test_snapshot_reloads_after_ttl():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return make_market()
+
+    cache = MarketSnapshotCache(loader, ttl=0.05)
+    cache.get(['600000'])
+    time.sleep(0.06)
+    cache.get(['600000'])
+    assert len(calls) == 2
+
+
+def test_snapshot_failure_not_retried_within_ttl():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        raise ConnectionError("network down")
+
+    cache = MarketSnapshotCache(loader, ttl=60)
+    assert cache.get(['600000']) == []
+    assert cache.get(['600000']) == []
+    assert len(calls) == 1
+
+
+def test_fetcher_import_does_not_load_pandas():
+    """pandas/AkShare 只在兜底接口真正下载快照时导入"""
+    code = "import sys, test_data_fetcher; print([m for m in ('pandas', 'akshare') if m in sys.modules])"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert result.stdout.strip().splitlines()[-1] == '[]'
+
+
+if __name__ == "__main__":
+    test_snapshot_cached_within_ttl()
+    test_snapshot_reloads_after_ttl()
+    test_snapshot_failure_not_retried_within_ttl()
+    test_fetcher_import_does_not_load_pandas()
+    print("✓ 全市场快照缓存测试通过")
@@ -0,0 +1,241 @@
+"""
+测试预警通知: 各渠道 (日志、webhook、邮件、桌面) 的发送、攒批、限速、重试和溢出统计。
+webhook 和邮件分别发送到本地的 HTTP / SMTP 桩服务器。
+"""
+import email
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from monitor_engine import MonitorEngine
+from notifier import (DesktopSink, LogFileSink, Notifier, SinkWorker, SmtpSink, WebhookSink,
+                      alert_records, format_record, load_notifier)
+
+
+def _record(code='600000', kind='triggered', ts=0.0):
+    return {'code': code, 'name': '浦发银行', 'kind': kind, 'rule': 'upper_price', 'ts': ts,
+            'reason': '价格突破上限', 'price': 10.5}
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("等待超时")
+        time.sleep(0.01)
+
+
+class ListSink:
+    def __init__(self, name='list', failures=0, block=None):
+        self.name = name
+        self.batches = []
+        self.failures = failures
+        self.block = block
+
+    def send(self, records):
+        if self.block is not None:
+            self.block.wait()
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("暂时不可用")
+        self.batches.append(list(records))
+
+
+@pytest.fixture
+def webhook_server():
+    received = []
+    statuses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            status = statuses.pop(0) if statuses else 200
+            if status == 200:
+                received.append(json.loads(body))
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/hook", received, statuses
+    server.shutdown()
+    server.server_close()
+
+
+class SmtpStubHandler(socketserver.StreamRequestHandler):
+    """只实现发送一封邮件所需的 SMTP 命令"""
+
+    def handle(self):
+        self.wfile.write(b"220 stub\r\n")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line.split(' ', 1)[0].upper()
+            if command in ('EHLO', 'HELO'):
+                self.wfile.write(b"250 stub\r\n")
+            elif command in ('MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.wfile.write(b"250 OK\r\n")
+            elif command == 'DATA':
+                self.wfile.write(b"354 go ahead\r\n")
+                lines = []
+                while True:
+                    data = self.rfile.readline()
+                    if data == b".\r\n":
+                        break
+                    lines.append(data)
+                self.server.messages.append(email.message_from_bytes(b''.join(lines)))
+                self.wfile.write(b"250 queued\r\n")
+            elif command == 'QUIT' or not line:
+                self.wfile.write(b"221 bye\r\n")
+                return
+            else:
+                self.wfile.write(b"502 not implemented\r\n")
+
+
+@pytest.fixture
+def smtp_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SmtpStubHandler)
+    server.daemon_threads = True
+    server.messages = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_webhook_batches_and_retries(webhook_server):
+    url, received, statuses = webhook_server
+    statuses.extend([503])
+    notifier = Notifier(batch_size=10, batch_delay=0.2, backoff=0.01)
+    notifier.add_sink(WebhookSink(url))
+    notifier.submit([_record('600000'), _record('000001')])
+    notifier.submit([_record('300750')])
+    _wait_until(lambda: notifier.stats()['sinks']['webhook']['sent'] == 3)
+    notifier.close()
+
+    # 第一次返回 503,重试后三条合成一批发送
+    assert [[a['code'] for a in body['alerts']] for body in received] == [['600000', '000001', '300750']]
+    stats = notifier.stats()['sinks']['webhook']
+    assert stats['retries'] == 1 and stats['batches'] == 1 and stats['failed'] == 0
+
+
+def test_smtp_sends_one_mail_per_batch(smtp_server):
+    sink = SmtpSink('127.0.0.1', smtp_server.server_address[1], 'monitor@example.com', ['me@example.com'])
+    notifier = Notifier([sink], batch_delay=0.05)
+    notifier.submit([_record(), _record('000001', kind='cleared')])
+    notifier.close()
+
+    assert len(smtp_server.messages) == 1
+    message = smtp_server.messages[0]
+    assert message['To'] == 'me@example.com'
+    assert '1 条触发' in str(email.header.make_header(email.header.decode_header(message['Subject'])))
+    body = message.get_payload(decode=True).decode(message.get_content_charset())
+    assert '600000 浦发银行 触发' in body and '000001 浦发银行 解除' in body
+
+
+def test_failed_batch_is_dropped_after_retries():
+    sink = ListSink(failures=10)
+    worker = SinkWorker(sink, batch_delay=0, retries=2, backoff=0.001)
+    worker.put([_record()])
+    _wait_until(lambda: worker.stats['failed'] == 1)
+    worker.close()
+    assert worker.stats['retries'] == 2 and sink.batches == []
+
+
+def test_overflow_drops_oldest_and_submit_does_not_block():
+    block = threading.Event()
+    sink = ListSink(block=block)
+    notifier = Notifier([sink], queue_size=5, batch_size=100, batch_delay=0)
+    notifier.submit([_record('first')])
+    _wait_until(lambda: notifier.workers['list'].pending == 0)   # 第一条正在发送 (被阻塞)
+
+    start = time.perf_counter()
+    notifier.submit([_record(str(i)) for i in range(20)])
+    assert time.perf_counter() - start < 0.1
+    block.set()
+    notifier.close()
+
+    stats = notifier.stats()
+    assert stats['submitted'] == 21 and stats['dropped'] == 15
+    assert [r['code'] for r in sink.batches[1]] == [str(i) for i in range(15, 20)]
+
+
+def test_rate_limit_merges_into_larger_batches():
+    sink = ListSink()
+    worker = SinkWorker(sink, batch_size=100, batch_delay=0, rate=5.0, burst=1)
+    for i in range(10):
+        worker.put([_record(str(i))])
+        time.sleep(0.02)
+    _wait_until(lambda: worker.stats['sent'] == 10)
+    worker.close()
+    # 每秒最多 5 批: 10 条在约 0.2 秒内到达,被合并成少数几批
+    assert len(sink.batches) < 5
+    assert worker.stats['rate_limited'] >= 1
+
+
+def test_sinks_are_isolated(tmp_path):
+    block = threading.Event()
+    slow = ListSink('slow', block=block)
+    log = LogFileSink(str(tmp_path / 'alerts.log'))
+    shown = []
+    notifier = Notifier([slow, log, DesktopSink(lambda title, text: shown.append((title, text)))],
+                        batch_delay=0)
+    notifier.submit([_record()])
+    # 慢渠道阻塞时其他渠道照常发送
+    _wait_until(lambda: notifier.stats()['sinks']['log']['sent'] == 1 and shown)
+    block.set()
+    notifier.close()
+    assert json.loads((tmp_path / 'alerts.log').read_text(encoding='utf-8'))['code'] == '600000'
+    assert shown[0][0] == '600000 浦发银行'
+
+
+def test_engine_events_to_log(tmp_path):
+    engine = MonitorEngine(str(tmp_path / 'config.json'))
+    engine.add_stock('600000')
+    engine.stocks['600000'].upper_price = 10.0
+    config = tmp_path / 'notify.json'
+    config.write_text(json.dumps({'log_file': 'alerts.log', 'options': {'batch_delay': 0}}), encoding='utf-8')
+    notifier = load_notifier(str(config))
+
+    for ts, price in enumerate((9.0, 10.5, 9.5)):
+        changes = engine.update_stocks_data([{'code': '600000', 'name': '浦发银行', 'price': price}], ts=float(ts))
+        notifier.submit(alert_records(engine, changes.events))
+    notifier.close()
+
+    lines = [json.loads(line) for line in (tmp_path / 'alerts.log').read_text(encoding='utf-8').splitlines()]
+    assert [(r['kind'], r['price']) for r in lines] == [('triggered', 10.5), ('cleared', 9.5)]
+    assert '价格突破上限' in format_record(lines[1])
+
+
+@pytest.mark.parametrize('content', [
+    '{"webhook": {"url": "http://127.0.0.1:9", "bogus": 1}}',
+    '{"smtp": {"host": "localhost"}}',
+    '{"options": {"batch_sise": 5}, "log_file": "alerts.log"}',
+    '{"log_file": ',
+    '["log_file"]',
+])
+def test_invalid_config_falls_back_to_desktop(tmp_path, capsys, content):
+    config = tmp_path / 'notify.json'
+    config.write_text(content, encoding='utf-8')
+    shown = []
+    notifier = load_notifier(str(config), lambda title, body: shown.append(title))
+    assert list(notifier.workers) == ['desktop']
+    assert '只使用桌面通知' in capsys.readouterr().out
+    notifier.submit([_record()])
+    _wait_until(lambda: shown)
+    notifier.close()
+
+    # 没有桌面通知时如实说明,strict 时直接抛出
+    notifier = load_notifier(str(config))
+    assert not notifier.workers and '不发送通知' in capsys.readouterr().out
+    notifier.close()
+    with pytest.raises(Exception):
+        load_notifier(str(config), strict=True)
+
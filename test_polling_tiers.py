@@ -0,0 +1,120 @@
+"""
+测试按离阈值远近分级抓取
+"""
+import numpy as np
+import pytest
+
+from alert_rules import All, Rule
+from monitor_engine import MonitorEngine
+from polling_tiers import PollingTiers, field_distance
+from quote_samples import make_tick
+
+
+def test_classify_by_distance_and_volatility():
+    tiers = PollingTiers((1, 5, 30, 60), z=3.0)
+    # σ = 0.02 %/√秒: 0.05% 以内每秒, 0.3% 左右每 5 秒, 很远每 60 秒
+    distance = np.array([0.05, 0.2, 0.4, 50.0, np.nan])
+    result = tiers.classify(distance, np.full(5, 0.02))
+    assert result.tolist() == [0, 1, 2, 3, 3]
+    # 同样的距离,波动越大越快
+    assert tiers.classify(np.array([0.4, 0.4]), np.array([0.01, 0.1])).tolist() == [3, 0]
+    # 没有波动率时使用默认值
+    assert tiers.classify(np.array([0.4]), np.array([np.nan])).tolist() == \
+        tiers.classify(np.array([0.4]), np.array([tiers.default_volatility])).tolist()
+
+
+def test_field_distance_units():
+    columns = {'price': np.array([10.0, 20.0]), 'ma': np.array([10.1, 20.0]),
+               'pct_change': np.array([4.0, -1.0])}
+    rows = np.arange(2)
+    assert np.allclose(field_distance('price', '>=', columns, rows, np.array([11.0, np.nan]))[:1], [10.0])
+    assert np.isnan(field_distance('price', '>=', columns, rows, np.array([11.0, np.nan]))[1])
+    assert np.allclose(field_distance('pct_change', '>=', columns, rows, 5.0), [1.0, 6.0])
+    assert np.allclose(field_distance('pct_change', 'abs>=', columns, rows, 5.0), [1.0, 4.0])
+    assert np.allclose(field_distance('ma_cross', 'abs>=', columns, rows, np.array([1.0, 1.0])), [1.0, 0.0])
+
+
+def test_tiers_come_due_on_their_own_interval():
+    tiers = PollingTiers((1, 5, 30))
+    assert tiers.due(0.0) == [0, 1, 2]
+    assert tiers.due(1.0) == [0]
+    assert tiers.due(5.0) == [0, 1]
+    # 错过的抓取点跳过
+    assert tiers.due(31.5) == [0, 1, 2]
+    assert tiers.due(32.0) == [0]
+    with pytest.raises(ValueError):
+        PollingTiers((5, 1))
+
+
+def test_engine_batches_per_tier(tmp_path):
+    engine = MonitorEngine(str(tmp_path / 'config.json'))
+    for code in ('hot', 'far', 'none'):
+        engine.add_stock(code)
+    engine.stocks['hot'].upper_price = 11.0
+    engine.stocks['far'].upper_price = 20.0
+    # 还没有行情时全部在最快一级
+    assert engine.poll_batches(0.0) == [['hot', 'far', 'none']]
+
+    engine.update_stocks_data([make_tick('hot', 10.99), make_tick('far', 10.0), make_tick('none', 10.0)], ts=0.0)
+    assert engine.polling_tiers().tolist() == [0, 3, 3]
+    assert engine.poll_batches(1.0) == [['hot']]
+    assert engine.poll_batches(5.0) == [['hot']]
+    assert engine.poll_batches(60.0) == [['hot'], ['far', 'none']]
+
+
+def test_unquoted_codes_back_off_after_first_request(tmp_path):
+    engine = MonitorEngine(str(tmp_path / 'config.json'))
+    for code in ('ok', 'bad'):
+        engine.add_stock(code)
+        engine.stocks[code].upper_price = 10.01
+    assert engine.poll_batches(0.0) == [['ok', 'bad']]
+    # 'bad' 没有返回行情 (代码无效或停牌): 之后只在最慢一级重试
+    engine.update_stocks_data([make_tick('ok', 10.0)], ts=0.0)
+    assert engine.polling_tiers().tolist() == [0, 3]
+    assert engine.poll_batches(1.0) == [['ok']]
+    assert engine.poll_batches(60.0) == [['ok'], ['bad']]
+
+    # 新增的股票第一次仍在最快一级;休市补抓也只返回一次
+    engine.add_stock('new')
+    assert engine.take_unquoted() == ['new']
+    assert engine.take_unquoted() == []
+    engine.add_stock('newer')
+    assert engine.poll_batches(61.0) == [['ok', 'newer']]
+    assert engine.take_unquoted() == []
+
+
+def test_custom_rules_count_as_thresholds(tmp_path):
+    engine = MonitorEngine(str(tmp_path / 'config.json'))
+    engine.add_stock('a')
+    engine.set_rules('a', [All(Rule('price', '>=', 50.0), Rule('pct_change', '>=', 2.1))])
+    engine.update_stocks_data([make_tick('a', 10.0, pct_change=2.0)], ts=0.0)
+    assert abs(engine.threshold_distance()[0] - 0.1) < 1e-9
+    assert engine.polling_tiers()[0] < len(engine.polling.intervals) - 1
+
+
+def test_tiers_reduce_request_volume(tmp_path):
+    """1000 只股票中 2% 接近阈值: 10 分钟内请求的代码数远少于每 5 秒全量抓取"""
+    rng = np.random.default_rng(0)
+    engine = MonitorEngine(str(tmp_path / 'config.json'))
+    n = 1000
+    codes = [f"{i:06d}" for i in range(n)]
+    prices = np.full(n, 10.0)
+    for i, code in enumerate(codes):
+        engine.add_stock(code)
+        engine.stocks[code].upper_price = 10.01 if i < 20 else 12.0
+    engine.update_stocks_data([make_tick(c, p) for c, p in zip(codes, prices)], ts=0.0)
+
+    requested = 0
+    fetched = np.zeros(n, dtype=int)
+    for t in range(1, 600):
+        prices = prices * (1 + rng.normal(0, 0.0002, n))
+        for batch in engine.poll_batches(float(t)):
+            requested += len(batch)
+            rows = [int(code) for code in batch]
+            engine.update_stocks_data([make_tick(codes[r], prices[r]) for r in rows], ts=float(t))
+            fetched[rows] += 1
+    flat = n * 600 // 5
+    assert requested < flat / 3
+    # 接近阈值的股票比远离阈值的股票抓取频繁得多
+    assert fetched[:20].mean() > 10 * fetched[20:].mean()
+    assert fetched[20:].max() <= 600 // 30
@@ -0,0 +1,50 @@
+"""
+测试接口健康统计与熔断
+"""
+from provider_health import ProviderHealth
+
+
+def test_circuit_opens_after_consecutive_failures():
+    health = ProviderHealth('tencent', failure_threshold=3, cooldown=30)
+    health.record(False, 3.0, now=100)
+    health.record(False, 3.0, now=105)
+    assert health.is_available(now=106)
+    health.record(False, 3.0, now=110)
+    assert not health.is_available(now=111)
+    assert health.stats(now=111)['circuit_open']
+    # 冷却结束后放行一次试探
+    assert health.is_available(now=140)
+    # 试探失败立即再次熔断
+    health.record(False, 3.0, now=140)
+    assert not health.is_available(now=141)
+    # 试探成功则恢复
+    health.record(True, 0.1, now=171)
+    assert health.is_available(now=172)
+    assert health.consecutive_failures == 0
+
+
+def test_latency_percentiles_and_success_rate():
+    health = ProviderHealth('sina', window=10)
+    for i in range(1, 11):
+        health.record(i % 5 != 0, i / 10.0)
+    stats = health.stats()
+    assert stats['calls'] == 10
+    assert stats['success_rate'] == 0.8
+    assert stats['p50_latency'] == 0.5
+    assert stats['p95_latency'] == 1.0
+
+
+def test_window_is_rolling():
+    health = ProviderHealth('sina', window=3)
+    health.record(False, 1.0)
+    for _ in range(3):
+        health.record(True, 0.1)
+    assert health.success_rate == 1.0
+    assert health.latency_percentile(95) == 0.1
+
+
+if __name__ == "__main__":
+    test_circuit_opens_after_consecutive_failures()
+    test_latency_percentiles_and_success_rate()
+    test_window_is_rolling()
+    print("✓ 接口健康统计测试通过")
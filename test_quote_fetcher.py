@@ -0,0 +1,347 @@
+"""
+测试 TestDataFetcher 的分批并发获取、长连接 Session，以及 AsyncDataFetcher 的接口对冲
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+import test_data_fetcher
+from test_data_fetcher import TestDataFetcher
+from async_data_fetcher import AsyncDataFetcher
+from market_snapshot import MarketSnapshotCache
+from test_market_snapshot import make_market
+
+QUOTES = {
+    '600000': ('浦发银行', 10.12, 10.23, 759256.0, 10.27, 10.06, 76932.0),
+    '000001': ('平安银行', 11.50, 11.40, 1200000.0, 11.62, 11.35, 138000.0),
+    '300750': ('宁德时代', 200.0, 205.0, 300000.0, 206.0, 198.5, 600000.0),
+}
+
+
+def tencent_line(code):
+    """按腾讯接口格式生成一行数据 (只填充解析用到的字段)"""
+    name, price, pre_close, volume, high, low, amount_wan = QUOTES[code]
+    parts = ['0'] * 50
+    parts[0] = '1'
+    parts[1] = name
+    parts[2] = code
+    parts[3] = str(price)
+    parts[4] = str(pre_close)
+    parts[6] = str(int(volume))
+    parts[32] = str(round((price - pre_close) / pre_close * 100, 2))
+    parts[33] = str(high)
+    parts[34] = str(low)
+    parts[37] = str(amount_wan)
+    prefix = 'sh' if code.startswith(('6', '9')) else 'sz'
+    return f'v_{prefix}{code}="{"~".join(parts)}";\n'
+
+
+def sina_line(code):
+    """按新浪接口格式生成一行数据"""
+    name, price, pre_close, volume, high, low, amount_wan = QUOTES[code]
+    parts = ['0'] * 33
+    parts[0] = name
+    parts[1] = str(pre_close)
+    parts[2] = str(pre_close)
+    parts[3] = str(price)
+    parts[4] = str(high)
+    parts[5] = str(low)
+    parts[8] = str(int(volume * 100))
+    parts[9] = str(amount_wan * 10000)
+    prefix = 'sh' if code.startswith(('6', '9')) else 'sz'
+    return f'var hq_str_{prefix}{code}="{",".join(parts)}";\n'
+
+
+class QuoteStubServer:
+    """本地桩服务器，模拟腾讯 (/q=) 和新浪 (/list=) 接口，并记录连接数"""
+
+    def __init__(self, fail=(), delay=None, known=None):
+        self.fail = set(fail)
+        self.delay = delay or {}
+        self.known = known or {}   # 接口 -> 该接口能返回的代码集合，默认全部
+        self.requests = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub.connections.add(self.client_address)
+                path = unquote(self.path)
+                provider = 'tencent' if path.startswith('/q=') else 'sina'
+                codes = [c[2:] for c in path.split('=', 1)[1].split(',')]
+                stub.requests.append((provider, codes, dict(self.headers)))
+                time.sleep(stub.delay.get(provider, 0))
+                if provider in stub.fail:
+                    body = b''
+                    self.send_response(500)
+                else:
+                    known = stub.known.get(provider, QUOTES)
+                    if provider == 'tencent':
+                        body = ''.join(tencent_line(c) for c in codes if c in known)
+                    else:
+                        # 新浪对未知/退市代码返回空字符串
+                        body = ''.join(sina_line(c) if c in known else f'var hq_str_sz{c}="";\n'
+                                       for c in codes)
+                    body = body.encode('gbk')
+                    self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=GBK')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def urls(self):
+        base = f'http://127.0.0.1:{self.server.server_port}'
+        return {'tencent': f'{base}/q=', 'sina': f'{base}/list='}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def _fake_chunk(stock_codes):
+    # 越靠前的批次返回越慢，验证合并结果仍按原顺序排列
+    time.sleep(0.01 * (5 - int(stock_codes[0]) // 10))
+    return [{'code': c, 'price': float(c)} for c in stock_codes]
+
+
+def test_chunked_fetch_keeps_order():
+    fetcher = TestDataFetcher(batch_size=10, max_workers=4)
+    codes = [f"{i:06d}" for i in range(45)]
+    results = fetcher._fetch_in_chunks('fake', _fake_chunk, codes)
+
+    assert [r['code'] for r in results] == codes
+    timings = fetcher.chunk_timings['fake']
+    assert [t['chunk'] for t in timings] == [0, 1, 2, 3, 4]
+    assert [t['size'] for t in timings] == [10, 10, 10, 10, 5]
+    assert all(t['elapsed'] >= 0 for t in timings)
+    fetcher.close()
+
+
+def test_chunked_fetch_partial_failure():
+    fetcher = TestDataFetcher(batch_size=2, max_workers=2)
+
+    def chunk(stock_codes):
+        if '000002' in stock_codes:
+            return []
+        return [{'code': c} for c in stock_codes]
+
+    results = fetcher._fetch_in_chunks('fake', chunk, ['000000', '000001', '000002', '000003', '000004'])
+    assert [r['code'] for r in results] == ['000000', '000001', '000004']
+    assert [t['received'] for t in fetcher.chunk_timings['fake']] == [2, 0, 1]
+    fetcher.close()
+
+
+def test_chunked_fetch_raises_when_every_chunk_fails():
+    fetcher = TestDataFetcher(batch_size=2, max_workers=2)
+
+    def chunk(stock_codes):
+        raise ConnectionError("down")
+
+    try:
+        fetcher._fetch_in_chunks('fake', chunk, ['000000', '000001', '000002'])
+    except ConnectionError:
+        pass
+    else:
+        raise AssertionError("所有批次失败时应抛出异常")
+    assert [t['received'] for t in fetcher.chunk_timings['fake']] == [0, 0]
+    fetcher.close()
+
+
+def test_tencent_session_reuses_connection():
+    with QuoteStubServer() as stub:
+        with TestDataFetcher(urls=stub.urls) as fetcher:
+            for _ in range(3):
+                data = fetcher.get_realtime_quotes(['600000', '000001'])
+                assert [d['code'] for d in data] == ['600000', '000001']
+            assert data[0]['name'] == '浦发银行'
+            assert data[0]['price'] == 10.12
+            assert data[0]['amount'] == 76932.0 * 10000
+        # 三次刷新只建立了一个 TCP 连接
+        assert len(stub.connections) == 1
+        assert len(stub.requests) == 3
+
+
+def test_sina_fallback_sends_referer():
+    with QuoteStubServer(fail=['tencent']) as stub:
+        with TestDataFetcher(urls=stub.urls) as fetcher:
+            data = fetcher.get_realtime_quotes(['600000', '000001'])
+        assert [d['code'] for d in data] == ['600000', '000001']
+        assert data[1]['price'] == 11.50
+        assert data[1]['volume'] == 1200000.0
+        sina_requests = [r for r in stub.requests if r[0] == 'sina']
+        assert sina_requests[0][2]['Referer'] == 'http://finance.sina.com.cn'
+
+
+def test_sina_maps_codes_by_variable_name():
+    # 第一个代码返回空数据，后面的行情不能错位到前一个代码上
+    with QuoteStubServer(fail=['tencent'], known={'sina': {'000001', '300750'}}) as stub:
+        with TestDataFetcher(urls=stub.urls) as fetcher:
+            data = fetcher.get_realtime_quotes(['600000', '000001', '300750'])
+    assert [(d['code'], d['name']) for d in data] == [('000001', '平安银行'), ('300750', '宁德时代')]
+
+
+def test_gap_filling_requests_only_missing_codes():
+    codes = ['600000', '000001', '300750']
+    with QuoteStubServer(known={'tencent': {'600000', '300750'}}) as stub:
+        with TestDataFetcher(urls=stub.urls) as fetcher:
+            data = fetcher.get_realtime_quotes(codes)
+            assert fetcher.missing_codes == []
+    # 结果按请求顺序合并，缺失的代码只向新浪补请求一次
+    assert [d['code'] for d in data] == codes
+    assert data[1]['name'] == '平安银行'
+    assert [(r[0], r[1]) for r in stub.requests] == [
+        ('tencent', codes), ('sina', ['000001'])]
+
+
+def test_gap_filling_keeps_partial_results():
+    codes = ['600000', '000001', '300750', '688999']
+    with QuoteStubServer(known={'tencent': {'600000'}, 'sina': {'000001'}}) as stub:
+        with TestDataFetcher(urls=stub.urls) as fetcher:
+            data = fetcher.get_realtime_quotes(codes)
+            assert fetcher.missing_codes == ['300750', '688999']
+    assert [d['code'] for d in data] == ['600000', '000001']
+
+
+def test_tripped_provider_is_skipped():
+    with QuoteStubServer(fail=['tencent']) as stub:
+        with TestDataFetcher(urls=stub.urls) as fetcher:
+            for _ in range(4):
+                data = fetcher.get_realtime_quotes(['600000'])
+                assert data[0]['price'] == 10.12
+            health = fetcher.get_provider_health()
+    # 腾讯连续失败 3 次后熔断，第 4 次刷新直接使用新浪
+    assert [r[0] for r in stub.requests].count('tencent') == 3
+    assert health['tencent']['circuit_open']
+    assert health['tencent']['consecutive_failures'] == 3
+    assert health['sina']['success_rate'] == 1.0
+
+
+def test_invalid_code_does_not_trip_healthy_provider():
+    # 000000 是无效代码: 两个接口每次都正常响应,只是不包含它
+    codes = ['600000', '000001', '000000']
+    with QuoteStubServer() as stub:
+        with TestDataFetcher(urls=stub.urls) as fetcher:
+            for _ in range(5):
+                data = fetcher.get_realtime_quotes(codes)
+                assert [d['code'] for d in data] == ['600000', '000001']
+                assert fetcher.missing_codes == ['000000']
+            health = fetcher.get_provider_health()
+    assert not health['tencent']['circuit_open']
+    assert not health['sina']['circuit_open']
+    assert health['sina']['consecutive_failures'] == 0
+    assert health['sina']['success_rate'] == 1.0
+
+
+def test_known_missing_code_backs_off_full_market_fallback():
+    # 000000 哪个接口都没有: 确认全市场快照里也没有之后,退避期间不再为它下载全市场数据
+    snapshot = MarketSnapshotCache(make_market, ttl=0)
+    available = test_data_fetcher.AKSHARE_AVAILABLE
+    test_data_fetcher.AKSHARE_AVAILABLE = True
+    try:
+        with QuoteStubServer() as stub:
+            with TestDataFetcher(urls=stub.urls, market_snapshot=snapshot, missing_backoff=0.2) as fetcher:
+                for _ in range(3):
+                    data = fetcher.get_realtime_quotes(['600000', '000000'])
+                    assert [d['code'] for d in data] == ['600000']
+                    assert fetcher.missing_codes == ['000000']
+                assert snapshot.load_count == 1
+                time.sleep(0.25)
+                fetcher.get_realtime_quotes(['600000', '000000'])
+                assert snapshot.load_count == 2
+                # 退避时间加倍
+                fetcher.get_realtime_quotes(['600000', '000000'])
+                assert snapshot.load_count == 2
+                assert fetcher._known_missing['000000'][1] == 0.4
+                assert not fetcher.get_provider_health()['akshare']['circuit_open']
+    finally:
+        test_data_fetcher.AKSHARE_AVAILABLE = available
+
+
+def test_providers_ordered_by_health():
+    with TestDataFetcher() as fetcher:
+        for _ in range(5):
+            fetcher.health['tencent'].record(False, 3.0)
+            fetcher.health['tencent'].record(True, 0.2)
+            fetcher.health['sina'].record(True, 0.1)
+        assert [name for name, _ in fetcher._providers()][:2] == ['sina', 'tencent']
+
+
+def test_async_hedge_takes_faster_provider():
+    with QuoteStubServer(delay={'tencent': 2.0}) as stub:
+        fetcher = AsyncDataFetcher(TestDataFetcher(urls=stub.urls), hedge_delay=0.1)
+        start = time.perf_counter()
+        data = fetcher.get_realtime_quotes(['600000', '000001'])
+        elapsed = time.perf_counter() - start
+        fetcher.close()
+    assert fetcher.last_winner == 'sina'
+    assert [d['code'] for d in data] == ['600000', '000001']
+    # 不等待慢接口返回
+    assert elapsed < 1.5
+
+
+def test_async_no_hedge_when_primary_is_fast():
+    with QuoteStubServer() as stub:
+        fetcher = AsyncDataFetcher(TestDataFetcher(urls=stub.urls), hedge_delay=1.0)
+        data = fetcher.get_realtime_quotes(['600000', '000001'])
+        fetcher.close()
+    assert fetcher.last_winner == 'tencent'
+    assert len(data) == 2
+    assert [r[0] for r in stub.requests] == ['tencent']
+
+
+def test_async_failed_primary_falls_through_immediately():
+    with QuoteStubServer(fail=['tencent']) as stub:
+        fetcher = AsyncDataFetcher(TestDataFetcher(urls=stub.urls), hedge_delay=5.0)
+        start = time.perf_counter()
+        data = fetcher.get_realtime_quotes(['600000'])
+        elapsed = time.perf_counter() - start
+        fetcher.close()
+    assert fetcher.last_winner == 'sina'
+    assert data[0]['price'] == 10.12
+    assert elapsed < 2.0
+
+
+
+def test_async_fills_gaps_after_race():
+    codes = ['600000', '000001', '300750']
+    with QuoteStubServer(known={'tencent': {'600000', '000001'}}) as stub:
+        fetcher = AsyncDataFetcher(TestDataFetcher(urls=stub.urls), hedge_delay=1.0, min_coverage=0.5)
+        data = fetcher.get_realtime_quotes(codes)
+        fetcher.close()
+    assert fetcher.last_winner == 'tencent'
+    assert [d['code'] for d in data] == codes
+    assert [(r[0], r[1]) for r in stub.requests][-1] == ('sina', ['300750'])
+
+
+if __name__ == "__main__":
+    test_chunked_fetch_keeps_order()
+    test_chunked_fetch_partial_failure()
+    test_chunked_fetch_raises_when_every_chunk_fails()
+    test_tencent_session_reuses_connection()
+    test_sina_fallback_sends_referer()
+    test_sina_maps_codes_by_variable_name()
+    test_gap_filling_requests_only_missing_codes()
+    test_gap_filling_keeps_partial_results()
+    test_tripped_provider_is_skipped()
+    test_invalid_code_does_not_trip_healthy_provider()
+    test_known_missing_code_backs_off_full_market_fallback()
+    test_providers_ordered_by_health()
+    test_async_hedge_takes_faster_provider()
+    test_async_no_hedge_when_primary_is_fast()
+    test_async_failed_primary_falls_through_immediately()
+    test_async_fills_gaps_after_race()
+    print("✓ 数据获取测试通过")
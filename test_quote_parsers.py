@@ -0,0 +1,88 @@
+"""
+测试行情响应解析（使用 samples 目录下录制的接口响应）
+"""
+from quote_parsers import parse_tencent, parse_sina, parse_sina_lines
+from quote_samples import legacy_parse_sina, legacy_parse_tencent, load_sample
+
+
+def test_tencent_matches_legacy_parser():
+    raw = load_sample('tencent_qt.txt')
+    results = parse_tencent(raw)
+    # 被截断的最后一行和 v_pv_none_match 被跳过
+    assert [r['code'] for r in results] == ['600000', '000001', '300750', '688981']
+    assert results == legacy_parse_tencent(raw.decode('gbk'))[:4]
+    assert results[0] == {
+        'code': '600000', 'name': '浦发银行', 'price': 10.12, 'pct_change': -1.08,
+        'volume': 759256.0, 'high': 10.27, 'low': 10.06, 'amount': 769320000.0
+    }
+
+
+def test_tencent_truncated_and_bad_lines():
+    raw = load_sample('tencent_qt.txt')
+    first = raw.split(b';')[0] + b';'
+    # 任意位置截断都不会抛异常
+    for cut in range(0, len(first), 7):
+        assert parse_tencent(first[:cut]) == []
+    # 数值字段为空的行被跳过，不影响其他行
+    bad = first.replace(b'~10.12~10.23~', b'~~10.23~', 1)
+    assert [r['code'] for r in parse_tencent(bad + raw)][:1] == ['600000']
+    assert len(parse_tencent(bad)) == 0
+    # 中间被截断的行不会和下一行拼在一起
+    second = raw.split(b';')[1] + b';'
+    for cut in range(20, len(first), 37):
+        assert [r['code'] for r in parse_tencent(first[:cut] + second)] == ['000001']
+
+
+def test_sina_codes_from_variable_names():
+    raw = load_sample('sina_hq.txt')
+    results = parse_sina(raw)
+    # 000003 返回空数据，后面的股票不受影响
+    assert [(r['code'], r['name']) for r in results] == [
+        ('600000', '浦发银行'), ('000001', '平安银行'), ('300750', '宁德时代'), ('688981', '中芯国际')]
+    assert results[0] == {
+        'code': '600000', 'name': '浦发银行', 'price': 10.12, 'pct_change': -1.08,
+        'volume': 759256.0, 'high': 10.27, 'low': 10.06, 'amount': 769320000.0
+    }
+
+
+def test_sina_legacy_parser_misaligns_after_blank():
+    raw = load_sample('sina_hq.txt')
+    codes = ['600000', '000001', '000003', '300750', '688981']
+    legacy = legacy_parse_sina(raw.decode('gbk'), codes)
+    # 旧实现行号恰好对齐时结果相同……
+    assert [r['price'] for r in legacy] == [r['price'] for r in parse_sina(raw)]
+    # ……但只要中间少一行（例如接口跳过了某个代码），后面的行情就会错位
+    lines = raw.split(b'\n')
+    del lines[2]
+    legacy = legacy_parse_sina(b'\n'.join(lines).decode('gbk'), codes)
+    assert legacy[2]['code'] == '000003' and legacy[2]['name'] == '宁德时代'
+    assert [r['code'] for r in parse_sina(b'\n'.join(lines))] == ['600000', '000001', '300750', '688981']
+
+
+def test_sina_streaming_and_truncated_lines():
+    raw = load_sample('sina_hq.txt')
+    seen = []
+
+    def lines():
+        for line in raw.splitlines():
+            seen.append(line)
+            yield line
+
+    stream = parse_sina_lines(lines())
+    first = next(stream)
+    # 流式解析：产出第一只股票时只读取了第一行
+    assert first['code'] == '600000' and len(seen) == 1
+    assert len(list(stream)) == 3
+
+    first_line = raw.splitlines()[0]
+    for cut in range(0, len(first_line), 5):
+        assert parse_sina(first_line[:cut]) == []
+
+
+if __name__ == "__main__":
+    test_tencent_matches_legacy_parser()
+    test_tencent_truncated_and_bad_lines()
+    test_sina_codes_from_variable_names()
+    test_sina_legacy_parser_misaligns_after_blank()
+    test_sina_streaming_and_truncated_lines()
+    print("✓ 行情解析测试通过")
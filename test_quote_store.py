@@ -0,0 +1,128 @@
+"""
+测试列式行情表、StockItem 视图和批量预警计算
+"""
+import math
+import random
+from monitor_engine import MonitorEngine, StockItem
+from quote_store import QuoteStore
+
+
+def test_stock_item_is_view_over_store():
+    store = QuoteStore(capacity=2)
+    items = [StockItem(f"{i:06d}", store=store) for i in range(5)]
+    assert store.capacity >= 5 and len(store) == 5
+
+    items[3].price = 12.5
+    items[3].upper_price = 13.0
+    assert store.column('price')[3] == 12.5
+    assert store.column('upper_price')[3] == 13.0
+    assert math.isnan(store.column('lower_price')[3])
+    assert items[3].lower_price is None
+    assert not hasattr(items[3], '__dict__')
+
+
+def test_remove_keeps_other_rows_and_detaches_view():
+    store = QuoteStore()
+    a, b, c = (StockItem(code, store=store) for code in ('600000', '000001', '300750'))
+    a.price, b.price, c.price = 1.0, 2.0, 3.0
+    c.upper_pct = 5.0
+
+    removed = store.remove('000001')
+    assert removed is b
+    # 最后一行移到被删除的位置，视图仍然指向自己的数据
+    assert c.price == 3.0 and c.upper_pct == 5.0
+    assert store.index == {'600000': 0, '300750': 1}
+    # 被删除的视图保留原值，修改它不会影响表中其他股票
+    assert b.price == 2.0
+    b.price = 99.0
+    assert list(store.column('price')) == [1.0, 3.0]
+
+
+def test_engine_add_remove_and_update():
+    engine = MonitorEngine("test_quote_store_config.json")
+    engine.add_stock("600000")
+    engine.add_stock("000001")
+    engine.stocks["000001"].upper_price = 13.0
+    engine.remove_stock("600000")
+    assert len(engine.store) == 1
+    assert engine.stocks["000001"].upper_price == 13.0
+
+    engine.update_stocks_data([{'code': '000001', 'name': '平安银行', 'price': 13.5}])
+    stock = engine.stocks["000001"]
+    assert stock.price == 13.5 and stock.is_alerting
+    assert engine.get_alerting_stocks() == [stock]
+
+
+
+def test_vectorized_alerts_match_per_stock_check():
+    rng = random.Random(7)
+    engine = MonitorEngine("test_quote_store_config.json")
+    fields = ['price', 'pct', 'volume', 'high', 'low', 'amount']
+    for i in range(300):
+        code = f"{i:06d}"
+        engine.add_stock(code)
+        stock = engine.stocks[code]
+        for key in fields:
+            if rng.random() < 0.3:
+                setattr(stock, f'upper_{key}', rng.uniform(0, 100))
+            if rng.random() < 0.3:
+                setattr(stock, f'lower_{key}', rng.uniform(-10, 50))
+
+    data = [{'code': f"{i:06d}", 'name': f"股票{i}", 'price': rng.uniform(0, 100),
+             'pct_change': rng.uniform(-10, 10), 'volume': rng.uniform(0, 100),
+             'high': rng.uniform(0, 100), 'low': rng.uniform(0, 100), 'amount': rng.uniform(0, 100)}
+            for i in range(300)]
+    engine.update_stocks_data(data)
+
+    alerting = 0
+    for stock in engine.get_all_stocks():
+        reasons, flag = stock.alert_reasons, stock.is_alerting
+        stock.check_alerts()
+        assert stock.alert_reasons == reasons
+        assert stock.is_alerting == flag
+        alerting += flag
+    assert 0 < alerting < 300
+
+    # 不在监控列表中的代码被忽略，缺失字段按 0 处理
+    engine.update_stocks_data([{'code': '999999', 'price': 1.0}, {'code': '000000', 'name': 'X'}])
+    assert engine.stocks['000000'].price == 0.0 and engine.stocks['000000'].name == 'X'
+
+
+
+def test_update_returns_change_set():
+    engine = MonitorEngine("test_quote_store_config.json")
+    for code in ('600000', '000001', '300750'):
+        engine.add_stock(code)
+    engine.stocks['600000'].upper_price = 11.0
+    tick = [{'code': '600000', 'name': '浦发银行', 'price': 10.5},
+            {'code': '000001', 'name': '平安银行', 'price': 11.5},
+            {'code': '300750', 'name': '宁德时代', 'price': 200.0}]
+
+    changes = engine.update_stocks_data(tick)
+    assert changes.changed == ['600000', '000001', '300750']
+    assert changes.alert_on == [] and changes.alert_off == []
+
+    # 完全相同的行情：没有任何变化，也不会重新检查阈值
+    changes = engine.update_stocks_data(tick)
+    assert not changes and not changes.alerts_changed
+
+    tick[0] = dict(tick[0], price=11.2)
+    changes = engine.update_stocks_data(tick)
+    assert changes.changed == ['600000']
+    assert changes.alert_on == ['600000'] and changes.alerting == ['600000']
+
+    tick[0] = dict(tick[0], price=10.8)
+    tick[2] = dict(tick[2], price=201.0)
+    changes = engine.update_stocks_data(tick)
+    assert sorted(changes.changed) == ['300750', '600000']
+    assert changes.alert_off == ['600000'] and changes.alerting == []
+    assert engine.stocks['600000'].alert_reasons == []
+
+
+if __name__ == "__main__":
+    test_stock_item_is_view_over_store()
+    test_remove_keeps_other_rows_and_detaches_view()
+    test_engine_add_remove_and_update()
+    test_vectorized_alerts_match_per_stock_check()
+    test_update_returns_change_set()
+    print("✓ 列式行情表测试通过")
@@ -0,0 +1,82 @@
+"""
+测试主窗口表格模型：增量 dataChanged，刷新后保留排序和选中状态
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QApplication
+from monitor_engine import MonitorEngine
+from gui.main_window import MainWindow
+
+
+def make_window():
+    app = QApplication.instance() or QApplication([])
+    engine = MonitorEngine("test_table_model_config.json")
+    for code in ('600000', '000001', '300750'):
+        engine.add_stock(code)
+    window = MainWindow(engine, None)
+    return app, engine, window
+
+
+def tick(price_600000=10.12, price_000001=11.5):
+    return [{'code': '600000', 'name': '浦发银行', 'price': price_600000, 'pct_change': -1.08},
+            {'code': '000001', 'name': '平安银行', 'price': price_000001, 'pct_change': 0.88},
+            {'code': '300750', 'name': '宁德时代', 'price': 200.0, 'pct_change': 0.0}]
+
+
+def test_only_changed_cells_emit_data_changed():
+    app, engine, window = make_window()
+    window.refresh_table(engine.update_stocks_data(tick()))
+    emitted = []
+    window.model.dataChanged.connect(lambda tl, br: emitted.append((tl.row(), tl.column(), br.column())))
+
+    window.refresh_table(engine.update_stocks_data(tick()))
+    assert emitted == []
+
+    window.refresh_table(engine.update_stocks_data(tick(price_000001=11.6)))
+    row = window.model.row_of('000001')
+    price_col = [f for f, _ in window.model.columns].index('price')
+    assert emitted == [(row, price_col, price_col)]
+
+
+def test_sort_and_selection_survive_refresh():
+    app, engine, window = make_window()
+    window.refresh_table(engine.update_stocks_data(tick()))
+    proxy = window.proxy_model
+    codes = [proxy.index(r, 0).data() for r in range(proxy.rowCount())]
+    assert codes == ['000001', '300750', '600000']
+
+    window.table.selectRow(2)
+    assert window.selected_code() == '600000'
+    window.refresh_table(engine.update_stocks_data(tick(price_600000=10.5)))
+    engine.add_stock('000002')
+    window.refresh_table()
+    assert window.selected_code() == '600000'
+    codes = [proxy.index(r, 0).data() for r in range(proxy.rowCount())]
+    assert codes == ['000001', '000002', '300750', '600000']
+
+    engine.remove_stock('000001')
+    window.refresh_table()
+    assert window.selected_code() == '600000'
+    assert proxy.rowCount() == 3
+
+
+def test_alert_background_and_hidden_columns():
+    app, engine, window = make_window()
+    engine.stocks['600000'].upper_price = 10.0
+    window.refresh_table(engine.update_stocks_data(tick()))
+    model = window.model
+    index = model.index(model.row_of('600000'), 1)
+    assert model.data(index, Qt.ItemDataRole.BackgroundRole) is not None
+    volume_col = [f for f, _ in model.columns].index('volume')
+    assert window.table.isColumnHidden(volume_col)
+    window.field_checkboxes['volume'].setChecked(True)
+    assert not window.table.isColumnHidden(volume_col)
+
+
+if __name__ == "__main__":
+    test_only_changed_cells_emit_data_changed()
+    test_sort_and_selection_survive_refresh()
+    test_alert_background_and_hidden_columns()
+    print("✓ 表格模型测试通过")
@@ -0,0 +1,100 @@
+"""
+测试逐笔行情的后台写入与内存映射读取
+"""
+import time
+
+import numpy as np
+
+from monitor_engine import MonitorEngine
+from tick_recorder import TICK_DTYPE, TickDay, TickRecorder, day_of, open_day
+from quote_store import DATA_FIELDS
+
+T0 = 1760000000.0   # 同一交易日内的时间戳
+
+
+def _values(n, base):
+    return {field: np.arange(n, dtype=float) + base for field in DATA_FIELDS}
+
+
+def test_record_size_is_fixed():
+    assert TICK_DTYPE.itemsize == 4 + 8 * 7
+
+
+def test_day_of_uses_shanghai_date(monkeypatch):
+    # 2024-01-12 01:30 北京时间,UTC 仍是 2024-01-11
+    ts = 1704994200.0
+    monkeypatch.setenv('TZ', 'UTC')
+    time.tzset()
+    try:
+        assert day_of(ts) == '20240112'
+        # 同一交易日 09:30 和 15:00 的行情在同一个文件
+        assert day_of(ts + 8 * 3600) == day_of(ts + 13.5 * 3600) == '20240112'
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+
+
+def test_recorder_round_trip_and_range_query(tmp_path):
+    recorder = TickRecorder(str(tmp_path), flush_interval=60)
+    for i in range(10):
+        codes = ['600000', '000001'] if i % 2 == 0 else ['600000', '300750']
+        recorder.record(codes, _values(2, i * 10), ts=T0 + i)
+    # close 之前不会写盘 (flush_interval 很长)
+    assert recorder.record_count == 0
+    recorder.close()
+    assert recorder.record_count == 20
+
+    day = TickDay(str(tmp_path), day_of(T0))
+    assert len(day) == 20 and isinstance(day.ticks, np.memmap)
+    assert day.codes == ['600000', '000001', '300750']
+
+    window = day.between(T0 + 2, T0 + 5)
+    assert len(window) == 6
+    assert np.shares_memory(window, day.ticks)
+
+    ticks = day.query('300750', T0 + 2, T0 + 8)
+    assert ticks['ts'].tolist() == [T0 + 3, T0 + 5, T0 + 7]
+    assert ticks['price'].tolist() == [31.0, 51.0, 71.0]
+    assert len(day.query('999999')) == 0
+
+
+def test_code_index_survives_restart(tmp_path):
+    recorder = TickRecorder(str(tmp_path))
+    recorder.record(['600000'], _values(1, 1), ts=T0)
+    recorder.close()
+    recorder = TickRecorder(str(tmp_path))
+    recorder.record(['000001', '600000'], _values(2, 5), ts=T0 + 1)
+    recorder.close()
+
+    day = TickDay(str(tmp_path), day_of(T0))
+    assert day.codes == ['600000', '000001']
+    assert day.query('600000')['price'].tolist() == [1.0, 6.0]
+
+
+def test_partial_trailing_record_is_ignored(tmp_path):
+    recorder = TickRecorder(str(tmp_path))
+    recorder.record(['600000'], _values(1, 1), ts=T0)
+    recorder.close()
+    with open(tmp_path / f"{day_of(T0)}.ticks", 'ab') as f:
+        f.write(b'\x00' * 10)
+    assert len(TickDay(str(tmp_path), day_of(T0))) == 1
+
+
+def test_engine_records_changed_stocks(tmp_path):
+    recorder = TickRecorder(str(tmp_path))
+    engine = MonitorEngine(config_file=str(tmp_path / 'config.json'), recorder=recorder)
+    engine.add_stock('600000')
+    engine.add_stock('000001')
+    tick = [{'code': '600000', 'name': '浦发银行', 'price': 10.0, 'pct_change': 1.0, 'volume': 100.0,
+             'high': 10.5, 'low': 9.5, 'amount': 1000.0},
+            {'code': '000001', 'name': '平安银行', 'price': 12.0, 'pct_change': 0.5, 'volume': 200.0,
+             'high': 12.5, 'low': 11.5, 'amount': 2000.0}]
+    engine.update_stocks_data(tick)
+    tick[1] = dict(tick[1], price=12.1)
+    # 第二次只有 000001 变化
+    engine.update_stocks_data(tick)
+    recorder.close()
+
+    day = open_day(str(tmp_path))
+    assert day.query('600000')['price'].tolist() == [10.0]
+    assert day.query('000001')['price'].tolist() == [12.0, 12.1]
@@ -0,0 +1,177 @@
+"""
+逐笔行情记录。
+
+每个交易日一个定长记录的二进制文件 YYYYMMDD.ticks,每条记录为
+(代码编号 uint32, 时间戳 float64, price, pct_change, volume, high, low, amount 各 float64),
+小端、无对齐填充,共 60 字节。代码编号是同日旁路文件 YYYYMMDD.codes 中的行号 (每行一个代码,只追加)。
+
+只记录数值发生变化的股票:某只股票在时刻 t 的行情即 t 之前 (含) 它的最后一条记录。
+文件只追加,记录按写入顺序 (即时间顺序) 排列,读取方用 np.memmap 直接映射,
+按时间范围二分查找,不复制数据。
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from market_session import CHINA_TZ
+from quote_store import DATA_FIELDS
+
+TICK_DTYPE = np.dtype([('code', '<u4'), ('ts', '<f8')] + [(field, '<f8') for field in DATA_FIELDS])
+
+def day_of(ts: float) -> str:
+    """时间戳对应的交易日 (北京时间的日期,与服务器时区无关),即文件名"""
+    return datetime.fromtimestamp(ts, CHINA_TZ).strftime('%Y%m%d')
+
+class TickRecorder:
+    """
+    逐笔行情的后台写入器。
+
+    record() 在调用线程中把一批行情打包成结构化数组放入缓冲区后立即返回;
+    后台线程每隔 flush_interval 秒 (或缓冲超过 max_pending 条时) 把缓冲区追加到当天的文件。
+    close() 在程序退出时调用,写出剩余数据。
+    """
+
+    def __init__(self, directory: str = "ticks", flush_interval: float = 1.0, max_pending: int = 100000):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.record_count = 0        # 已写入文件的记录数
+        os.makedirs(directory, exist_ok=True)
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending: List = []     # [(交易日, 新增代码列表, 记录数组)]
+        self._pending_count = 0
+        self._code_index: Dict[str, Dict[str, int]] = {}   # 交易日 -> 代码 -> 编号
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="tick-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, codes: List[str], values: Dict[str, np.ndarray], ts: Optional[float] = None):
+        """
+        记录一批行情。values 为 字段 -> 与 codes 等长的数组。
+        """
+        if not codes:
+            return
+        ts = time.time() if ts is None else ts
+        day = day_of(ts)
+        records = np.empty(len(codes), dtype=TICK_DTYPE)
+        records['ts'] = ts
+        for field in DATA_FIELDS:
+            records[field] = values[field]
+
+        with self._cond:
+            if self._closed:
+                return
+            index = self._code_index.get(day)
+            if index is None:
+                index = self._code_index[day] = self._load_code_index(day)
+            new_codes = []
+            for code in codes:
+                if code not in index:
+                    index[code] = len(index)
+                    new_codes.append(code)
+            records['code'] = [index[code] for code in codes]
+            self._pending.append((day, new_codes, records))
+            self._pending_count += len(records)
+            if self._pending_count >= self.max_pending:
+                self._cond.notify()
+
+    def flush(self):
+        """在调用线程中立即写出缓冲区"""
+        # 取缓冲区与写文件在同一把锁内完成,保证记录和代码表按提交顺序落盘
+        with self._write_lock:
+            with self._cond:
+                pending, self._pending = self._pending, []
+                self._pending_count = 0
+            self._write(pending)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+    def _load_code_index(self, day: str) -> Dict[str, int]:
+        # 程序重启后继续沿用当天已有的代码编号
+        path = os.path.join(self.directory, f"{day}.codes")
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return {code: i for i, code in enumerate(f.read().split())}
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(self.flush_interval)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _write(self, pending: List):
+        if not pending:
+            return
+        try:
+            # 同一交易日的记录合并为一次写入;代码表先于记录写出,读取方总能解析编号
+            by_day: Dict[str, List] = {}
+            for day, new_codes, records in pending:
+                codes, arrays = by_day.setdefault(day, ([], []))
+                codes.extend(new_codes)
+                arrays.append(records)
+            for day, (codes, arrays) in by_day.items():
+                if codes:
+                    with open(os.path.join(self.directory, f"{day}.codes"), 'a', encoding='utf-8') as f:
+                        f.write(''.join(f"{code}\n" for code in codes))
+                records = np.concatenate(arrays)
+                with open(os.path.join(self.directory, f"{day}.ticks"), 'ab') as f:
+                    f.write(records.tobytes())
+                self.record_count += len(records)
+        except Exception as e:
+            print(f"写入逐笔行情失败: {e}")
+
+class TickDay:
+    """
+    一个交易日的逐笔行情,记录数组 ticks 通过 np.memmap 映射,不读入内存。
+    打开后新追加的记录不可见,需要时重新打开。
+    """
+
+    def __init__(self, directory: str, day: str):
+        self.day = day
+        codes_path = os.path.join(directory, f"{day}.codes")
+        ticks_path = os.path.join(directory, f"{day}.ticks")
+        with open(codes_path, 'r', encoding='utf-8') as f:
+            self.codes: List[str] = f.read().split()
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        # 只映射完整的记录 (写入中途被读取时末尾可能有半条)
+        count = os.path.getsize(ticks_path) // TICK_DTYPE.itemsize
+        if count:
+            self.ticks = np.memmap(ticks_path, dtype=TICK_DTYPE, mode='r', shape=(count,))
+        else:
+            self.ticks = np.empty(0, dtype=TICK_DTYPE)
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def between(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """时间范围 [start, end) 内的全部记录 (映射视图,不复制)"""
+        ts = self.ticks['ts']
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side='left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side='left'))
+        return self.ticks[lo:hi]
+
+    def query(self, code: str, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """某只股票在时间范围 [start, end) 内的记录,当天没有记录时返回空数组"""
+        index = self.code_index.get(code)
+        if index is None:
+            return np.empty(0, dtype=TICK_DTYPE)
+        ticks = self.between(start, end)
+        return ticks[ticks['code'] == index]
+
+def open_day(directory: str = "ticks", day: Optional[str] = None) -> TickDay:
+    """打开某个交易日 (默认今天) 的逐笔行情"""
+    return TickDay(directory, day or day_of(time.time()))